@@ -0,0 +1,5 @@
+'''
+Benchmarks for IDMEFv2 connectors
+
+See README.md in this directory
+'''
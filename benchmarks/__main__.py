@@ -0,0 +1,7 @@
+'''
+Run the converter benchmarks: python -m benchmarks
+'''
+import sys
+from .converters import main
+
+sys.exit(main())
@@ -0,0 +1,27 @@
+# pylint: disable=missing-function-docstring
+'''
+Converter benchmarks for pytest-benchmark:
+
+    pytest benchmarks/bench_converters.py --benchmark-autosave
+'''
+import random
+import pytest
+from .converters import make_processor
+from .corpora import CORPORA
+
+pytest.importorskip('pytest_benchmark')
+
+EVENTS = 1000
+
+@pytest.mark.parametrize('name', list(CORPORA))
+def test_convert(benchmark, tmp_path, name):
+    corpus = CORPORA[name]
+    lines = corpus.generate(random.Random(42), EVENTS, str(tmp_path))
+    process = make_processor(corpus)
+
+    def run():
+        for line in lines:
+            process(line)
+
+    benchmark.extra_info['events'] = EVENTS
+    benchmark(run)
@@ -0,0 +1,236 @@
+'''
+Per-connector conversion benchmark
+
+For each corpus, measures the conversion path of Connector.alert (JSON decoding,
+filtering and conversion, without the HTTP POST):
+    - events/s
+    - p50/p99 per-event latency
+    - allocated bytes per event (tracemalloc peak, measured in a separate pass)
+
+Results can be saved as a baseline file and compared against it, so that regressions
+are visible. Baselines depend on the machine and are not part of the source tree.
+'''
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable
+from .corpora import CORPORA, Corpus
+
+# Metrics compared to baseline: name -> True if higher is better
+_COMPARED = {
+    'events_per_s': True,
+    'p50_us': False,
+    'p99_us': False,
+    'alloc_bytes_per_event': False,
+}
+
+def percentile(sorted_values: list, p: float):
+    '''
+    Nearest-rank percentile of an already sorted list
+
+    Args:
+        sorted_values (list): values, sorted in increasing order
+        p (float): percentile, between 0 and 100
+
+    Returns:
+        the percentile value, 0 if list is empty
+    '''
+    if not sorted_values:
+        return 0
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[rank]
+
+def make_processor(corpus: Corpus) -> Callable[[str], tuple]:
+    '''
+    Returns a function processing one line the way Connector.alert does, minus the POST
+    '''
+    converter = corpus.converter()
+    if corpus.json_lines:
+        return lambda line: converter.convert(json.loads(line))
+    return converter.convert
+
+def load_corpus(corpus: Corpus, count: int, seed: int, workdir: str,
+                corpus_dir: str | None = None) -> list[str]:
+    '''
+    Load a recorded corpus from corpus_dir if available, otherwise generate it
+    '''
+    if corpus_dir is not None:
+        lines = corpus.load(corpus_dir)
+        if lines is not None:
+            return lines
+    return corpus.generate(random.Random(seed), count, workdir)
+
+def measure(corpus: Corpus, lines: list[str], warmup: int = 100) -> dict:
+    '''
+    Run the conversion benchmark on a list of lines
+
+    Args:
+        corpus (Corpus): the corpus describing how to convert lines
+        lines (list[str]): the input lines
+        warmup (int, optional): number of lines converted before measuring. Defaults to 100.
+
+    Returns:
+        dict: the measured metrics
+    '''
+    process = make_processor(corpus)
+    for line in lines[:warmup]:
+        process(line)
+
+    latencies = []
+    converted = 0
+    clock = time.perf_counter_ns
+    start = clock()
+    for line in lines:
+        t0 = clock()
+        (c, _) = process(line)
+        latencies.append(clock() - t0)
+        converted += bool(c)
+    elapsed = (clock() - start) / 1e9
+
+    alloc = 0
+    tracemalloc.start()
+    try:
+        for line in lines:
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            process(line)
+            _, peak = tracemalloc.get_traced_memory()
+            alloc += peak - current
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        'events': len(lines),
+        'converted': converted,
+        'filtered': len(lines) - converted,
+        'events_per_s': round(len(lines) / elapsed, 1) if elapsed > 0 else 0.0,
+        'p50_us': round(percentile(latencies, 50) / 1000, 2),
+        'p99_us': round(percentile(latencies, 99) / 1000, 2),
+        'alloc_bytes_per_event': round(alloc / len(lines)) if lines else 0,
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    '''
+    Compare results to a baseline
+
+    Args:
+        results (dict): results, mapping corpus name to metrics
+        baseline (dict): baseline results, same format
+        tolerance (float): allowed relative degradation, e.g. 0.2 for 20%
+
+    Returns:
+        list[str]: a human readable description of each regression
+    '''
+    regressions = []
+    for name, metrics in results.items():
+        reference = baseline.get(name)
+        if reference is None:
+            continue
+        for metric, higher_is_better in _COMPARED.items():
+            old, new = reference.get(metric), metrics.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+def _print_table(results: dict, baseline: dict):
+    header = f"{'corpus':<12} {'events/s':>11} {'p50 us':>9} {'p99 us':>9} {'alloc B/ev':>11}"
+    print(header)
+    print('-' * len(header))
+    for name, m in results.items():
+        line = (f"{name:<12} {m['events_per_s']:>11.1f} {m['p50_us']:>9.2f} "
+                f"{m['p99_us']:>9.2f} {m['alloc_bytes_per_event']:>11}")
+        reference = baseline.get(name)
+        if reference and reference.get('events_per_s'):
+            change = m['events_per_s'] / reference['events_per_s'] - 1
+            line += f"  ({change:+.1%} events/s vs baseline)"
+        print(line)
+
+def parse_options(args=None):
+    '''
+    Parse command line options
+    '''
+    parser = argparse.ArgumentParser(description='Benchmark IDMEFv2 connectors conversion')
+    parser.add_argument('corpora', nargs='*', metavar='CORPUS',
+                        help=f"corpora to run, all if none given, among {', '.join(CORPORA)}")
+    parser.add_argument('-n', '--events', type=int, default=5000,
+                        help='number of generated events per corpus')
+    parser.add_argument('--seed', type=int, default=42, help='seed for corpus generation')
+    parser.add_argument('--corpus-dir', help='load recorded corpora from this directory')
+    parser.add_argument('--record', metavar='DIR', help='record generated corpora in DIR')
+    parser.add_argument('--workdir',
+                        help='directory for snapshot files, a temporary directory by default')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare results to the baseline FILE')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='save results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed relative degradation before reporting a regression')
+    parser.add_argument('--json', metavar='FILE', help='write results as JSON to FILE')
+    options = parser.parse_args(args)
+    if options.save_baseline and options.baseline is None:
+        parser.error("--save-baseline requires --baseline")
+    for name in options.corpora:
+        if name not in CORPORA:
+            parser.error(f"unknown corpus {name}")
+    return options
+
+def main(args=None) -> int:
+    '''
+    Benchmark command line entry point
+
+    Returns:
+        int: exit status, 1 if a regression against the baseline was detected
+    '''
+    options = parse_options(args)
+    names = options.corpora or list(CORPORA)
+
+    baseline = {}
+    if options.baseline is not None and os.path.isfile(options.baseline):
+        with open(options.baseline, encoding='utf-8') as f:
+            baseline = json.load(f).get('results', {})
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = options.workdir or tmpdir
+        for name in names:
+            corpus = CORPORA[name]
+            lines = load_corpus(corpus, options.events, options.seed, workdir, options.corpus_dir)
+            if options.record:
+                corpus.record(options.record, lines)
+            results[name] = measure(corpus, lines)
+
+    _print_table(results, baseline)
+
+    report = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if options.save_baseline:
+        with open(options.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"baseline saved to {options.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, options.tolerance)
+    for r in regressions:
+        print(f"REGRESSION {r}")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,462 @@
+'''
+Synthetic corpora for converter benchmarks
+
+Each corpus is a list of raw input lines, as read by the connector from the tool log
+(JSON lines for most tools, text lines for Samhain). Corpora are generated
+deterministically from a seed, and can be recorded to and loaded from a directory
+so that the same input can be replayed across releases.
+'''
+# pylint: disable=import-outside-toplevel
+import datetime
+import importlib
+import json
+import os
+import random
+from dataclasses import dataclass
+from typing import Callable
+
+_EPOCH = datetime.datetime(2025, 4, 16, 9, 0, 0, tzinfo=datetime.timezone.utc)
+
+def _timestamp(rng: random.Random, fmt: str = '%Y-%m-%dT%H:%M:%S.%f%z') -> str:
+    return (_EPOCH + datetime.timedelta(seconds=rng.uniform(0, 86400))).strftime(fmt)
+
+def _ipv4(rng: random.Random) -> str:
+    return '.'.join(str(rng.randint(1, 254)) for _ in range(4))
+
+def _private_ipv4(rng: random.Random) -> str:
+    return f"192.168.{rng.randint(0, 3)}.{rng.randint(1, 254)}"
+
+def _hexdigest(rng: random.Random, n: int) -> str:
+    return ''.join(rng.choice('0123456789abcdef') for _ in range(n))
+
+def _fake_jpeg(rng: random.Random, size: int) -> bytes:
+    return b'\xff\xd8\xff\xe0' + rng.randbytes(size - 6) + b'\xff\xd9'
+
+_SURICATA_SIGNATURES = [
+    ('ET SCAN Potential SSH Scan', 'Attempted Information Leak', 2),
+    ('ET POLICY curl User-Agent Outbound', 'Attempted Information Leak', 2),
+    ('GPL ATTACK_RESPONSE id check returned root', 'Potentially Bad Traffic', 2),
+    ('ET HUNTING GENERIC SUSPICIOUS POST to Dotted Quad', 'Potentially Bad Traffic', 2),
+    ('ET EXPLOIT Apache log4j RCE Attempt', 'Attempted Administrator Privilege Gain', 1),
+    ('SURICATA IPv4 truncated packet', 'Generic Protocol Command Decode', 3),
+]
+
+def suricata(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    Suricata EVE lines: a mix of alerts (some filtered out) and flow, dns and http events
+    '''
+    lines = []
+    for _ in range(n):
+        event = {
+            'timestamp': _timestamp(rng),
+            'flow_id': rng.getrandbits(50),
+            'in_iface': 'eth0',
+            'src_ip': _ipv4(rng),
+            'src_port': rng.randint(1024, 65535),
+            'dest_ip': _private_ipv4(rng),
+            'dest_port': rng.choice([22, 53, 80, 443, 8080]),
+            'proto': rng.choice(['TCP', 'UDP']),
+            'pkt_src': 'wire/pcap',
+        }
+        kind = rng.random()
+        if kind < 0.4:
+            signature, category, severity = rng.choice(_SURICATA_SIGNATURES)
+            event['event_type'] = 'alert'
+            event['alert'] = {
+                'action': 'allowed',
+                'gid': 1,
+                'signature_id': rng.randint(2000000, 2100000),
+                'rev': rng.randint(1, 10),
+                'signature': signature,
+                'category': category,
+                'severity': severity,
+                'metadata': {'created_at': ['2010_09_23'], 'updated_at': ['2019_07_26']},
+            }
+            event['app_proto'] = 'http'
+        elif kind < 0.7:
+            event['event_type'] = 'flow'
+            event['flow'] = {
+                'pkts_toserver': rng.randint(1, 100),
+                'pkts_toclient': rng.randint(1, 100),
+                'bytes_toserver': rng.randint(60, 100000),
+                'bytes_toclient': rng.randint(60, 100000),
+                'start': event['timestamp'],
+                'end': event['timestamp'],
+                'age': rng.randint(0, 120),
+                'state': 'closed',
+                'reason': 'timeout',
+                'alerted': False,
+            }
+        elif kind < 0.85:
+            event['event_type'] = 'dns'
+            event['dns'] = {'type': 'query', 'id': rng.randint(0, 65535),
+                            'rrname': f"host{rng.randint(0, 999)}.example.org", 'rrtype': 'A'}
+        else:
+            event['event_type'] = 'http'
+            event['http'] = {'hostname': 'testmynids.org', 'url': '/uid/index.html',
+                             'http_user_agent': 'curl/8.5.0', 'http_method': 'GET',
+                             'protocol': 'HTTP/1.1', 'status': 200, 'length': 39}
+        lines.append(json.dumps(event))
+    return lines
+
+def wazuh(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    Wazuh alerts.json lines: syscheck alerts mixed with non-FIM alerts (filtered out)
+    '''
+    lines = []
+    for i in range(n):
+        alert = {
+            'timestamp': _timestamp(rng, '%Y-%m-%dT%H:%M:%S.%f+0000'),
+            'agent': {'id': f"{rng.randint(1, 50):03d}", 'name': f"agent-{rng.randint(1, 50)}",
+                      'ip': _private_ipv4(rng)},
+            'manager': {'name': 'wazuh.manager'},
+            'id': f"1744794218.{i}",
+            'decoder': {'name': 'syscheck_integrity_changed'},
+        }
+        if rng.random() < 0.6:
+            path = f"/etc/app{rng.randint(0, 99)}/config.ini"
+            alert['rule'] = {'level': rng.choice([5, 7, 7, 12]),
+                             'description': 'Integrity checksum changed.', 'id': '550',
+                             'groups': ['ossec', 'syscheck', 'syscheck_file']}
+            alert['full_log'] = f"File '{path}' modified\nMode: realtime\n"
+            alert['syscheck'] = {
+                'path': path,
+                'mode': 'realtime',
+                'size_after': str(rng.randint(1, 100000)),
+                'perm_after': 'rw-r--r--',
+                'md5_after': _hexdigest(rng, 32),
+                'sha1_after': _hexdigest(rng, 40),
+                'sha256_after': _hexdigest(rng, 64),
+                'uname_after': 'root',
+                'event': 'modified',
+            }
+            alert['location'] = 'syscheck'
+        else:
+            alert['rule'] = {'level': 3, 'description': 'Successful sudo to ROOT executed.',
+                             'id': '5402', 'groups': ['syslog', 'sudo']}
+            alert['full_log'] = 'sudo: user : TTY=pts/0 ; PWD=/root ; USER=root ; COMMAND=/bin/ls'
+            alert['location'] = '/var/log/auth.log'
+        lines.append(json.dumps(alert))
+    return lines
+
+_ZABBIX_TRIGGERS = ['Zabbix agent is not available', 'High CPU utilization',
+                    'Load average is too high', 'Host is down', 'Free disk space is less than 5%']
+
+def zabbix(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    Zabbix problems, as enriched by the poller before conversion
+    '''
+    lines = []
+    for i in range(n):
+        host = f"host-{rng.randint(1, 500)}"
+        problem = {
+            'eventid': str(100000 + i),
+            'source': '0',
+            'object': '0',
+            'objectid': str(rng.randint(10000, 30000)),
+            'clock': str(int(_EPOCH.timestamp()) + rng.randint(0, 86400)),
+            'ns': str(rng.randint(0, 999999999)),
+            'r_eventid': '0',
+            'name': f"{rng.choice(_ZABBIX_TRIGGERS)} on {host}",
+            'severity': str(rng.randint(0, 5)),
+            'acknowledged': '0',
+            'suppressed': '0',
+            'hosts': [{'name': host}],
+            'extra': {'ip': _private_ipv4(rng), 'port': 10050},
+            'extra_target': {'hostname': 'zabbix-server', 'ip': '192.168.0.1', 'port': 80},
+        }
+        lines.append(json.dumps(problem))
+    return lines
+
+_PROMETHEUS_ALERTS = ['InstanceDown', 'HighCpuUsage', 'HighMemoryUsage', 'DiskAlmostFull',
+                      'SlowRequests', 'TargetMissing']
+
+def prometheus(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    Prometheus /api/v1/alerts entries, mostly firing with some pending (filtered out)
+    '''
+    lines = []
+    for _ in range(n):
+        alert = {
+            'labels': {
+                'alertname': rng.choice(_PROMETHEUS_ALERTS),
+                'severity': rng.choice(['critical', 'warning', 'info']),
+                'instance': f"node-{rng.randint(1, 300)}:9100",
+                'job': 'node',
+            },
+            'annotations': {'summary': 'Instance has been unreachable for more than 5 minutes'},
+            'state': 'firing' if rng.random() < 0.8 else 'pending',
+            'activeAt': _timestamp(rng, '%Y-%m-%dT%H:%M:%S.%f123+00:00'),
+            'value': f"{rng.random():.6e}",
+        }
+        lines.append(json.dumps(alert))
+    return lines
+
+def tpot(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    T-Pot Elasticsearch _source documents from Cowrie, Dionaea and Honeytrap
+    '''
+    lines = []
+    for _ in range(n):
+        sensor = rng.choice(['Cowrie', 'Cowrie', 'Dionaea', 'Honeytrap'])
+        hit = {
+            '@timestamp': _timestamp(rng, '%Y-%m-%dT%H:%M:%S.%fZ'),
+            'type': sensor,
+            'src_ip': _ipv4(rng),
+            'src_port': str(rng.randint(1024, 65535)),
+            'dest_ip': '198.51.100.20',
+            'dest_port': str(rng.choice([22, 23, 445, 1433, 3306])),
+            'geoip': {'country_name': 'Nowhere', 'ip': _ipv4(rng)},
+        }
+        if sensor == 'Cowrie':
+            hit['eventid'] = rng.choice(['cowrie.login.failed', 'cowrie.session.connect'])
+            hit['username'] = rng.choice(['root', 'admin', 'pi'])
+            hit['password'] = rng.choice(['123456', 'admin', 'raspberry'])
+            if rng.random() < 0.5:
+                hit['message'] = f"login attempt [{hit['username']}/{hit['password']}] failed"
+        elif sensor == 'Dionaea':
+            hit['connection'] = {'protocol': rng.choice(['smbd', 'mssqld', 'mysqld'])}
+            hit['username'] = 'sa'
+            hit['password'] = rng.choice(['none', 'password'])
+        if rng.random() < 0.1:
+            del hit['dest_ip']
+        lines.append(json.dumps(hit))
+    return lines
+
+_MODSECURITY_RULES = [
+    ('SQL Injection Attack Detected via libinjection', ['attack-sqli'], 2),
+    ('XSS Attack Detected via libinjection', ['attack-xss'], 2),
+    ('Remote Command Execution: Unix Shell Code Found', ['attack-rce'], 2),
+    ('Request Missing a User Agent Header', ['protocol-violation'], 5),
+    ('Inbound Anomaly Score Exceeded', ['anomaly-evaluation'], 4),
+]
+
+def modsecurity(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    ModSecurity JSON audit log entries, some without messages (filtered out)
+    '''
+    lines = []
+    for _ in range(n):
+        timestamp = _EPOCH + datetime.timedelta(seconds=rng.uniform(0, 86400))
+        messages = []
+        for _ in range(rng.choice([0, 1, 1, 2])):
+            text, tags, severity = rng.choice(_MODSECURITY_RULES)
+            messages.append({
+                'message': text,
+                'details': {'match': 'Matched Data found', 'reference': 'o0,4v26,4',
+                            'ruleId': str(rng.randint(911100, 949110)), 'file': 'REQUEST-942.conf',
+                            'lineNumber': str(rng.randint(1, 1000)), 'data': '',
+                            'severity': severity, 'ver': 'OWASP_CRS/3.3.2', 'rev': '',
+                            'tags': ['application-multi', 'language-multi'] + tags,
+                            'maturity': '0', 'accuracy': '0'},
+            })
+        entry = {
+            'transaction': {
+                'client_ip': _ipv4(rng),
+                'time_stamp': timestamp.strftime('%a %b %d %H:%M:%S %Y'),
+                'server_id': _hexdigest(rng, 40),
+                'client_port': rng.randint(1024, 65535),
+                'host_ip': '10.0.0.20',
+                'host_port': 80,
+                'unique_id': _hexdigest(rng, 20),
+                'request': {'method': 'GET', 'http_version': 1.1,
+                            'uri': f"/index.php?id={rng.randint(0, 1000)}' OR 1=1--",
+                            'headers': {'Host': 'www.example.org', 'Accept': '*/*'}},
+                'response': {'http_code': rng.choice([200, 403]),
+                             'headers': {'Server': 'nginx', 'Content-Type': 'text/html'}},
+                'producer': {'modsecurity': 'ModSecurity v3.0.8 (Linux)',
+                             'connector': 'ModSecurity-nginx v1.0.3',
+                             'secrules_engine': 'Enabled'},
+                'messages': messages,
+            }
+        }
+        lines.append(json.dumps(entry))
+    return lines
+
+def samhain(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    Samhain log lines: policy violations, informational lines and unparsable noise
+    '''
+    lines = []
+    for _ in range(n):
+        ts = _timestamp(rng, '%Y-%m-%dT%H:%M:%S%z')
+        kind = rng.random()
+        if kind < 0.6:
+            path = f"/usr/bin/tool{rng.randint(0, 999)}"
+            lines.append(
+                f"CRIT   :  [{ts}] msg=<POLICY [ReadOnly] C--------TS>, path=<{path}>, "
+                f"size_old=<{rng.randint(1000, 99999)}>, size_new=<{rng.randint(1000, 99999)}>, "
+                f"chksum_old=<{_hexdigest(rng, 48)}>, chksum_new=<{_hexdigest(rng, 48)}>")
+        elif kind < 0.9:
+            lines.append(f"INFO   :  [{ts}] msg=<Checking>, path=</etc>")
+        else:
+            lines.append("      " + _hexdigest(rng, 40))
+    return lines
+
+def kismet(rng: random.Random, n: int, _workdir: str) -> list[str]:
+    '''
+    Kismet alerts from the /alerts/all_alerts.json endpoint
+    '''
+    headers = ['DEAUTHFLOOD', 'APSPOOF', 'PROBECHAN', 'BCASTDISCON', 'NOCLIENTMFP']
+    lines = []
+    for _ in range(n):
+        mac = ':'.join(f"{rng.randint(0, 255):02x}" for _ in range(6))
+        alert = {
+            'kismet.alert.timestamp': _EPOCH.timestamp() + rng.uniform(0, 86400),
+            'kismet.alert.severity': rng.randint(0, 20),
+            'kismet.alert.header': rng.choice(headers),
+            'kismet.alert.source_mac': mac,
+            'kismet.alert.dest_mac': 'ff:ff:ff:ff:ff:ff',
+            'kismet.alert.channel': str(rng.randint(1, 13)),
+            'kismet.alert.text': f"Unsolicited deauthentication from {mac}",
+            'kismet.alert.class': 'DENIAL',
+        }
+        lines.append(json.dumps(alert))
+    return lines
+
+def motion(rng: random.Random, n: int, workdir: str) -> list[str]:
+    '''
+    Motion events, as written by motion2json.sh: event lifecycle plus snapshots on disk
+    '''
+    snapshots = os.path.join(workdir, 'motion')
+    os.makedirs(snapshots, exist_ok=True)
+    lines = []
+    event_id = 0
+    for i in range(n):
+        kind = rng.random()
+        date = _timestamp(rng, '%Y-%m-%d %H:%M:%S')
+        camera = str(rng.randint(1, 4))
+        event = {'date': date, 'host': 'motion', 'camera_id': camera}
+        if kind < 0.1:
+            event_id += 1
+            event.update(event_name='event_start', event_id=str(event_id))
+        elif kind < 0.2:
+            event.update(event_name='event_end', event_id=str(event_id))
+        elif kind < 0.25:
+            event.update(event_name='movie_end', event_id=str(event_id),
+                         file=os.path.join(snapshots, f"{event_id}.mkv"))
+        elif kind < 0.27:
+            event.update(event_name='camera_lost', event_id=str(event_id))
+        else:
+            path = os.path.join(snapshots, f"{i}.jpg")
+            with open(path, 'wb') as f:
+                f.write(_fake_jpeg(rng, rng.randint(20000, 120000)))
+            event.update(event_name='picture_save', event_id=str(event_id), file=path)
+        lines.append(json.dumps(event))
+    return lines
+
+def zoneminder(rng: random.Random, n: int, workdir: str) -> list[str]:
+    '''
+    Zoneminder events, as written by zm2json.sh, with a snapshot.jpg per event directory
+    '''
+    lines = []
+    for i in range(n):
+        event_dir = os.path.join(workdir, 'zoneminder', str(i))
+        os.makedirs(event_dir, exist_ok=True)
+        with open(os.path.join(event_dir, 'snapshot.jpg'), 'wb') as f:
+            f.write(_fake_jpeg(rng, rng.randint(50000, 250000)))
+        event = {
+            'ET': _timestamp(rng, '%Y-%m-%d %H:%M:%S'),
+            'ED': f"/event/{i}",
+            'MN': f"Camera-{rng.randint(1, 8)}",
+            'EDP': event_dir,
+        }
+        lines.append(json.dumps(event))
+    return lines
+
+def _suricata_converter():
+    from idmefv2.connectors.suricata.suricataconverter import SuricataConverter
+    return SuricataConverter()
+
+def _wazuh_converter():
+    from idmefv2.connectors.wazuh.wazuhconverter import WazuhConverter
+    return WazuhConverter()
+
+def _zabbix_converter():
+    from idmefv2.connectors.zabbix.zabbixconverter import ZabbixConverter
+    return ZabbixConverter(['polling'])
+
+def _prometheus_converter():
+    from idmefv2.connectors.prometheus.prometheusconverter import PrometheusConverter
+    return PrometheusConverter()
+
+def _tpot_converter():
+    module = importlib.import_module('idmefv2.connectors.t-pot.tpotconverter')
+    return module.TpotConverter()
+
+def _modsecurity_converter():
+    from idmefv2.connectors.modsecurity.modsecurityconverter import ModSecurityConverter
+    return ModSecurityConverter()
+
+def _samhain_converter():
+    from idmefv2.connectors.samhain.samhainconverter import SamhainConverter
+    return SamhainConverter()
+
+def _kismet_converter():
+    from idmefv2.connectors.kismet.kismetconverter import KismetConverter
+    return KismetConverter()
+
+def _motion_converter():
+    from idmefv2.connectors.motion import motionconverter as m
+    return m.MotionConverter(m.MotionPictureSaveConverter(), m.MotionCameraLostConverter(),
+                             m.MotionEventStartConverter(8081), m.MotionEventEndConverter(),
+                             m.MotionMovieEndConverter())
+
+def _zoneminder_converter():
+    from idmefv2.connectors.zoneminder.zoneminderconverter import ZoneminderConverter
+    return ZoneminderConverter()
+
+@dataclass(frozen=True)
+class Corpus:
+    '''
+    A benchmark corpus: how to generate its lines and how to build its converter
+
+    Attributes:
+        name: corpus name, also the name of the recorded file
+        generate: function (rng, count, workdir) returning a list of lines
+        converter: function returning a new converter
+        json_lines: True if lines are JSON and must be decoded before conversion,
+            as Connector.alert does
+    '''
+    name: str
+    generate: Callable[[random.Random, int, str], list[str]]
+    converter: Callable[[], object]
+    json_lines: bool = True
+
+    def path(self, directory: str) -> str:
+        '''
+        Path of this corpus file in a recording directory
+        '''
+        return os.path.join(directory, self.name + ('.jsonl' if self.json_lines else '.log'))
+
+    def load(self, directory: str) -> list[str] | None:
+        '''
+        Load a recorded corpus, None if not recorded in directory
+        '''
+        path = self.path(directory)
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding='utf-8') as f:
+            return [line.rstrip('\n') for line in f if line.strip()]
+
+    def record(self, directory: str, lines: list[str]) -> None:
+        '''
+        Record a corpus in directory
+        '''
+        os.makedirs(directory, exist_ok=True)
+        with open(self.path(directory), 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line + '\n')
+
+CORPORA = {c.name: c for c in [
+    Corpus('suricata', suricata, _suricata_converter),
+    Corpus('wazuh', wazuh, _wazuh_converter),
+    Corpus('zabbix', zabbix, _zabbix_converter),
+    Corpus('prometheus', prometheus, _prometheus_converter),
+    Corpus('tpot', tpot, _tpot_converter),
+    Corpus('modsecurity', modsecurity, _modsecurity_converter),
+    Corpus('samhain', samhain, _samhain_converter, json_lines=False),
+    Corpus('kismet', kismet, _kismet_converter),
+    Corpus('motion', motion, _motion_converter),
+    Corpus('zoneminder', zoneminder, _zoneminder_converter),
+]}
@@ -0,0 +1,325 @@
+'''
+End-to-end load generator and throughput harness
+
+Measures the whole connector path: tail -> convert -> POST, using the Suricata connector
+and the bundled test server:
+    - starts the test server in a sub-process
+    - runs a real LogFileConnector (or SuricataUnixSocketConnector) in a thread
+    - writes synthetic EVE alerts into a temporary file (or streams them into the Unix
+      socket) at controlled rates
+    - records when each IDMEFv2 message is acknowledged by the test server
+
+Each synthetic alert carries its write time as Suricata timestamp, which the converter
+copies into IDMEFv2 CreateTime: end-to-end latency is the time between this write time
+and the acknowledge of the POST. The report gives for each rate the latency
+distribution, the achieved throughput and the loss, and the sustained maximum throughput.
+
+    python -m benchmarks.e2e --rates 100,500,1000,2000 --duration 10 --report e2e.json
+'''
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from argparse import Namespace
+from importlib import metadata
+from idmefv2.connectors.configuration import Configuration
+from idmefv2.connectors.connector import LogFileConnector
+from idmefv2.connectors.suricata.__main__ import SuricataUnixSocketConnector
+from idmefv2.connectors.suricata.suricataconverter import SuricataConverter
+from .converters import percentile
+
+_CONF = '''[logging]
+level = {level}
+
+[idmefv2]
+url = http://127.0.0.1:{port}
+'''
+
+class Recorder:
+    '''
+    Records acknowledged IDMEFv2 messages, by wrapping the connector IDMEFv2 client
+    '''
+    def __init__(self, client):
+        self._post = client.post
+        self._lock = threading.Lock()
+        self.stage = None
+        self.latencies = []
+        self.errors = 0
+        self.last_ack = 0.0
+        client.post = self.post
+
+    def post(self, idmefv2: dict):
+        '''
+        POST the message using the wrapped client and record the latency
+        '''
+        try:
+            self._post(idmefv2)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            raise
+        now = time.time()
+        if idmefv2.get('Description') != self.stage:
+            return
+        written = datetime.datetime.fromisoformat(idmefv2['CreateTime']).timestamp()
+        with self._lock:
+            self.latencies.append(now - written)
+            self.last_ack = now
+
+    def reset(self, stage: str):
+        '''
+        Start recording a new stage, messages of previous stages are ignored
+        '''
+        with self._lock:
+            self.stage = stage
+            self.latencies = []
+            self.errors = 0
+            self.last_ack = 0.0
+
+    @property
+    def received(self) -> int:
+        '''
+        Number of messages acknowledged in current stage
+        '''
+        return len(self.latencies)
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _wait_for_port(server: subprocess.Popen, port: int, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = server.poll()
+        if status is not None:
+            raise RuntimeError(f"test server exited with status {status}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"test server not listening on port {port}")
+
+def start_testserver(port: int, extra_args: list[str]) -> subprocess.Popen:
+    '''
+    Start the test server in a sub-process and wait until it listens
+    '''
+    cmd = [sys.executable, '-m', 'idmefv2.connectors.testserver',
+           '--port', str(port), '--log-level', 'WARNING'] + extra_args
+    # pylint: disable=consider-using-with
+    server = subprocess.Popen(cmd)
+    try:
+        _wait_for_port(server, port, 10.0)
+    except TimeoutError:
+        server.kill()
+        raise
+    return server
+
+def make_line(stage: str) -> bytes:
+    '''
+    A synthetic Suricata EVE alert, timestamped with current time
+    '''
+    now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    return (b'{"timestamp":"' + now.encode() + b'","event_type":"alert","src_ip":"192.0.2.1",'
+            b'"src_port":40000,"dest_ip":"198.51.100.1","dest_port":80,"proto":"TCP",'
+            b'"alert":{"action":"allowed","gid":1,"signature_id":2000001,"rev":1,'
+            b'"signature":"E2E load test","category":"' + stage.encode() + b'","severity":2}}\n')
+
+def write_lines(write, stage: str, rate: float, duration: float) -> tuple[int, float]:
+    '''
+    Write lines at a given rate, in bursts every millisecond
+
+    Args:
+        write: function writing a line
+        stage (str): stage name, carried in alert category
+        rate (float): lines per second
+        duration (float): duration in seconds
+
+    Returns:
+        tuple[int, float]: number of lines written and elapsed time
+    '''
+    count = int(rate * duration)
+    start = time.perf_counter()
+    for i in range(count):
+        delay = start + i / rate - time.perf_counter()
+        if delay > 0.001:
+            time.sleep(delay)
+        write(make_line(stage))
+    return count, time.perf_counter() - start
+
+# pylint: disable=too-many-arguments,too-many-positional-arguments
+def run_stage(recorder: Recorder, write, index: int, rate: float, duration: float,
+              drain: float) -> dict:
+    '''
+    Run one load stage and wait for messages to be acknowledged
+
+    Returns:
+        dict: the stage report
+    '''
+    stage = f"e2e-stage-{index}"
+    recorder.reset(stage)
+    first_write = time.time()
+    sent, elapsed = write_lines(write, stage, rate, duration)
+    deadline = time.monotonic() + drain
+    while recorder.received < sent and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+    latencies = sorted(recorder.latencies)
+    received = len(latencies)
+    span = (recorder.last_ack - first_write) if received else 0.0
+    return {
+        'target_rate': rate,
+        'sent': sent,
+        'write_rate': round(sent / elapsed, 1) if elapsed > 0 else 0.0,
+        'received': received,
+        'lost': sent - received,
+        'post_errors': recorder.errors,
+        'throughput': round(received / span, 1) if span > 0 else 0.0,
+        'latency_ms': {
+            'mean': round(1000 * sum(latencies) / received, 3) if received else None,
+            'p50': round(1000 * percentile(latencies, 50), 3),
+            'p90': round(1000 * percentile(latencies, 90), 3),
+            'p99': round(1000 * percentile(latencies, 99), 3),
+            'max': round(1000 * latencies[-1], 3) if received else None,
+        },
+    }
+
+def sustained_max_throughput(stages: list[dict]) -> float:
+    '''
+    Highest throughput of stages without loss and keeping up with their target rate
+    '''
+    sustained = [s['throughput'] for s in stages
+                 if s['lost'] == 0 and s['post_errors'] == 0
+                 and s['throughput'] >= 0.95 * s['target_rate']]
+    return max(sustained, default=0.0)
+
+def _version() -> str:
+    try:
+        return metadata.version('idmefv2-connectors')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+def _connect(path: str, timeout: float) -> socket.socket:
+    deadline = time.monotonic() + timeout
+    while True:
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.connect(path)
+            return s
+        except OSError:
+            s.close()
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.1)
+
+def run(options: Namespace) -> dict:  # pylint: disable=too-many-locals
+    '''
+    Run the harness
+
+    Returns:
+        dict: the report
+    '''
+    port = options.port or _free_port()
+    server = start_testserver(port, options.server_arg)
+    try:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            conf_file = os.path.join(tmpdir, 'e2e.conf')
+            with open(conf_file, 'w', encoding='utf-8') as f:
+                f.write(_CONF.format(level=options.log_level, port=port))
+            cfg = Configuration(Namespace(conf_file=conf_file))
+            path = os.path.join(tmpdir, 'eve.json' if options.mode == 'file' else 'eve.sock')
+
+            if options.mode == 'file':
+                open(path, 'wb').close()  # pylint: disable=consider-using-with
+                connector = LogFileConnector('suricata', cfg, SuricataConverter(), path)
+            else:
+                connector = SuricataUnixSocketConnector(cfg, SuricataConverter(), path)
+            recorder = Recorder(connector.idmefv2_client)
+            threading.Thread(target=connector.run, daemon=True).start()
+
+            if options.mode == 'file':
+                # pylint: disable=consider-using-with
+                sink = open(path, 'ab', buffering=0)
+                time.sleep(0.5)  # let the tailer seek to end of file
+                write = sink.write
+            else:
+                sink = _connect(path, 5.0)
+                write = sink.sendall
+
+            stages = []
+            try:
+                for index, rate in enumerate(options.rates):
+                    stage = run_stage(recorder, write, index, rate, options.duration,
+                                      options.drain)
+                    stages.append(stage)
+                    logging.warning("rate %.0f/s: throughput %.1f/s, lost %d, p99 %.3f ms",
+                                    rate, stage['throughput'], stage['lost'],
+                                    stage['latency_ms']['p99'])
+            finally:
+                sink.close()
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        'version': _version(),
+        'label': options.label,
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'mode': options.mode,
+        'duration': options.duration,
+        'server_args': options.server_arg,
+        'stages': stages,
+        'sustained_max_throughput': sustained_max_throughput(stages),
+    }
+
+def parse_options(args=None) -> Namespace:
+    '''
+    Parse command line options
+    '''
+    parser = argparse.ArgumentParser(description='End-to-end IDMEFv2 connector load test')
+    parser.add_argument('--mode', choices=['file', 'socket'], default='file',
+                        help='feed the connector through a log file or a Unix socket')
+    parser.add_argument('--rates', default='100,500,1000,2000',
+                        type=lambda s: [float(r) for r in s.split(',')],
+                        help='comma separated list of rates, in lines per second')
+    parser.add_argument('--duration', type=float, default=10.0,
+                        help='duration of each rate stage, in seconds')
+    parser.add_argument('--drain', type=float, default=10.0,
+                        help='maximum time to wait for messages after each stage, in seconds')
+    parser.add_argument('--port', type=int, default=0,
+                        help='test server port, a free port by default')
+    parser.add_argument('--server-arg', action='append', default=[],
+                        help='extra argument passed to the test server, can be repeated')
+    parser.add_argument('--log-level', default='WARNING', help='connector log level')
+    parser.add_argument('--label', default='', help='free text label copied in the report')
+    parser.add_argument('--report', metavar='FILE', help='write JSON report to FILE')
+    return parser.parse_args(args)
+
+def main(args=None) -> int:
+    '''
+    Harness command line entry point
+    '''
+    options = parse_options(args)
+    logging.basicConfig(level=options.log_level)
+    report = run(options)
+    out = json.dumps(report, indent=2)
+    if options.report:
+        with open(options.report, 'w', encoding='utf-8') as f:
+            f.write(out + '\n')
+    else:
+        print(out)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# pylint: disable=missing-function-docstring
+'''
+Prometheus polling benchmark
+
+Measures the cost of a steady-state polling cycle of the Prometheus connector, i.e. when
+all the firing alerts are already known, against a fake /api/v1/alerts endpoint serving
+a payload of N alerts:
+    - legacy: JSON decoding, SHA-256 fingerprint of the serialized labels of each alert,
+      metrics updated per alert and set subtraction, as done before incremental polling
+    - changed: the payload changed, e.g. an alert value: JSON decoding and fingerprint
+      of each alert by joining its sorted labels
+    - unchanged: same payload as the previous cycle, detected by its digest
+    - not modified: the server sends an ETag and answers 304 Not Modified
+
+    python -m benchmarks.prometheus_poll
+    python -m benchmarks.prometheus_poll --alerts 10000 --cycles 20 --json poll.json
+'''
+import argparse
+import hashlib
+import json
+import random
+import statistics
+import sys
+import time
+from argparse import Namespace
+from .corpora import prometheus
+
+class _Response:
+    def __init__(self, status_code: int, content: bytes, headers: dict):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+class _Session:  # pylint: disable=too-few-public-methods
+    '''
+    Fake Prometheus API serving a payload, with an ETag if etag is set
+    '''
+    def __init__(self, content: bytes, etag: bool):
+        self.content = content
+        self.etag = etag
+
+    def get(self, _url, headers=None, **_kwargs) -> _Response:
+        if self.etag and (headers or {}).get('If-None-Match') == '"v1"':
+            return _Response(304, b'', {})
+        return _Response(200, self.content, {'ETag': '"v1"'} if self.etag else {})
+
+def _legacy_fingerprint(alert: dict) -> str:
+    alertname = alert.get('labels', {}).get('alertname', '')
+    active_at = alert.get('activeAt', '')
+    labels_str = json.dumps(alert.get('labels', {}), sort_keys=True)
+    return hashlib.sha256(f"{alertname}:{active_at}:{labels_str}".encode()).hexdigest()[:16]
+
+def _legacy_cycle(content: bytes, seen: set, metrics) -> set:
+    alerts = json.loads(content)['data']['alerts']
+    current = set()
+    for alert in alerts:
+        metrics.events_read.inc()
+        fingerprint = _legacy_fingerprint(alert)
+        current.add(fingerprint)
+        if fingerprint in seen:
+            metrics.dedup_hits.inc()
+            continue
+        seen.add(fingerprint)
+    seen -= seen - current
+    return seen
+
+def _payload(alerts: int, value: str = '') -> bytes:
+    entries = [json.loads(line) for line in prometheus(random.Random(42), alerts, '')]
+    for i, entry in enumerate(entries):
+        entry['labels']['instance'] = f"node-{i}:9100"
+        if value:
+            entry['value'] = value
+    return json.dumps({'status': 'success', 'data': {'alerts': entries}}).encode()
+
+def _metrics():
+    # pylint: disable=import-outside-toplevel
+    from idmefv2.connectors.metrics import ConnectorMetrics, Registry
+    return ConnectorMetrics('prometheus', Registry())
+
+def _poller(content: bytes, etag: bool):
+    # pylint: disable=import-outside-toplevel
+    from idmefv2.connectors.prometheus.poller import PrometheusPoller
+    from idmefv2.connectors.prometheus.prometheusconverter import PrometheusConverter
+    poller = PrometheusPoller(prometheus_url='http://prometheus', client=None,
+                              converter=PrometheusConverter(), metrics=_metrics())
+    poller.session = _Session(content, etag)
+    poller.seed()
+    return poller
+
+def _time(cycle, cycles: int) -> float:
+    samples = []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        cycle()
+        samples.append(time.perf_counter() - start)
+    return round(1000 * statistics.median(samples), 3)
+
+def measure(alerts: int, cycles: int) -> dict:
+    '''
+    Measure the steady-state polling cycle in each mode
+
+    Returns:
+        dict: median cycle time in milliseconds, by mode
+    '''
+    payloads = [_payload(alerts, value) for value in ('1', '2')]
+    seen, metrics = set(), _metrics()
+    _legacy_cycle(payloads[0], seen, metrics)
+    results = {'legacy': _time(lambda: _legacy_cycle(payloads[0], seen, metrics), cycles)}
+
+    poller = _poller(payloads[0], etag=False)
+    turn = [0]
+
+    def changed():
+        turn[0] ^= 1
+        poller.session.content = payloads[turn[0]]
+        poller.poll()
+
+    results['changed'] = _time(changed, cycles)
+    results['unchanged'] = _time(poller.poll, cycles)
+    poller = _poller(payloads[0], etag=True)
+    results['not_modified'] = _time(poller.poll, cycles)
+    results['payload_bytes'] = len(payloads[0])
+    return results
+
+def parse_options(args=None) -> Namespace:
+    '''
+    Parse command line options
+    '''
+    parser = argparse.ArgumentParser(description='Prometheus connector polling benchmark')
+    parser.add_argument('--alerts', type=int, default=10000,
+                        help='number of firing alerts served by the fake Prometheus')
+    parser.add_argument('--cycles', type=int, default=20,
+                        help='number of polling cycles measured per mode')
+    parser.add_argument('--json', metavar='FILE', help='write JSON results to FILE')
+    return parser.parse_args(args)
+
+def main(args=None) -> int:
+    '''
+    Polling benchmark command line entry point
+    '''
+    options = parse_options(args)
+    results = measure(options.alerts, options.cycles)
+    print(f"{options.alerts} alerts, {results['payload_bytes']} bytes payload")
+    for mode in ('legacy', 'changed', 'unchanged', 'not_modified'):
+        print(f"  {mode:<13} {results[mode]:>10.3f} ms/cycle")
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,153 @@
+'''
+Connector startup benchmark
+
+Measures, for each connector, the startup cost paid before the first event is processed:
+    - the wall time of a new interpreter importing the connector main module and
+      constructing its converters, as done by `python -m idmefv2.connectors.X`
+    - the import time of the connector main module, from `python -X importtime`
+    - the time spent constructing the converters, i.e. compiling their templates
+
+Each measure is done in a fresh sub-process, without and with a persisted JSON Path cache
+(IDMEFV2_JSONPATH_CACHE), and the heaviest imports are listed.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup suricata zabbix --runs 20 --json startup.json
+'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from argparse import Namespace
+
+CONNECTORS = ('clamav', 'kismet', 'modsecurity', 'motion', 'prometheus', 'samhain',
+              'suricata', 't-pot', 'wazuh', 'zabbix', 'zoneminder')
+
+# run in the sub-process: import the connector main module and construct the converters
+# it imports, which all have a constructor without argument
+_PROBE = '''
+import importlib, inspect, json, sys, time
+t0 = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+t1 = time.perf_counter()
+from idmefv2.connectors.jsonconverter import JSONConverter, PATH_CACHE
+for obj in list(vars(module).values()):
+    if inspect.isclass(obj) and issubclass(obj, JSONConverter) and obj is not JSONConverter:
+        try:
+            obj()
+        except TypeError:
+            pass
+t2 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'converters': t2 - t1, 'parsed': PATH_CACHE.misses,
+                  'cached': PATH_CACHE.hits}))
+'''
+
+def _module(connector: str) -> str:
+    return f"idmefv2.connectors.{connector}.__main__"
+
+def probe(connector: str, env: dict) -> dict:
+    '''
+    Start a new interpreter importing the connector and constructing its converters
+
+    Returns:
+        dict: wall time of the process, import and converter construction times in
+        seconds, number of JSON Paths parsed and found in cache
+    '''
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', _PROBE, _module(connector)], env=env,
+                         check=True, capture_output=True, text=True).stdout
+    result = json.loads(out)
+    result['wall'] = time.perf_counter() - start
+    return result
+
+def import_times(connector: str, env: dict) -> list[tuple[str, int]]:
+    '''
+    Import times of all modules imported by the connector, from `python -X importtime`
+
+    Returns:
+        list[tuple[str, int]]: (module, import time of the module itself excluding its
+        imports, in microseconds), heaviest first
+    '''
+    err = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                          f"import {_module(connector)}"], env=env,
+                         check=True, capture_output=True, text=True).stderr
+    times = []
+    for line in err.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        times.append((name.strip(), int(own)))
+    return sorted(times, key=lambda t: t[1], reverse=True)
+
+def measure(connector: str, runs: int, cache_file: str) -> dict:
+    '''
+    Measure the startup of a connector, without and with a persisted JSON Path cache
+
+    Returns:
+        dict: median times in milliseconds for each mode
+    '''
+    env = dict(os.environ)
+    env.pop('IDMEFV2_JSONPATH_CACHE', None)
+    results = {}
+    for mode in ('cold', 'cached'):
+        if mode == 'cached':
+            env['IDMEFV2_JSONPATH_CACHE'] = cache_file
+            probe(connector, env)  # populate the cache
+        samples = [probe(connector, env) for _ in range(runs)]
+        results[mode] = {
+            key: round(1000 * statistics.median(s[key] for s in samples), 2)
+            for key in ('wall', 'import', 'converters')
+        }
+        results[mode]['parsed'] = samples[-1]['parsed']
+    return results
+
+def _print_table(results: dict):
+    print(f"{'connector':<12} {'mode':<7} {'wall ms':>9} {'import ms':>10} "
+          f"{'convert. ms':>12} {'parsed':>7}")
+    for connector, r in results.items():
+        for mode, m in r['startup'].items():
+            print(f"{connector:<12} {mode:<7} {m['wall']:>9.2f} {m['import']:>10.2f} "
+                  f"{m['converters']:>12.2f} {m['parsed']:>7}")
+
+def parse_options(args=None) -> Namespace:
+    '''
+    Parse command line options
+    '''
+    parser = argparse.ArgumentParser(description='IDMEFv2 connectors startup benchmark')
+    parser.add_argument('connectors', nargs='*', default=list(CONNECTORS),
+                        help='connectors to measure, all by default')
+    parser.add_argument('--runs', type=int, default=10,
+                        help='number of sub-processes started per connector and mode')
+    parser.add_argument('--top', type=int, default=10,
+                        help='number of heaviest imports listed per connector')
+    parser.add_argument('--json', metavar='FILE', help='write JSON results to FILE')
+    return parser.parse_args(args)
+
+def main(args=None) -> int:
+    '''
+    Startup benchmark command line entry point
+    '''
+    options = parse_options(args)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for connector in options.connectors:
+            cache_file = os.path.join(tmpdir, f"{connector}.pickle")
+            results[connector] = {
+                'startup': measure(connector, options.runs, cache_file),
+                'heaviest_imports_us': import_times(connector, dict(os.environ))[:options.top],
+            }
+    _print_table(results)
+    for connector, r in results.items():
+        print(f"\n{connector}: heaviest imports (us, excluding their own imports)")
+        for name, us in r['heaviest_imports_us']:
+            print(f"  {us:>8} {name}")
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
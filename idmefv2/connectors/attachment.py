@@ -0,0 +1,421 @@
+'''
+Loading of files, e.g. camera snapshots, as IDMEFv2 attachments
+
+An AttachmentLoader produces the IDMEFv2 Attachment object of a file:
+    - the file content is base64 encoded by chunks, so that the whole file is never held
+      in memory together with its encoding
+    - files bigger than max_size are replaced by a thumbnail if Pillow is installed and
+      a thumbnail size is configured, or else attached by reference only: file name and
+      size, without content
+
+Loading can be deferred to an AttachmentStage: converters then produce a
+DeferredAttachment, loaded by a worker pool which also POSTs the message, so that reading
+and encoding big files does not stall the connector loop. Messages are then no longer
+POSTed in order.
+
+An AttachmentCache avoids encoding again the same content, e.g. Motion snapshots of a
+static scene: encoded contents are kept in a LRU cache, looked up by file identity (device,
+inode, modification time and size) and by SHA-256 digest of the content. Optionally, a
+content already attached recently is attached by reference only, with its digest as Hash.
+
+Loading is configured by the [attachments] section of the configuration:
+    - max_size: maximum size in bytes of attached files, 0 for no limit (default)
+    - thumbnail: maximum thumbnail size, e.g. 640x480, for files over max_size
+    - workers: number of workers of the attachment stage, 0 to load attachments during
+      conversion (default)
+    - cache_entries: maximum number of contents in cache, 0 to disable the cache (default)
+    - cache_max_bytes: maximum size of encoded contents in cache (default 32 MiB)
+    - hash_reference: attach by reference contents attached less than this number of
+      seconds ago, 0 to disable (default)
+'''
+import base64
+import collections
+import hashlib
+import importlib.util
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from .configuration import Configuration
+from .metrics import REGISTRY, ConnectorMetrics, Registry
+
+# Pillow is optional, only needed for thumbnails: imported on the first thumbnail, so that
+# connectors not making thumbnails do not pay for its import
+HAS_PILLOW = importlib.util.find_spec('PIL') is not None
+
+log = logging.getLogger('attachments')
+
+# pylint: disable=too-few-public-methods
+class DeferredAttachment:
+    '''
+    An attachment to be loaded by the attachment stage, before the message is POSTed
+    '''
+    __slots__ = ('loader', 'path', 'name', 'content_type')
+
+    def __init__(self, loader: 'AttachmentLoader', path: str, name: str, content_type: str):
+        self.loader = loader
+        self.path = path
+        self.name = name
+        self.content_type = content_type
+
+    def load(self) -> dict:
+        '''
+        Returns:
+            dict: the IDMEFv2 Attachment object
+        '''
+        return self.loader.load(self.path, self.name, self.content_type)
+
+# pylint: disable=too-many-instance-attributes
+class AttachmentCache:
+    '''
+    LRU cache of base64 encoded file contents, bounded in number of contents and bytes
+    '''
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, max_entries: int = 64, max_bytes: int = 32 * 1024 * 1024,
+                 reference_ttl: float = 0.0, connector: str = '', registry: Registry = REGISTRY):
+        '''
+        Args:
+            max_entries (int, optional): maximum number of contents. Defaults to 64.
+            max_bytes (int, optional): maximum total size of encoded contents. Defaults to
+                32 MiB.
+            reference_ttl (float, optional): contents returned less than reference_ttl
+                seconds ago are returned as references, 0 to disable. Defaults to 0.0.
+            connector (str, optional): connector name, label of metrics. Defaults to ''.
+            registry (Registry, optional): metrics registry. Defaults to REGISTRY.
+        '''
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.reference_ttl = reference_ttl
+        self._lock = threading.Lock()
+        self._files = collections.OrderedDict()
+        self._contents = collections.OrderedDict()
+        self._sent = collections.OrderedDict()
+        self.size = 0
+        lookups = registry.counter(
+            'idmefv2_connector_attachment_cache_total',
+            'Attachment cache lookups, by result: file_hit (same file), content_hit (same '
+            'content in another file), miss, reference (attached by reference)',
+            ('connector', 'result'))
+        self._results = {result: lookups.labels(connector, result)
+                         for result in ('file_hit', 'content_hit', 'miss', 'reference')}
+        registry.gauge('idmefv2_connector_attachment_cache_bytes',
+                       'Size of encoded contents in the attachment cache',
+                       ('connector',)).labels(connector).set_function(lambda: self.size)
+
+    def stats(self) -> dict:
+        '''
+        Returns:
+            dict: number of lookups by result, and size of cached contents in bytes
+        '''
+        stats = {result: child.value for result, child in self._results.items()}
+        stats['bytes'] = self.size
+        return stats
+
+    def _store(self, key: tuple, digest: str, content: str):
+        # with self._lock held
+        self._files[key] = digest
+        if len(self._files) > 4 * self.max_entries:
+            self._files.popitem(last=False)
+        if digest in self._contents or len(content) > self.max_bytes:
+            return
+        self._contents[digest] = content
+        self.size += len(content)
+        while len(self._contents) > self.max_entries or self.size > self.max_bytes:
+            _, evicted = self._contents.popitem(last=False)
+            self.size -= len(evicted)
+
+    def _lookup(self, f: io.BufferedIOBase, st: os.stat_result,
+                encode: Callable[[io.BufferedIOBase, int], str],
+                chunk_size: int) -> tuple[str, str]:
+        key = (st.st_dev, st.st_ino, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            digest = self._files.get(key)
+            content = self._contents.get(digest) if digest is not None else None
+            if content is not None:
+                self._files.move_to_end(key)
+                self._contents.move_to_end(digest)
+                self._results['file_hit'].inc()
+                return digest, content
+        sha256 = hashlib.sha256()
+        while chunk := f.read(chunk_size):
+            sha256.update(chunk)
+        digest = sha256.hexdigest()
+        with self._lock:
+            content = self._contents.get(digest)
+            if content is not None:
+                self._contents.move_to_end(digest)
+                self._results['content_hit'].inc()
+        if content is None:
+            f.seek(0)
+            content = encode(f, st.st_size)
+            self._results['miss'].inc()
+        with self._lock:
+            self._store(key, digest, content)
+        return digest, content
+
+    def _recently_sent(self, digest: str) -> bool:
+        if self.reference_ttl <= 0:
+            return False
+        now = time.monotonic()
+        with self._lock:
+            while self._sent and next(iter(self._sent.values())) < now - self.reference_ttl:
+                self._sent.popitem(last=False)
+            if digest in self._sent:
+                return True
+            self._sent[digest] = now
+            if len(self._sent) > 4 * self.max_entries:
+                self._sent.popitem(last=False)
+            return False
+
+    def content(self, f: io.BufferedIOBase, st: os.stat_result,
+                encode: Callable[[io.BufferedIOBase, int], str],
+                chunk_size: int = 3 * 64 * 1024) -> tuple[str, str]:
+        '''
+        Returns the encoded content of a file, from cache if possible
+
+        The file is hashed by chunks, then encoded by encode if its content is not in
+        cache, so that the whole file is never held in memory.
+
+        Args:
+            f (io.BufferedIOBase): the file, opened in binary mode and seekable
+            st (os.stat_result): status of the file
+            encode (Callable): encodes a file given its size, e.g. AttachmentLoader.encode
+            chunk_size (int, optional): size of chunks read to hash the file.
+                Defaults to 192 KiB.
+
+        Returns:
+            tuple[str, str]: SHA-256 digest in hexadecimal and base64 encoded content,
+            content being None if the same content was returned less than reference_ttl
+            seconds ago
+        '''
+        digest, content = self._lookup(f, st, encode, chunk_size)
+        if self._recently_sent(digest):
+            self._results['reference'].inc()
+            return digest, None
+        return digest, content
+
+class AttachmentLoader:
+    '''
+    Loads files as IDMEFv2 Attachment objects, with base64 encoded content
+    '''
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, max_size: int = 0, thumbnail: tuple[int, int] = None,
+                 chunk_size: int = 3 * 64 * 1024, deferred: bool = False,
+                 cache: AttachmentCache = None):
+        '''
+        Args:
+            max_size (int, optional): maximum size of attached files, 0 for no limit.
+                Defaults to 0.
+            thumbnail (tuple[int, int], optional): maximum (width, height) of thumbnails of
+                files over max_size. Defaults to None, files over max_size attached by
+                reference.
+            chunk_size (int, optional): size of chunks read and encoded, rounded down to a
+                multiple of 3. Defaults to 192 KiB.
+            deferred (bool, optional): produce DeferredAttachment objects, loaded by an
+                AttachmentStage. Defaults to False.
+            cache (AttachmentCache, optional): cache of encoded contents, attachments then
+                having a Hash. Defaults to None, no cache.
+        '''
+        self.max_size = max_size
+        self.thumbnail = thumbnail
+        self.chunk_size = max(3, chunk_size - chunk_size % 3)
+        self.deferred = deferred
+        self.cache = cache
+
+    @classmethod
+    def from_config(cls, cfg: Configuration, connector: str = '') -> 'AttachmentLoader':
+        '''
+        Creates an attachment loader configured by the [attachments] section
+
+        Args:
+            cfg (Configuration): the configuration
+            connector (str, optional): connector name, label of cache metrics. Defaults to ''.
+        '''
+        thumbnail = cfg.get('attachments', 'thumbnail', fallback=None)
+        if thumbnail is not None:
+            width, height = thumbnail.lower().split('x')
+            thumbnail = (int(width), int(height))
+        cache = None
+        cache_entries = cfg.getint('attachments', 'cache_entries', fallback=0)
+        if cache_entries > 0:
+            cache = AttachmentCache(
+                cache_entries,
+                cfg.getint('attachments', 'cache_max_bytes', fallback=32 * 1024 * 1024),
+                cfg.getfloat('attachments', 'hash_reference', fallback=0.0),
+                connector)
+        return cls(max_size=cfg.getint('attachments', 'max_size', fallback=0),
+                   thumbnail=thumbnail,
+                   deferred=cfg.getint('attachments', 'workers', fallback=0) > 0,
+                   cache=cache)
+
+    def encode(self, f: io.BufferedIOBase, size: int = -1) -> str:
+        '''
+        Base64 encode a file by chunks
+
+        Args:
+            f (io.BufferedIOBase): file opened in binary mode
+            size (int, optional): file size if known, files not bigger than a chunk
+                being read at once. Defaults to -1.
+
+        Returns:
+            str: base64 encoded content
+        '''
+        if 0 <= size <= self.chunk_size:
+            return base64.b64encode(f.read()).decode('ascii')
+        chunks = []
+        while chunk := f.read(self.chunk_size):
+            chunks.append(base64.b64encode(chunk).decode('ascii'))
+        return ''.join(chunks)
+
+    def _thumbnail(self, path: str) -> str:
+        from PIL import Image  # pylint: disable=import-outside-toplevel,import-error
+        with Image.open(path) as image:
+            image.thumbnail(self.thumbnail)
+            out = io.BytesIO()
+            image.convert('RGB').save(out, 'JPEG')
+        out.seek(0)
+        return self.encode(out)
+
+    def _content(self, attachment: dict, f: io.BufferedIOBase, st: os.stat_result) -> dict:
+        if self.cache is None:
+            attachment['Content'] = self.encode(f, st.st_size)
+            return attachment
+        digest, content = self.cache.content(f, st, self.encode, self.chunk_size)
+        attachment['Hash'] = [f"sha256:{digest}"]
+        if content is None:
+            del attachment['ContentEncoding']
+            attachment['Size'] = st.st_size
+            attachment['Description'] = "Same content as a previous attachment"
+        else:
+            attachment['Content'] = content
+        return attachment
+
+    def load(self, path: str, name: str, content_type: str) -> dict:
+        '''
+        Load a file as an IDMEFv2 Attachment object
+
+        Args:
+            path (str): file path
+            name (str): attachment name
+            content_type (str): content MIME type
+
+        Returns:
+            dict: the Attachment object; its Content is empty if the file does not exist
+        '''
+        attachment = {
+            'Name': name,
+            'ContentType': content_type,
+            'ContentEncoding': 'base64',
+        }
+        try:
+            f = open(path, 'rb')  # pylint: disable=consider-using-with
+        except FileNotFoundError:
+            log.warning("attachment %s not found", path)
+            attachment['Content'] = ''
+            return attachment
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            if self.max_size <= 0 or size <= self.max_size:
+                return self._content(attachment, f, st)
+        if self.thumbnail is not None and HAS_PILLOW and content_type.startswith('image/'):
+            try:
+                attachment['Content'] = self._thumbnail(path)
+                attachment['ContentType'] = 'image/jpeg'
+                attachment['Description'] = f"Thumbnail of {path} ({size} bytes)"
+                return attachment
+            except (OSError, ValueError) as e:
+                log.warning("cannot make thumbnail of %s: %s", path, str(e))
+        return {
+            'Name': name,
+            'FileName': path,
+            'Size': size,
+            'ContentType': content_type,
+            'Description': f"Not attached, size is over {self.max_size} bytes",
+        }
+
+    def attachment(self, path: str, name: str, content_type: str):
+        '''
+        Function to be called in converter templates
+
+        Returns:
+            the Attachment object, or a DeferredAttachment if loading is deferred
+        '''
+        if self.deferred:
+            return DeferredAttachment(self, path, name, content_type)
+        return self.load(path, name, content_type)
+
+def load_attachments(message: dict) -> bool:
+    '''
+    Load the deferred attachments of a message
+
+    Args:
+        message (dict): the IDMEFv2 message, modified in place
+
+    Returns:
+        bool: True if the message had deferred attachments
+    '''
+    attachments = message.get('Attachment')
+    if not isinstance(attachments, list):
+        return False
+    deferred = False
+    for i, attachment in enumerate(attachments):
+        if isinstance(attachment, DeferredAttachment):
+            attachments[i] = attachment.load()
+            deferred = True
+    return deferred
+
+def has_deferred_attachments(message: dict) -> bool:
+    '''
+    Returns:
+        bool: True if the message has attachments to be loaded
+    '''
+    attachments = message.get('Attachment')
+    return isinstance(attachments, list) and any(isinstance(a, DeferredAttachment)
+                                                 for a in attachments)
+
+class AttachmentStage:
+    '''
+    A worker pool completing messages having deferred attachments.
+    The number of pending messages is bounded: submit blocks when the pool is late.
+    '''
+    def __init__(self, workers: int, metrics: ConnectorMetrics = None, max_pending: int = 0):
+        '''
+        Args:
+            workers (int): number of workers
+            metrics (ConnectorMetrics, optional): metrics, pending messages being reported
+                in queue_depth. Defaults to None.
+            max_pending (int, optional): maximum number of pending messages. Defaults to 0,
+                4 times the number of workers.
+        '''
+        self.metrics = metrics
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='attachments')
+        self._slots = threading.BoundedSemaphore(max_pending or 4 * workers)
+
+    def submit(self, function: Callable, *args):
+        '''
+        Call function(*args) in a worker, waiting for a free slot if too many calls are pending
+        '''
+        self._slots.acquire()  # pylint: disable=consider-using-with
+        if self.metrics is not None:
+            self.metrics.queue_depth.inc()
+        self._executor.submit(self._run, function, args)
+
+    def _run(self, function: Callable, args: tuple):
+        try:
+            function(*args)
+        except Exception:  # pylint: disable=broad-exception-caught
+            log.exception("attachment stage failed")
+        finally:
+            if self.metrics is not None:
+                self.metrics.queue_depth.dec()
+            self._slots.release()
+
+    def shutdown(self):
+        '''
+        Wait for pending messages
+        '''
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,152 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for attachment loading
+'''
+import base64
+import hashlib
+import io
+import os
+import threading
+import pytest
+from .attachment import AttachmentCache, AttachmentLoader, AttachmentStage, DeferredAttachment
+from .attachment import has_deferred_attachments, load_attachments
+from .metrics import ConnectorMetrics, Registry
+
+def test_chunked_encoding():
+    data = bytes(range(256)) * 10
+    for chunk_size in (3, 4, 100, 10000):
+        loader = AttachmentLoader(chunk_size=chunk_size)
+        assert loader.encode(io.BytesIO(data)) == base64.b64encode(data).decode('ascii')
+
+def test_load(tmp_path):
+    path = tmp_path / 'snapshot.jpg'
+    path.write_bytes(b'\xff\xd8\xfffake-jpeg')
+    attachment = AttachmentLoader(max_size=100).load(str(path), 'Snapshot', 'image/jpeg')
+    assert attachment == {
+        'Name': 'Snapshot',
+        'ContentType': 'image/jpeg',
+        'ContentEncoding': 'base64',
+        'Content': base64.b64encode(b'\xff\xd8\xfffake-jpeg').decode('ascii'),
+    }
+
+def test_load_missing(tmp_path):
+    attachment = AttachmentLoader().load(str(tmp_path / 'none.jpg'), 'Snapshot', 'image/jpeg')
+    assert attachment['Content'] == ''
+
+def test_reference_over_max_size(tmp_path):
+    path = tmp_path / 'snapshot.jpg'
+    path.write_bytes(b'x' * 101)
+    attachment = AttachmentLoader(max_size=100).load(str(path), 'Snapshot', 'image/jpeg')
+    assert 'Content' not in attachment
+    assert attachment['FileName'] == str(path)
+    assert attachment['Size'] == 101
+
+def test_thumbnail(tmp_path):
+    image = pytest.importorskip('PIL.Image')
+    path = tmp_path / 'snapshot.jpg'
+    image.new('RGB', (1600, 1200), (200, 10, 10)).save(str(path), 'JPEG', quality=100)
+    loader = AttachmentLoader(max_size=1000, thumbnail=(160, 120))
+    attachment = loader.load(str(path), 'Snapshot', 'image/jpeg')
+    with image.open(io.BytesIO(base64.b64decode(attachment['Content']))) as thumbnail:
+        assert thumbnail.size == (160, 120)
+
+def test_deferred(tmp_path):
+    path = tmp_path / 'snapshot.jpg'
+    path.write_bytes(b'abc')
+    loader = AttachmentLoader(deferred=True)
+    message = {'Attachment': [{'Name': 'Path'}, loader.attachment(str(path), 'Snapshot',
+                                                                  'image/jpeg')]}
+    assert isinstance(message['Attachment'][1], DeferredAttachment)
+    assert has_deferred_attachments(message)
+    assert load_attachments(message)
+    assert message['Attachment'][1]['Content'] == 'YWJj'
+    assert not has_deferred_attachments(message)
+
+def test_stage():
+    metrics = ConnectorMetrics('test', Registry())
+    stage = AttachmentStage(2, metrics, max_pending=2)
+    release, done = threading.Event(), []
+
+    def work(i):
+        release.wait(5)
+        done.append(i)
+
+    stage.submit(work, 1)
+    stage.submit(work, 2)
+    assert metrics.queue_depth.value == 2
+    release.set()
+    stage.submit(work, 3)
+    stage.shutdown()
+    assert sorted(done) == [1, 2, 3]
+    assert metrics.queue_depth.value == 0
+
+def test_cache(tmp_path):
+    cache = AttachmentCache(max_entries=2, registry=Registry())
+    loader = AttachmentLoader(cache=cache)
+    data = b'\xff\xd8\xffsame-scene'
+    for name in ('a.jpg', 'b.jpg'):
+        (tmp_path / name).write_bytes(data)
+    expected = base64.b64encode(data).decode('ascii')
+    attachments = [loader.load(str(tmp_path / name), 'Snapshot', 'image/jpeg')
+                   for name in ('a.jpg', 'a.jpg', 'b.jpg')]
+    assert all(a['Content'] == expected for a in attachments)
+    assert attachments[0]['Hash'] == ['sha256:' + hashlib.sha256(data).hexdigest()]
+    stats = cache.stats()
+    assert (stats['miss'], stats['file_hit'], stats['content_hit']) == (1, 1, 1)
+    assert stats['bytes'] == len(expected)
+
+def test_cache_modified(tmp_path):
+    cache = AttachmentCache(registry=Registry())
+    loader = AttachmentLoader(cache=cache)
+    path = tmp_path / 'a.jpg'
+    path.write_bytes(b'first')
+    loader.load(str(path), 'Snapshot', 'image/jpeg')
+    path.write_bytes(b'second')
+    os.utime(path, ns=(0, 0))
+    attachment = loader.load(str(path), 'Snapshot', 'image/jpeg')
+    assert attachment['Content'] == base64.b64encode(b'second').decode('ascii')
+    assert cache.stats()['miss'] == 2
+
+def test_cache_bounds(tmp_path):
+    cache = AttachmentCache(max_entries=3, max_bytes=100, registry=Registry())
+    loader = AttachmentLoader(cache=cache)
+    for i in range(10):
+        path = tmp_path / f"{i}.jpg"
+        path.write_bytes(bytes([i]) * 30)
+        loader.load(str(path), 'Snapshot', 'image/jpeg')
+    assert cache.stats()['bytes'] <= 100
+    # pylint: disable=protected-access
+    assert len(cache._contents) <= 3
+
+class _ChunkedReads(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.sizes = []
+
+    def read(self, size=-1):
+        self.sizes.append(size)
+        return super().read(size)
+
+def test_cache_reads_by_chunks(tmp_path):
+    data = bytes(range(256)) * 40
+    path = tmp_path / 'a.jpg'
+    path.write_bytes(data)
+    loader = AttachmentLoader(chunk_size=999, cache=AttachmentCache(registry=Registry()))
+    f = _ChunkedReads(data)
+    digest, content = loader.cache.content(f, os.stat(path), loader.encode, loader.chunk_size)
+    assert digest == hashlib.sha256(data).hexdigest()
+    assert content == base64.b64encode(data).decode('ascii')
+    assert f.sizes and all(size == 999 for size in f.sizes)
+
+def test_hash_reference(tmp_path):
+    cache = AttachmentCache(reference_ttl=60, registry=Registry())
+    loader = AttachmentLoader(cache=cache)
+    path = tmp_path / 'a.jpg'
+    path.write_bytes(b'static scene')
+    first = loader.load(str(path), 'Snapshot', 'image/jpeg')
+    second = loader.load(str(path), 'Snapshot', 'image/jpeg')
+    assert 'Content' in first
+    assert 'Content' not in second
+    assert second['Hash'] == first['Hash']
+    assert second['Size'] == len(b'static scene')
+    assert cache.stats()['reference'] == 1
@@ -34,8 +34,14 @@ class ClamavConnector(Connector):
                 self.alert(f.read())
 
 
+def create_connector(cfg: Configuration) -> Connector:
+    '''
+    Create the connector from its configuration
+    '''
+    return ClamavConnector(cfg)
+
 if __name__ == "__main__":
     opts = ConnectorArgumentParser('clamav').parse_args()
     clamav_cfg = Configuration(opts)
-    connector = ClamavConnector(clamav_cfg)
+    connector = create_connector(clamav_cfg)
     connector.run()
@@ -3,37 +3,78 @@ Base connector
 '''
 import abc
 from argparse import ArgumentParser
+import errno
 import json
 import logging
+import os
+import socket
+import socketserver
+import stat
 import sys
 from typing import Union
 import requests
+from .attachment import AttachmentStage, has_deferred_attachments, load_attachments
 from .configuration import Configuration
 from .idmefv2client import IDMEFv2Client
 from .jsonconverter import JSONConverter
 from .filetailer import FileTailer
+from .metrics import ConnectorMetrics, start_server
+from .hooks import ConnectorHook, EventTrace, SlowestEventsHook
+from .eventlog import EventLogger
+from .profiling import PROFILERS, start_profiler
 
 class ConnectorArgumentParser(ArgumentParser):
     '''
     Base class for connector command line argument parsing:
         - add -c/--conf option to give configuration file
+        - add --profile options, starting a profiler when arguments are parsed
     '''
     def __init__(self, name: str):
         description = f"Launch the {name.capitalize()} to IDMEFv2 connector"
         super().__init__(description=description)
+        self.name = name
         self.add_argument('-c', '--conf', help='give configuration file', dest='conf_file',
                           required=True)
+        self.add_argument('--profile', choices=PROFILERS, dest='profile',
+                          help='profile the connector, dumping the profile on SIGUSR1 and exit')
+        self.add_argument('--profile-output', dest='profile_output', metavar='PATH',
+                          help='profile dump file (default: TMPDIR/idmefv2-NAME-PID.EXT)')
+        self.add_argument('--profile-interval', dest='profile_interval', type=float, default=0.0,
+                          metavar='SECONDS',
+                          help='interval of periodic profile reports (tracemalloc top '
+                          'allocation sites) or dumps (cprofile, sample), 0 to disable')
+        self.add_argument('--profile-top', dest='profile_top', type=int, default=10,
+                          metavar='N', help='number of entries in periodic reports')
+
+    def parse_args(self, args=None, namespace=None):
+        '''
+        Parse arguments and start the profiler if requested
+        '''
+        opts = super().parse_args(args, namespace)
+        if opts.profile is not None:
+            start_profiler(opts.profile, self.name, opts.profile_output,
+                           opts.profile_interval, opts.profile_top)
+        return opts
 
 class Connector(abc.ABC):
     '''
     Base class for connectors
+
+    client_factory creates the IDMEFv2 client, with the same arguments as IDMEFv2Client;
+    it can be replaced to share connections between connectors running in the same process.
     '''
+    client_factory = IDMEFv2Client
 
     def __init__(self, name: str, cfg: Configuration, converter: JSONConverter):
         '''
         Main function:
             - set logging level
+            - name the connector logger and metrics: the [connector] name option if set,
+              e.g. by the multi-connector runner, name otherwise
+            - creates the connector metrics and starts the metrics HTTP server if enabled
+            - creates the per-event logger, sampled, rate limited and summarized
             - creates the IDMEFv2 HTTP client
+            - creates the attachment stage if enabled
         '''
         level = cfg.get('logging', 'level', fallback='INFO')
         log_file = cfg.get('logging', 'file', fallback=None)
@@ -41,39 +82,129 @@ class Connector(abc.ABC):
             logging.basicConfig(level=level, filename=log_file)
         else:
             logging.basicConfig(level=level)
+        name = cfg.get('connector', 'name', fallback=name)
         self.logger = logging.getLogger(name + '-connector')
         self.logger.info("%s connector started", name)
 
+        self.metrics = ConnectorMetrics(name)
+        if cfg.getboolean('metrics', 'enabled', fallback=False):
+            start_server(cfg.get('metrics', 'listen_address', fallback='127.0.0.1'),
+                         cfg.getint('metrics', 'listen_port', fallback=9464))
+        self.event_log = EventLogger.from_config(self.logger, self.metrics, cfg)
+
         url = cfg.get('idmefv2', 'url')
         login = cfg.get('idmefv2', 'login', fallback=None)
         password = cfg.get('idmefv2', 'password', fallback=None)
         verify = cfg.getboolean('idmefv2', 'verify', fallback=True)
-        self.idmefv2_client = IDMEFv2Client(url, login=login, password=password, verify=verify)
+        self.idmefv2_client = self.client_factory(url, login=login, password=password,
+                                                  verify=verify, metrics=self.metrics)
 
         self.converter = converter
 
+        workers = cfg.getint('attachments', 'workers', fallback=0)
+        self.attachment_stage = AttachmentStage(workers, self.metrics) if workers > 0 else None
+
+        self._hooks = []
+        slowest = cfg.getint('tracing', 'slowest_events', fallback=0)
+        if slowest > 0:
+            interval = cfg.getfloat('tracing', 'interval', fallback=60.0)
+            self.add_hook(SlowestEventsHook(slowest, interval, self.logger))
+
+    def add_hook(self, hook: ConnectorHook):
+        '''
+        Register an instrumentation hook, called at each stage of alert processing
+
+        Args:
+            hook (ConnectorHook): the hook
+        '''
+        self._hooks.append(hook)
+
+    def _fire(self, stage: str, trace: EventTrace):
+        trace.stamp(stage)
+        for hook in self._hooks:
+            getattr(hook, 'on_' + stage)(trace)
+
+    def parse(self, a: Union[str, bytes, dict]):
+        '''
+        Parse an alert before conversion: JSON strings are loaded, other alerts are
+        passed unchanged. Can be overridden by connectors whose alerts are not JSON.
+
+        Args:
+            a (Union[str,bytes,dict]): the origin alert
+
+        Raises:
+            ValueError: if alert cannot be parsed
+
+        Returns:
+            the parsed alert
+        '''
+        if isinstance(a, (str, bytes)):
+            return json.loads(a)
+        return a
+
     def alert(self, a: Union[str, bytes, dict]):
         '''
         Process an alert:
-            - converts parameter to JSON
+            - parse it, logging and dropping it if it cannot be parsed
             - call converter
-            - if alert was converted, send it to IDMEFv2 server
+            - if alert was converted, send it to IDMEFv2 server, in the attachment stage if
+              it has deferred attachments
+
+        Registered hooks are called at each stage.
 
         Args:
             a (Union[str,bytes,dict]): the origin alert
         '''
-        self.logger.debug("received %s", a)
-        if isinstance(a, (str, bytes)):
-            alert = json.loads(a)
+        trace = EventTrace(a) if self._hooks else None
+        if trace:
+            self._fire('read', trace)
+        self.event_log.tick()
+        self.event_log.debug("received %s", a)
+        self.metrics.events_read.inc()
+        try:
+            alert = self.parse(a)
+        except ValueError as e:
+            self.metrics.parse_failures.inc()
+            self.event_log.error("cannot parse alert: %s", e)
+            if trace:
+                trace.error = e
+                self._fire('error', trace)
+            return
+        if trace:
+            self._fire('parsed', trace)
+        (converted, idmefv2_alert) = self.metrics.convert(self.converter, alert)
+        if not converted:
+            if trace:
+                self._fire('filtered', trace)
+            return
+        if trace:
+            self._fire('converted', trace)
+        if self.attachment_stage is not None and has_deferred_attachments(idmefv2_alert):
+            self.attachment_stage.submit(self.send, idmefv2_alert, trace)
         else:
-            alert = a
-        (converted, idmefv2_alert) = self.converter.convert(alert)
-        if converted:
-            self.logger.info("sending IDMEFv2 alert %s", str(idmefv2_alert))
-            try:
-                self.idmefv2_client.post(idmefv2_alert)
-            except requests.RequestException as e:
-                self.logger.error('POST failed with error %s', str(e))
+            self.send(idmefv2_alert, trace)
+
+    def send(self, idmefv2_alert: dict, trace: EventTrace = None):
+        '''
+        Load deferred attachments of a converted alert and send it to IDMEFv2 server
+
+        Args:
+            idmefv2_alert (dict): the IDMEFv2 message
+            trace (EventTrace, optional): the alert trace, if hooks are registered.
+                Defaults to None.
+        '''
+        load_attachments(idmefv2_alert)
+        self.event_log.info("sending IDMEFv2 alert %s", idmefv2_alert)
+        try:
+            self.idmefv2_client.post(idmefv2_alert)
+        except requests.RequestException as e:
+            self.event_log.error('POST failed with error %s', e)
+            if trace:
+                trace.error = e
+                self._fire('error', trace)
+            return
+        if trace:
+            self._fire('posted', trace)
 
     @abc.abstractmethod
     def run(self):
@@ -117,3 +248,64 @@ class LogFileConnector(Connector):
 
         for line in ft.tail():
             self.alert(line)
+
+class LineStreamRequestHandler(socketserver.StreamRequestHandler):
+    '''
+    Handler of Unix socket connections, processing each non-empty line as an alert
+    '''
+    def handle(self):
+        for line in self.rfile:
+            line = line.strip()
+            if line:
+                self.server.alert(line)
+
+def _remove_stale_socket(path: str):
+    try:
+        if not stat.S_ISSOCK(os.stat(path).st_mode):
+            return
+    except FileNotFoundError:
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(path)
+        except ConnectionRefusedError:
+            # left by a previous run
+            os.unlink(path)
+            return
+    raise OSError(errno.EADDRINUSE, f"another process is listening on {path}")
+
+class UnixSocketConnector(Connector, socketserver.UnixStreamServer):
+    '''
+    Runner for Unix socket: alerts are lines written to the socket, by one long-lived
+    connection or by one connection per alert
+    '''
+    request_queue_size = 64
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, name: str, cfg: Configuration, converter: JSONConverter, socket_path: str,
+                 socket_mode: int = None):
+        '''
+        Args:
+            name (str): connector name
+            cfg (Configuration): configuration
+            converter (JSONConverter): converter
+            socket_path (str): path of the Unix socket, removed first if left by a previous run
+            socket_mode (int, optional): permissions of the socket, e.g. 0o660 to allow
+                the group of the connector user to write alerts. Defaults to None, umask.
+        '''
+        Connector.__init__(self, name, cfg, converter)
+        _remove_stale_socket(socket_path)
+        socketserver.UnixStreamServer.__init__(self, socket_path, LineStreamRequestHandler)
+        if socket_mode is not None:
+            os.chmod(socket_path, socket_mode)
+        self._socket_path = socket_path
+
+    def run(self):
+        '''
+        Run the connector on a Unix socket: loop
+            - accepting connections and receiving JSON alerts, one per line
+            - converting alert to IDMEFv2
+            - sending converted alert to IDMEFv2 server
+        '''
+        self.logger.info("Listening on Unix socket %s", self._socket_path)
+        self.serve_forever()
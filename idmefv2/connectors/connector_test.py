@@ -0,0 +1,78 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the connector runners
+'''
+import os
+import socket
+import stat
+import threading
+import time
+from argparse import Namespace
+import pytest
+from .attachment import AttachmentLoader
+from .configuration import Configuration
+from .connector import UnixSocketConnector
+from .jsonconverter import JSONConverter
+
+class _Client:  # pylint: disable=too-few-public-methods
+    def __init__(self, *_args, **_kwargs):
+        self.posted = []
+
+    def post(self, idmefv2):
+        self.posted.append(idmefv2)
+
+class _Connector(UnixSocketConnector):
+    client_factory = _Client
+
+def _configuration(tmp_path) -> Configuration:
+    conf_file = tmp_path / 'test.conf'
+    conf_file.write_text('[idmefv2]\nurl = http://127.0.0.1:9999\n')
+    return Configuration(Namespace(conf_file=str(conf_file)))
+
+def test_unix_socket(tmp_path):
+    path = str(tmp_path / 'test.sock')
+    connector = _Connector('test', _configuration(tmp_path), JSONConverter({'foo': '$.a'}),
+                           path, 0o660)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o660
+    threading.Thread(target=connector.run, daemon=True).start()
+    try:
+        for value in (1, 2):
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+                s.connect(path)
+                s.sendall(b'{"a": %d}\n\n' % value)
+        client = connector.idmefv2_client
+        deadline = time.monotonic() + 5
+        while len(client.posted) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert client.posted == [{'foo': 1}, {'foo': 2}]
+    finally:
+        connector.shutdown()
+        connector.server_close()
+
+def test_unix_socket_stale(tmp_path):
+    path = str(tmp_path / 'test.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.bind(path)
+    cfg = _configuration(tmp_path)
+    connector = _Connector('test', cfg, JSONConverter({}), path)
+    try:
+        with pytest.raises(OSError):
+            _Connector('test', cfg, JSONConverter({}), path)
+    finally:
+        connector.server_close()
+
+def test_attachment_stage(tmp_path):
+    (tmp_path / 'snapshot.jpg').write_bytes(b'abc')
+    conf_file = tmp_path / 'test.conf'
+    conf_file.write_text('[idmefv2]\nurl = http://127.0.0.1:9999\n[attachments]\nworkers = 2\n')
+    cfg = Configuration(Namespace(conf_file=str(conf_file)))
+    loader = AttachmentLoader.from_config(cfg)
+    converter = JSONConverter({'Attachment': [
+        (lambda p: loader.attachment(p, 'Snapshot', 'image/jpeg'), '$.file')]})
+    connector = _Connector('test', cfg, converter, str(tmp_path / 'test.sock'))
+    try:
+        connector.alert({'file': str(tmp_path / 'snapshot.jpg')})
+        connector.attachment_stage.shutdown()
+        assert connector.idmefv2_client.posted[0]['Attachment'][0]['Content'] == 'YWJj'
+    finally:
+        connector.server_close()
@@ -0,0 +1,67 @@
+'''
+Bounded windows of already seen event identifiers, used by polling connectors to drop
+events fetched twice without keeping every identifier forever
+'''
+import itertools
+from typing import Hashable, Optional
+
+class DedupWindow:
+    '''
+    The set of the last max_entries identifiers added, the oldest ones being forgotten first.
+
+    Identifiers can be added with a timestamp, e.g. the time of their event, so that the
+    ones older than the events that can still be fetched again are forgotten by expire().
+    '''
+    def __init__(self, max_entries: int = 10000):
+        '''
+        Args:
+            max_entries (int, optional): maximum number of identifiers. Defaults to 10000.
+        '''
+        self.max_entries = max_entries
+        # dicts keep insertion order: first key is the oldest; values are timestamps
+        self._ids = {}
+
+    def __contains__(self, identifier: Hashable) -> bool:
+        return identifier in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, identifier: Hashable, timestamp: Optional[float] = None) -> bool:
+        '''
+        Add an identifier, forgetting the oldest one if the window is full
+
+        Args:
+            identifier (Hashable): the identifier
+            timestamp (float, optional): the time of the identified event, identifiers
+                being added in time order. Defaults to None, never expired.
+
+        Returns:
+            bool: True if the identifier was not in the window
+        '''
+        if identifier in self._ids:
+            return False
+        self._ids[identifier] = timestamp
+        if len(self._ids) > self.max_entries:
+            del self._ids[next(iter(self._ids))]
+        return True
+
+    def expire(self, oldest: float) -> int:
+        '''
+        Forget the identifiers added with a timestamp older than oldest
+
+        Args:
+            oldest (float): the oldest timestamp kept
+
+        Returns:
+            int: the number of identifiers forgotten
+        '''
+        expired = 0
+        for timestamp in self._ids.values():
+            if timestamp is None or timestamp >= oldest:
+                break
+            expired += 1
+        # collected first: a dict cannot change size while iterated
+        for identifier in list(itertools.islice(self._ids, expired)):
+            del self._ids[identifier]
+        return expired
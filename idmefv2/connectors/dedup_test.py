@@ -0,0 +1,27 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the dedup window
+'''
+from .dedup import DedupWindow
+
+def test_window():
+    window = DedupWindow(3)
+    assert window.add('1')
+    assert not window.add('1')
+    for i in range(2, 5):
+        window.add(str(i))
+    assert len(window) == 3
+    assert '1' not in window
+    assert '4' in window
+
+def test_expire():
+    window = DedupWindow(10)
+    for i in range(5):
+        window.add(str(i), float(i))
+    assert window.expire(3.0) == 3
+    assert '2' not in window
+    assert '3' in window
+    assert len(window) == 2
+    window.add('untimed')
+    assert window.expire(100.0) == 2
+    assert 'untimed' in window
@@ -0,0 +1,163 @@
+'''
+Logging policy for connector hot paths
+
+Messages logged for each event go through an EventLogger, which:
+    - checks the level before anything else, arguments being formatted lazily by logging
+      only if the message is actually emitted
+    - when the logger is not at DEBUG level, logs only one message out of `sample` and at
+      most `rate` messages per second, counting suppressed messages; warnings and errors,
+      e.g. failed POSTs during an outage, are not sampled and have their own limit of
+      `error_rate` messages per second
+    - logs every `summary_interval` seconds a summary line built from connector metrics,
+      instead of a line per event
+
+At DEBUG level, sampling and rate limiting are disabled so that all events are logged.
+'''
+import logging
+import threading
+import time
+from .configuration import Configuration
+from .metrics import ConnectorMetrics
+
+# pylint: disable=too-many-instance-attributes
+class EventLogger:
+    '''
+    Sampled, rate limited and summarized logging of per-event messages
+    '''
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, logger: logging.Logger, metrics: ConnectorMetrics = None,
+                 rate: float = 0.0, sample: int = 1, summary_interval: float = 60.0,
+                 error_rate: float = 10.0):
+        '''
+        Args:
+            logger (logging.Logger): the logger
+            metrics (ConnectorMetrics, optional): metrics summarized. Defaults to None,
+                no summary.
+            rate (float, optional): maximum per-event messages per second, 0 for no limit.
+                Defaults to 0.0.
+            sample (int, optional): log only one per-event message out of sample.
+                Defaults to 1.
+            summary_interval (float, optional): interval of summary lines in seconds,
+                0 to disable. Defaults to 60.0.
+            error_rate (float, optional): maximum per-event warning and error messages per
+                second, not sampled, 0 for no limit. Defaults to 10.0.
+        '''
+        self.logger = logger
+        self.metrics = metrics
+        self.rate = rate
+        self.sample = max(1, sample)
+        self.summary_interval = summary_interval
+        self._lock = threading.Lock()
+        self._tokens = max(1.0, rate)
+        self._last = time.monotonic()
+        self.error_rate = error_rate
+        self._error_tokens = max(1.0, error_rate)
+        self._error_last = self._last
+        self._count = 0
+        self.suppressed = 0
+        self.errors_suppressed = 0
+        self._summary_start = self._last
+        self._summary_base = metrics.snapshot() if metrics is not None else None
+        self._summary_suppressed = (0, 0)
+
+    @classmethod
+    def from_config(cls, logger: logging.Logger, metrics: ConnectorMetrics,
+                    cfg: Configuration) -> 'EventLogger':
+        '''
+        Creates an event logger configured by the [logging] section of the configuration
+        '''
+        return cls(logger, metrics,
+                   rate=cfg.getfloat('logging', 'event_rate', fallback=0.0),
+                   sample=cfg.getint('logging', 'event_sample', fallback=1),
+                   summary_interval=cfg.getfloat('logging', 'summary_interval', fallback=60.0),
+                   error_rate=cfg.getfloat('logging', 'error_rate', fallback=10.0))
+
+    @staticmethod
+    def _take(rate: float, tokens: float, last: float) -> tuple[bool, float, float]:
+        # token bucket: returns whether a message is allowed, and the new tokens and time
+        if rate <= 0:
+            return True, tokens, last
+        now = time.monotonic()
+        tokens = min(max(1.0, rate), tokens + (now - last) * rate)
+        if tokens < 1.0:
+            return False, tokens, now
+        return True, tokens - 1.0, now
+
+    def _allowed(self, level: int) -> bool:
+        with self._lock:
+            if level >= logging.WARNING:
+                allowed, self._error_tokens, self._error_last = self._take(
+                    self.error_rate, self._error_tokens, self._error_last)
+                if not allowed:
+                    self.suppressed += 1
+                    self.errors_suppressed += 1
+                return allowed
+            self._count += 1
+            if self._count % self.sample:
+                self.suppressed += 1
+                return False
+            allowed, self._tokens, self._last = self._take(self.rate, self._tokens, self._last)
+            if not allowed:
+                self.suppressed += 1
+            return allowed
+
+    def log(self, level: int, msg: str, *args, **kwargs):
+        '''
+        Logs a per-event message, subject to level, sampling and rate limiting
+        '''
+        if not self.logger.isEnabledFor(level):
+            return
+        if self.logger.isEnabledFor(logging.DEBUG) or self._allowed(level):
+            self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg: str, *args, **kwargs):
+        '''
+        Logs a per-event message at DEBUG level, never sampled
+        '''
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(msg, *args, **kwargs)
+
+    def info(self, msg: str, *args, **kwargs):
+        '''
+        Logs a per-event message at INFO level
+        '''
+        self.log(logging.INFO, msg, *args, **kwargs)
+
+    def warning(self, msg: str, *args, **kwargs):
+        '''
+        Logs a per-event message at WARNING level
+        '''
+        self.log(logging.WARNING, msg, *args, **kwargs)
+
+    def error(self, msg: str, *args, **kwargs):
+        '''
+        Logs a per-event message at ERROR level
+        '''
+        self.log(logging.ERROR, msg, *args, **kwargs)
+
+    def tick(self):
+        '''
+        Logs the summary line if summary interval elapsed; to be called for each event
+        or each polling cycle
+        '''
+        if self.summary_interval <= 0 or self.metrics is None:
+            return
+        now = time.monotonic()
+        if now - self._summary_start < self.summary_interval:
+            return
+        with self._lock:
+            if now - self._summary_start < self.summary_interval:
+                return
+            elapsed, self._summary_start = now - self._summary_start, now
+            current = self.metrics.snapshot()
+            base, self._summary_base = self._summary_base, current
+            suppressed = (self.suppressed - self._summary_suppressed[0],
+                          self.errors_suppressed - self._summary_suppressed[1])
+            self._summary_suppressed = (self.suppressed, self.errors_suppressed)
+        delta = {k: v - base[k] for k, v in current.items()}
+        self.logger.info("summary of last %.0f s: %d read, %d converted, %d filtered, "
+                         "%d parse failures, %d duplicates, %d posted, %d post errors, "
+                         "%d log messages suppressed (%d errors)",
+                         elapsed, delta['read'], delta['converted'], delta['filtered'],
+                         delta['parse_failures'], delta['duplicates'], delta['posted'],
+                         delta['post_errors'], *suppressed)
@@ -0,0 +1,89 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the per-event logging policy
+'''
+import logging
+from .eventlog import EventLogger
+from .metrics import ConnectorMetrics, Registry
+
+def _logger(name, level):
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    return logger
+
+class _Lazy:  # pylint: disable=too-few-public-methods
+    formatted = 0
+
+    def __str__(self):
+        _Lazy.formatted += 1
+        return 'lazy'
+
+def test_level_guard(caplog):
+    event_log = EventLogger(_logger('eventlog-guard', logging.WARNING))
+    with caplog.at_level(logging.WARNING, logger='eventlog-guard'):
+        event_log.info("message %s", _Lazy())
+        event_log.debug("message %s", _Lazy())
+    assert _Lazy.formatted == 0
+    assert not caplog.records
+
+def test_rate_limit(caplog):
+    event_log = EventLogger(_logger('eventlog-rate', logging.INFO), rate=2.0)
+    with caplog.at_level(logging.INFO, logger='eventlog-rate'):
+        for i in range(10):
+            event_log.info("message %d", i)
+    assert len(caplog.records) == 2
+    assert event_log.suppressed == 8
+
+def test_not_limited_by_default(caplog):
+    event_log = EventLogger(_logger('eventlog-default', logging.INFO))
+    with caplog.at_level(logging.INFO, logger='eventlog-default'):
+        for i in range(10):
+            event_log.info("message %d", i)
+    assert len(caplog.records) == 10
+    assert event_log.suppressed == 0
+
+def test_sample(caplog):
+    event_log = EventLogger(_logger('eventlog-sample', logging.INFO), rate=0, sample=5)
+    with caplog.at_level(logging.INFO, logger='eventlog-sample'):
+        for i in range(10):
+            event_log.info("message %d", i)
+    assert [r.getMessage() for r in caplog.records] == ['message 4', 'message 9']
+
+def test_error_rate(caplog):
+    event_log = EventLogger(_logger('eventlog-errors', logging.INFO), rate=1.0, sample=5,
+                            error_rate=3.0)
+    with caplog.at_level(logging.INFO, logger='eventlog-errors'):
+        for i in range(10):
+            event_log.info("message %d", i)
+            event_log.error("error %d", i)
+    errors = [r.getMessage() for r in caplog.records if r.levelno == logging.ERROR]
+    assert errors == ['error 0', 'error 1', 'error 2']
+    assert len(caplog.records) == 4
+    assert (event_log.suppressed, event_log.errors_suppressed) == (16, 7)
+
+def test_debug_not_limited(caplog):
+    event_log = EventLogger(_logger('eventlog-debug', logging.DEBUG), rate=1.0, sample=5)
+    with caplog.at_level(logging.DEBUG, logger='eventlog-debug'):
+        for i in range(10):
+            event_log.info("message %d", i)
+    assert len(caplog.records) == 10
+
+def test_summary(caplog):
+    metrics = ConnectorMetrics('test', Registry())
+    event_log = EventLogger(_logger('eventlog-summary', logging.INFO), metrics,
+                            summary_interval=60.0)
+    metrics.events_read.inc(3)
+    metrics.events_converted.inc(2)
+    metrics.events_filtered.inc()
+    metrics.post_response(200).inc()
+    metrics.post_response('error').inc()
+    event_log.tick()
+    assert not caplog.records
+    event_log._summary_start -= 60.0  # pylint: disable=protected-access
+    with caplog.at_level(logging.INFO, logger='eventlog-summary'):
+        event_log.tick()
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert '3 read, 2 converted, 1 filtered' in message
+    assert '1 posted, 1 post errors' in message
+    assert '0 log messages suppressed (0 errors)' in message
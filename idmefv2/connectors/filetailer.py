@@ -3,7 +3,6 @@ Python implementation of Unix 'tail -f'
 '''
 import os
 import time
-import inotify.adapters
 
 # pylint: disable=too-few-public-methods
 class FileTailer:
@@ -36,14 +35,26 @@ class FileTailer:
         '''
         A generator yielding lines appended to file
 
+        All complete lines are read on each modification, as several lines can be appended
+        between two inotify events. An incomplete line is left in the file until its end
+        is written.
+
         Yields:
             bytes: the last line appended to file
         '''
+        # imported here, as loading libc bindings is not needed by connectors not tailing files
+        import inotify.adapters  # pylint: disable=import-outside-toplevel
         i = inotify.adapters.Inotify()
         i.add_watch(self._path, mask=inotify.constants.IN_MODIFY)
 
         with open(self._path, 'rb') as fd:
             fd.seek(0, 2)
             for _ in i.event_gen(yield_nones=False):
-                line = fd.readline().strip()
-                yield line
+                while True:
+                    line = fd.readline()
+                    if not line.endswith(b'\n'):
+                        fd.seek(-len(line), 1)
+                        break
+                    line = line.strip()
+                    if line:
+                        yield line
@@ -0,0 +1,159 @@
+'''
+Instrumentation hooks called by Connector at each stage of an alert processing
+
+Stages are, in order:
+    - on_read: the alert was received by the connector
+    - on_parsed: the alert was parsed, e.g. as JSON
+    - on_filtered or on_converted: the converter dropped or converted the alert
+    - on_posted: the IDMEFv2 message was POSTed
+    - on_error: parsing or POST failed; this ends the alert processing
+
+Each stage is timestamped with time.monotonic() in the alert trace passed to hooks, under
+the stage name without 'on_' prefix, e.g. trace.timestamps['read'].
+When no hook is registered, no trace is created and hooks cost a test per stage.
+'''
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+class EventTrace:
+    '''
+    The trace of an alert through the connector stages
+    '''
+    __slots__ = ('event', 'timestamps', 'error')
+
+    def __init__(self, event):
+        self.event = event
+        self.timestamps = {}
+        self.error = None
+
+    def stamp(self, stage: str) -> float:
+        '''
+        Timestamp a stage
+
+        Args:
+            stage (str): stage name, e.g. 'read'
+
+        Returns:
+            float: the timestamp
+        '''
+        t = time.monotonic()
+        self.timestamps[stage] = t
+        return t
+
+    @property
+    def duration(self) -> float:
+        '''
+        Time between first and last stage, in seconds
+        '''
+        if not self.timestamps:
+            return 0.0
+        values = list(self.timestamps.values())
+        return values[-1] - values[0]
+
+    def breakdown(self) -> list[tuple[str, float]]:
+        '''
+        Time spent before each stage, since previous stage
+
+        Returns:
+            list[tuple[str, float]]: list of (stage, duration in seconds), in stage order
+        '''
+        stages = list(self.timestamps.items())
+        return [(stage, t - previous) for (_, previous), (stage, t) in zip(stages, stages[1:])]
+
+class ConnectorHook:
+    '''
+    Base class for connector hooks; all methods do nothing and can be overridden
+    '''
+    def on_read(self, trace: EventTrace):
+        '''
+        Called when an alert is received
+        '''
+
+    def on_parsed(self, trace: EventTrace):
+        '''
+        Called when an alert has been parsed
+        '''
+
+    def on_filtered(self, trace: EventTrace):
+        '''
+        Called when an alert has been dropped by the converter
+        '''
+
+    def on_converted(self, trace: EventTrace):
+        '''
+        Called when an alert has been converted to IDMEFv2
+        '''
+
+    def on_posted(self, trace: EventTrace):
+        '''
+        Called when the IDMEFv2 message has been POSTed
+        '''
+
+    def on_error(self, trace: EventTrace):
+        '''
+        Called when parsing or POST failed, the exception being in trace.error
+        '''
+
+# pylint: disable=too-many-instance-attributes
+class SlowestEventsHook(ConnectorHook):
+    '''
+    Logs, every interval, the slowest events of the interval with their stage breakdown
+    '''
+    def __init__(self, count: int = 10, interval: float = 60.0, logger: logging.Logger = None):
+        '''
+        Args:
+            count (int, optional): number of events logged per interval. Defaults to 10.
+            interval (float, optional): interval in seconds. Defaults to 60.0.
+            logger (logging.Logger, optional): logger. Defaults to 'slowest-events' logger.
+        '''
+        self.count = count
+        self.interval = interval
+        self.logger = logger or logging.getLogger('slowest-events')
+        self._lock = threading.Lock()
+        self._heap = []
+        self._events = 0
+        self._tiebreak = itertools.count()
+        self._interval_start = time.monotonic()
+
+    def _done(self, trace: EventTrace):
+        entry = (trace.duration, next(self._tiebreak), trace.breakdown(), trace.error)
+        with self._lock:
+            self._events += 1
+            if len(self._heap) < self.count:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+            now = trace.timestamps[next(reversed(trace.timestamps))]
+            if now - self._interval_start < self.interval:
+                return
+            slowest, self._heap = sorted(self._heap, reverse=True), []
+            events, self._events = self._events, 0
+            self._interval_start = now
+        self.report(slowest, events)
+
+    def report(self, slowest: list[tuple], events: int):
+        '''
+        Logs the slowest events of an interval
+
+        Args:
+            slowest (list[tuple]): (duration, tiebreak, breakdown, error), slowest first
+            events (int): number of events in the interval
+        '''
+        self.logger.info("%d slowest of %d events in last %.0f s:",
+                         len(slowest), events, self.interval)
+        for duration, _, breakdown, error in slowest:
+            stages = ', '.join(f"{stage} +{1000 * d:.3f} ms" for stage, d in breakdown)
+            self.logger.info("  %.3f ms: %s%s", 1000 * duration, stages,
+                             f" ({error})" if error is not None else '')
+
+    def on_filtered(self, trace: EventTrace):
+        self._done(trace)
+
+    def on_posted(self, trace: EventTrace):
+        self._done(trace)
+
+    def on_error(self, trace: EventTrace):
+        self._done(trace)
@@ -0,0 +1,90 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the connector instrumentation hooks
+'''
+import logging
+from argparse import Namespace
+from .configuration import Configuration
+from .connector import Connector
+from .hooks import ConnectorHook, EventTrace, SlowestEventsHook
+from .jsonconverter import JSONConverter
+
+class _TestConnector(Connector):
+    def run(self):
+        pass
+
+class _RecordingHook(ConnectorHook):
+    def __init__(self):
+        self.calls = []
+
+    def on_read(self, trace):
+        self.calls.append('read')
+
+    def on_parsed(self, trace):
+        self.calls.append('parsed')
+
+    def on_filtered(self, trace):
+        self.calls.append('filtered')
+
+    def on_converted(self, trace):
+        self.calls.append('converted')
+
+    def on_posted(self, trace):
+        self.calls.append('posted')
+
+    def on_error(self, trace):
+        self.calls.append('error')
+
+def _connector(tmp_path, conf=''):
+    conf_file = tmp_path / 'test.conf'
+    conf_file.write_text('[idmefv2]\nurl = http://127.0.0.1:1\n' + conf)
+    cfg = Configuration(Namespace(conf_file=str(conf_file)))
+    converter = JSONConverter({'foo': '$.a'})
+    converter.filter = lambda src: src.get('a') is not None
+    connector = _TestConnector('test', cfg, converter)
+    connector.idmefv2_client.post = lambda message: None
+    return connector
+
+def test_stages(tmp_path):
+    connector = _connector(tmp_path)
+    hook = _RecordingHook()
+    connector.add_hook(hook)
+    connector.alert('{"a": 1}')
+    assert hook.calls == ['read', 'parsed', 'converted', 'posted']
+
+def test_filtered(tmp_path):
+    connector = _connector(tmp_path)
+    hook = _RecordingHook()
+    connector.add_hook(hook)
+    connector.alert('{"b": 1}')
+    assert hook.calls == ['read', 'parsed', 'filtered']
+
+def test_parse_error(tmp_path):
+    connector = _connector(tmp_path)
+    hook = _RecordingHook()
+    connector.add_hook(hook)
+    connector.alert('{"a": ')
+    assert hook.calls == ['read', 'error']
+    assert connector.metrics.parse_failures.value == 1
+
+def test_breakdown():
+    trace = EventTrace({})
+    trace.timestamps = {'read': 1.0, 'parsed': 1.5, 'converted': 3.0}
+    assert trace.duration == 2.0
+    assert trace.breakdown() == [('parsed', 0.5), ('converted', 1.5)]
+
+def test_slowest_events(caplog):
+    hook = SlowestEventsHook(count=2, interval=10.0)
+    hook._interval_start = 0.0  # pylint: disable=protected-access
+    for i, duration in enumerate([1.0, 5.0, 3.0, 2.0]):
+        trace = EventTrace({})
+        trace.timestamps = {'read': float(i), 'posted': i + duration}
+        hook.on_posted(trace)
+    trace = EventTrace({})
+    trace.timestamps = {'read': 20.0, 'filtered': 20.5}
+    with caplog.at_level(logging.INFO, logger='slowest-events'):
+        hook.on_filtered(trace)
+    assert '2 slowest of 5 events' in caplog.text
+    assert '5000.000 ms: posted +5000.000 ms' in caplog.text
+    assert '3000.000 ms' in caplog.text
+    assert '1000.000 ms' not in caplog.text
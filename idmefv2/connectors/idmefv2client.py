@@ -1,27 +1,51 @@
 '''
 A HTTP client POSTing IDMEFv2 messages and logging response
 '''
+import time
 from typing import Union
 import requests
+from .metrics import ConnectorMetrics
 
 # pylint: disable=too-few-public-methods
 class IDMEFv2Client:
     '''
     Class storing client configuration and sending IDMEFv2 messages
     '''
-    def __init__(self, url: str, login : str = None, password : str = None, verify : bool = True):
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, url: str, login : str = None, password : str = None, verify : bool = True,
+                 metrics: ConnectorMetrics = None, session: requests.Session = None):
+        '''
+        Args:
+            url (str): URL of IDMEFv2 server
+            login (str, optional): HTTP Basic Auth login. Defaults to None.
+            password (str, optional): HTTP Basic Auth password. Defaults to None.
+            verify (bool, optional): verify server certificate. Defaults to True.
+            metrics (ConnectorMetrics, optional): metrics recording POSTs. Defaults to None.
+            session (requests.Session, optional): session to use, which can be shared
+                between clients with the same server, authentication and verification.
+                Defaults to None, a new session is created.
+        '''
         self._url = url
-        self._session = requests.Session()
-        if login is not None and password is not None:
-            self._session.auth = (login, password)
-        self._session.verify = verify
+        if session is None:
+            session = requests.Session()
+            if login is not None and password is not None:
+                session.auth = (login, password)
+            session.verify = verify
+        self._session = session
+        self.metrics = metrics
 
-    def post(self, idmefv2: Union[str, bytes, dict]):
+    def post(self, idmefv2: Union[str, bytes, dict]) -> requests.Response:
         '''
         Sends a IDMEFv2 message as a HTTP POST request to server configured in constructor
 
         Args:
             idmefv2 (dict): the IDMEFv2 message, supposed to be valid
+
+        Returns:
+            requests.Response: the server response
+
+        Raises:
+            requests.RequestException: if request failed or server returned an error status
         '''
         kwargs = {'timeout' : 1.0}
         if isinstance(idmefv2, dict):
@@ -29,5 +53,18 @@ class IDMEFv2Client:
         else:
             kwargs ['data'] = idmefv2
             kwargs['headers'] = {'Content-Type':'application/json'}
-        r = self._session.post(self._url, **kwargs)
+        if self.metrics is None:
+            r = self._session.post(self._url, **kwargs)
+            r.raise_for_status()
+            return r
+        start = time.perf_counter()
+        try:
+            r = self._session.post(self._url, **kwargs)
+        except requests.RequestException:
+            self.metrics.post_seconds.observe(time.perf_counter() - start)
+            self.metrics.post_response('error').inc()
+            raise
+        self.metrics.post_seconds.observe(time.perf_counter() - start)
+        self.metrics.post_response(r.status_code).inc()
         r.raise_for_status()
+        return r
@@ -1,9 +1,131 @@
 '''
     Generic JSON to JSON converter
 '''
+import atexit
+import contextlib
+import logging
+import os
+import pickle
+import stat
+import tempfile
+import threading
+from importlib import metadata
 import jsonpath_ng as jsonpath
 from .idmefv2funs import idmefv2_uuid
 
+class JSONPathCache:
+    '''
+    A process-wide cache of parsed JSON Paths
+
+    Parsing a JSON Path is slow, the first parse building the PLY parser, and templates of
+    different converters share many paths. Parsed paths are immutable and can be shared by
+    all converters of the process.
+
+    The cache can be persisted in a pickle file, loaded on first parse and saved at exit
+    if new paths were parsed, so that restarted connectors do not parse paths again.
+    As unpickling can run arbitrary code, a file not owned by the user running the
+    connectors, or writable by other users, is not loaded.
+    '''
+    def __init__(self, path: str = None):
+        '''
+        Args:
+            path (str, optional): pickle file path. Defaults to None, cache not persisted.
+        '''
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._paths = {}
+        self._lock = threading.Lock()
+        self._loaded = path is None
+        self._dirty = False
+
+    def parse(self, expr: str) -> jsonpath.JSONPath:
+        '''
+        Returns the parsed JSON Path, parsing it on first call
+
+        Args:
+            expr (str): the JSON Path
+
+        Returns:
+            jsonpath.JSONPath: the parsed JSON Path
+        '''
+        parsed = self._paths.get(expr)
+        if parsed is not None:
+            self.hits += 1
+            return parsed
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            parsed = self._paths.get(expr)
+            if parsed is None:
+                self.misses += 1
+                parsed = jsonpath.parse(expr)
+                self._paths[expr] = parsed
+                self._dirty = True
+            else:
+                self.hits += 1
+            return parsed
+
+    @staticmethod
+    def _version() -> str:
+        try:
+            return metadata.version('jsonpath-ng')
+        except metadata.PackageNotFoundError:
+            return 'unknown'
+
+    def _load(self):
+        self._loaded = True
+        atexit.register(self.save)
+        try:
+            with open(self.path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if st.st_uid != os.getuid() or st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                    raise PermissionError('not owned by current user or writable by others')
+                version, paths = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            logging.getLogger('jsonconverter').warning("cannot load JSON Path cache %s: %s",
+                                                       self.path, str(e))
+            return
+        # parsed paths depend on jsonpath_ng classes
+        if version == self._version():
+            self._paths.update(paths)
+
+    def save(self):
+        '''
+        Save the cache to its file if new paths were parsed since loading
+        '''
+        with self._lock:
+            if self.path is None or not self._dirty:
+                return
+            paths = dict(self._paths)
+            self._dirty = False
+        tmp = None
+        try:
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)))
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump((self._version(), paths), f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            logging.getLogger('jsonconverter').warning("cannot save JSON Path cache %s: %s",
+                                                       self.path, str(e))
+            if tmp is not None:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp)
+
+    def clear(self):
+        '''
+        Remove all parsed paths from the cache
+        '''
+        with self._lock:
+            self._paths.clear()
+            self.hits = self.misses = 0
+
+# The JSON Path cache of the process, persisted in the file given by the
+# IDMEFV2_JSONPATH_CACHE environment variable if set
+PATH_CACHE = JSONPathCache(os.environ.get('IDMEFV2_JSONPATH_CACHE') or None)
+
 class JSONConverter:
     '''
     A class implementing a generic JSON to JSON converter, using a pre-defined template
@@ -24,7 +146,7 @@ class JSONConverter:
 
     Compilation is done by recursive depth-first traversal. For each element in the traversal:
         - if current element is a JSON Path, compile it using jsonpath.parse and produce the
-          compiled template
+          compiled template; parsed JSON Paths are cached in PATH_CACHE
         - if current element is a dict, output a dict having the same keys  and for each key
           the result of the compilation of the associated value (Note: keys are not compiled)
         - if current element is a list, produce a list containing the compilation of all values
@@ -40,6 +162,11 @@ class JSONConverter:
     '''
     message_ids = {}
 
+    # The fields read by template functions called with the whole JSON object ('$'),
+    # listed by sub-classes so that source_fields() can still project JSON objects on the
+    # fields read by the template; None if unknown
+    ROOT_FIELDS = None
+
     def _idmefv2_uuid(self, identifier: any) -> str:
         '''
         Get the IDMEFv2 message ID for a given event identifier, generating a new one if not already present
@@ -70,7 +197,7 @@ class JSONConverter:
     @staticmethod
     def __compile_template(template: any):
         if isinstance(template, str) and template.startswith('$'):
-            return jsonpath.parse(template)
+            return PATH_CACHE.parse(template)
         if isinstance(template, dict):
             c = {k: JSONConverter.__compile_template(v) for (k, v) in template.items()}
             return c
@@ -82,6 +209,32 @@ class JSONConverter:
             return c
         return template
 
+    @staticmethod
+    def __template_paths(template: any):
+        if isinstance(template, str) and template.startswith('$'):
+            yield template
+        elif isinstance(template, dict):
+            for v in template.values():
+                yield from JSONConverter.__template_paths(v)
+        elif isinstance(template, (list, tuple)):
+            for v in template:
+                yield from JSONConverter.__template_paths(v)
+
+    @staticmethod
+    def __path_field(expr: str) -> str:
+        # the leading plain field names of a JSON Path, e.g. 'a.b' for '$.a.b[0].c',
+        # '' for '$'
+        names = []
+        for name in expr[1:].lstrip('.').split('.'):
+            name, bracket, _ = name.partition('[')
+            name = name.strip('\'"')
+            if not name or '*' in name:
+                break
+            names.append(name)
+            if bracket:
+                break
+        return '.'.join(names)
+
     def __init__(self, template: dict):
         '''
         Initialize converter by compiling the template
@@ -135,6 +288,26 @@ class JSONConverter:
         '''
         return True
 
+    def source_fields(self) -> list:
+        '''
+        The fields of JSON data read by the template, so that JSON objects can be fetched
+        with these fields only, e.g. with the _source includes of an Elasticsearch query
+
+        Returns:
+            list: the sorted dotted names of the fields read by the JSON Paths of the
+                template, None if whole JSON objects are read
+        '''
+        fields = set()
+        for expr in JSONConverter.__template_paths(self._template):
+            field = JSONConverter.__path_field(expr)
+            if field:
+                fields.add(field)
+            elif self.ROOT_FIELDS is None:
+                return None
+            else:
+                fields.update(self.ROOT_FIELDS)
+        return sorted(fields)
+
     def convert(self, src: dict) -> tuple[bool, dict]:
         '''
         Convert JSON data to another JSON data
@@ -177,6 +350,15 @@ class ChainJSONConverter(JSONConverter):
     def filter(self, src: dict) -> bool:
         return any(map(lambda c: c.filter(src), self._converters))
 
+    def source_fields(self) -> list:
+        fields = set()
+        for converter in self._converters:
+            converter_fields = converter.source_fields()
+            if converter_fields is None:
+                return None
+            fields.update(converter_fields)
+        return sorted(fields)
+
     def convert(self, src: dict) -> tuple[bool, dict]:
         for converter in self._converters:
             (c, r) = converter.convert(src)
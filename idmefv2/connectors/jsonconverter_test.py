@@ -2,8 +2,9 @@
 '''
 Tests for the JSON converter
 '''
+import os
 import pytest
-from .jsonconverter import JSONConverter, ChainJSONConverter
+from .jsonconverter import JSONConverter, ChainJSONConverter, JSONPathCache
 
 def foobar():
     return 'FOOBAR'
@@ -84,3 +85,53 @@ def test_chain_converter_2():
     assert o == {'foo': 1}
     _, o = c.convert({'b': 2})
     assert o == {'bar': 2}
+
+def test_path_cache_shared():
+    cache = JSONPathCache()
+    p = cache.parse('$.a.b')
+    assert cache.parse('$.a.b') is p
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert p.find({'a': {'b': 3}})[0].value == 3
+
+def test_path_cache_converters():
+    c1 = JSONConverter({'foo': '$.shared_path'})
+    c2 = JSONConverter({'bar': ['$.shared_path']})
+    # pylint: disable=protected-access
+    assert c1._compiled_template['foo'] is c2._compiled_template['bar'][0]
+
+def test_path_cache_persisted(tmp_path):
+    path = str(tmp_path / 'paths.pickle')
+    cache = JSONPathCache(path)
+    cache.parse('$.a')
+    cache.parse('$.b[0].c')
+    cache.save()
+    cache = JSONPathCache(path)
+    assert cache.parse('$.b[0].c').find({'b': [{'c': 1}]})[0].value == 1
+    assert (cache.hits, cache.misses) == (1, 0)
+
+def test_path_cache_corrupted(tmp_path):
+    path = tmp_path / 'paths.pickle'
+    path.write_bytes(b'garbage')
+    cache = JSONPathCache(str(path))
+    assert cache.parse('$.a').find({'a': 1})[0].value == 1
+    assert cache.misses == 1
+
+def test_path_cache_unsafe(tmp_path, caplog):
+    path = str(tmp_path / 'paths.pickle')
+    cache = JSONPathCache(path)
+    cache.parse('$.a')
+    cache.save()
+    # a file writable by other users could have been replaced by a malicious pickle
+    os.chmod(path, 0o666)
+    cache = JSONPathCache(path)
+    cache.parse('$.a')
+    assert cache.misses == 1
+    assert 'not owned by current user or writable by others' in caplog.text
+
+def test_source_fields():
+    c = JSONConverter({'a': '$.a.b', 'b': ['$.c[0].d', 'plain', (str, '$.e')], 'c': '$.a.b',
+                       'd': '$.f.*.g', 'e': (len, '$.\'@timestamp\'')})
+    assert c.source_fields() == ['@timestamp', 'a.b', 'c', 'e', 'f']
+    assert JSONConverter({'a': (str, '$')}).source_fields() is None
+    assert ChainJSONConverter(c, JSONConverter({'x': '$.x'})).source_fields() == \
+        ['@timestamp', 'a.b', 'c', 'e', 'f', 'x']
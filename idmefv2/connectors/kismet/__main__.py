@@ -84,7 +84,7 @@ class KismetConnector(Connector):
             last_ts = self.last_alerts[key]
             # If same header+text seen within 2 seconds, treat as duplicate
             if abs(ts - last_ts) < 2.0:
-                self.logger.info("Ignoring duplicate alert (fuzzy match): %s", header)
+                self.event_log.info("Ignoring duplicate alert (fuzzy match): %s", header)
                 return True
 
         # Update last seen
@@ -131,6 +131,9 @@ class KismetConnector(Connector):
                                 self.seen_alerts.add(aid) # Always add strict hash
                                 self.alert(alert)
                                 new_count += 1
+                            else:
+                                self.metrics.events_read.inc()
+                                self.metrics.dedup_hits.inc()
                         if new_count > 0:
                             self.logger.info("Processed %d new alerts", new_count)
                     else:
@@ -151,9 +154,14 @@ class KismetConnector(Connector):
 
             time.sleep(self.interval)
 
+def create_connector(cfg: Configuration) -> Connector:
+    '''
+    Create the connector from its configuration
+    '''
+    return KismetConnector(cfg, KismetConverter())
+
 if __name__ == '__main__':
     opts = ConnectorArgumentParser('kismet').parse_args()
     config = Configuration(opts)
-    kismet_converter = KismetConverter()
-    connector = KismetConnector(config, kismet_converter)
+    connector = create_connector(config)
     connector.run()
@@ -0,0 +1,406 @@
+'''
+Operational metrics of connectors, exported in Prometheus text format
+
+Provides minimal Counter, Gauge and Histogram metrics, a registry rendering them in
+Prometheus text exposition format, and a HTTP server serving them on /metrics.
+
+Updating a metric costs a lock acquisition and an addition, so that metrics can be left
+enabled in production. Metrics are always collected; the HTTP server is started only if
+enabled in the [metrics] section of the configuration.
+'''
+import abc
+import bisect
+import logging
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable
+
+_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                    0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def _format_labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + '}'
+
+class _CounterChild:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def inc(self, amount: float = 1):
+        '''
+        Increment the counter
+
+        Args:
+            amount (float, optional): increment, must be positive. Defaults to 1.
+        '''
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        '''
+        Current value of the counter
+        '''
+        return self._value
+
+class _GaugeChild(_CounterChild):
+    def __init__(self):
+        super().__init__()
+        self._function = None
+
+    def dec(self, amount: float = 1):
+        '''
+        Decrement the gauge
+
+        Args:
+            amount (float, optional): decrement. Defaults to 1.
+        '''
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: float):
+        '''
+        Set the gauge value
+        '''
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]):
+        '''
+        Compute the gauge value by calling function each time metrics are collected
+        '''
+        self._function = function
+
+    @property
+    def value(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+class _HistogramChild:
+    def __init__(self, buckets: tuple):
+        self._lock = threading.Lock()
+        self._buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float):
+        '''
+        Record an observation, e.g. a duration in seconds
+        '''
+        i = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def snapshot(self) -> tuple[list[int], float]:
+        '''
+        Returns cumulative counts of each bucket, including +Inf, and sum of observations
+        '''
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        cumulative, acc = [], 0
+        for c in counts:
+            acc += c
+            cumulative.append(acc)
+        return cumulative, total
+
+class _Metric(abc.ABC):
+    '''
+    Base class for a metric family, holding one child per label values
+    '''
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        '''
+        Returns the child metric for the given label values, creating it if needed.
+        Children should be kept by callers on hot paths to avoid this lookup.
+        '''
+        values = tuple(str(v) for v in values)
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}")
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self, values: tuple, child) -> list[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, values)} "
+                f"{_format_value(child.value)}"]
+
+    def collect(self) -> list[str]:
+        '''
+        Returns the metric family lines in Prometheus text format
+        '''
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+class Counter(_Metric):
+    '''
+    A monotonically increasing counter
+    '''
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+class Gauge(_Metric):
+    '''
+    A value that can go up and down
+    '''
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+class Histogram(_Metric):
+    '''
+    Distribution of observations in buckets
+    '''
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = (),
+                 buckets: tuple = _LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def _samples(self, values: tuple, child) -> list[str]:
+        counts, total = child.snapshot()
+        names = self.labelnames + ('le',)
+        lines = []
+        for bound, count in zip(self.buckets + (math.inf,), counts):
+            labels = _format_labels(names, values + (_format_value(bound),))
+            lines.append(f"{self.name}_bucket{labels} {count}")
+        labels = _format_labels(self.labelnames, values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {counts[-1]}")
+        return lines
+
+class Registry:
+    '''
+    A set of metric families, rendered together
+    '''
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: tuple, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, documentation, labelnames, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered with another type or labels")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: tuple = ()) -> Counter:
+        '''
+        Returns the counter with this name, registering it if needed
+        '''
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: tuple = ()) -> Gauge:
+        '''
+        Returns the gauge with this name, registering it if needed
+        '''
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: tuple = (),
+                  buckets: tuple = _LATENCY_BUCKETS) -> Histogram:
+        '''
+        Returns the histogram with this name, registering it if needed
+        '''
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        '''
+        Returns all metrics in Prometheus text exposition format
+        '''
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+# pylint: disable=too-many-instance-attributes
+class ConnectorMetrics:
+    '''
+    The metrics of a connector, labelled with the connector name.
+
+    Children are bound once at construction, so that updating a metric on the hot path
+    does not involve any label lookup.
+    '''
+    def __init__(self, connector: str, registry: Registry = REGISTRY):
+        self.connector = connector
+        labels = ('connector',)
+        self.events_read = registry.counter(
+            'idmefv2_connector_events_read_total',
+            'Events read from the source: log lines, socket messages or polled records',
+            labels).labels(connector)
+        self.parse_failures = registry.counter(
+            'idmefv2_connector_parse_failures_total',
+            'Events that could not be parsed', labels).labels(connector)
+        events = registry.counter(
+            'idmefv2_connector_events_total',
+            'Events processed by the converter, by outcome', labels + ('outcome',))
+        self.events_converted = events.labels(connector, 'converted')
+        self.events_filtered = events.labels(connector, 'filtered')
+        self.conversion_seconds = registry.histogram(
+            'idmefv2_connector_conversion_seconds',
+            'Time spent converting an event to IDMEFv2', labels).labels(connector)
+        self.post_seconds = registry.histogram(
+            'idmefv2_connector_post_seconds',
+            'Time spent POSTing an IDMEFv2 message, until response or error',
+            labels).labels(connector)
+        self._post_responses = registry.counter(
+            'idmefv2_connector_post_responses_total',
+            'Responses to IDMEFv2 POST requests, by HTTP status, "error" if no response',
+            labels + ('status',))
+        self._post_status = {}
+        self.queue_depth = registry.gauge(
+            'idmefv2_connector_queue_depth',
+            'Events waiting to be processed, for connectors with an internal queue',
+            labels).labels(connector)
+        self.retries = registry.counter(
+            'idmefv2_connector_retries_total',
+            'Retried operations', labels).labels(connector)
+        self.dedup_hits = registry.counter(
+            'idmefv2_connector_dedup_hits_total',
+            'Events dropped because already seen', labels).labels(connector)
+
+    def post_response(self, status) -> _CounterChild:
+        '''
+        Returns the counter of POST responses with the given status
+
+        Args:
+            status: HTTP status code, or 'error' if no response was received
+        '''
+        child = self._post_status.get(status)
+        if child is None:
+            child = self._post_responses.labels(self.connector, status)
+            self._post_status[status] = child
+        return child
+
+    def snapshot(self) -> dict:
+        '''
+        Returns the current totals of the event counters
+
+        Returns:
+            dict: events read, parse failures, converted and filtered events, dedup hits,
+            successful and failed POSTs
+        '''
+        posts = {status: child.value for status, child in list(self._post_status.items())}
+        failed = sum(v for status, v in posts.items() if status == 'error' or status >= 400)
+        return {
+            'read': self.events_read.value,
+            'parse_failures': self.parse_failures.value,
+            'converted': self.events_converted.value,
+            'filtered': self.events_filtered.value,
+            'duplicates': self.dedup_hits.value,
+            'posted': sum(posts.values()) - failed,
+            'post_errors': failed,
+        }
+
+    def convert(self, converter, event) -> tuple[bool, dict]:
+        '''
+        Convert an event, recording conversion latency and outcome
+
+        Args:
+            converter: the connector converter
+            event: the event to convert
+
+        Returns:
+            tuple[bool, dict]: the converter result
+        '''
+        start = time.perf_counter()
+        (converted, idmefv2) = converter.convert(event)
+        self.conversion_seconds.observe(time.perf_counter() - start)
+        if converted:
+            self.events_converted.inc()
+        else:
+            self.events_filtered.inc()
+        return (converted, idmefv2)
+
+class _MetricsRequestHandler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def log_message(self, *_args, **_kwargs):
+        return
+
+    # pylint: disable=invalid-name
+    def do_GET(self):
+        '''
+        Serves metrics on /metrics, 404 otherwise
+        '''
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        out = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(out)))
+        self.end_headers()
+        self.wfile.write(out)
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+def start_server(address: str, port: int, registry: Registry = REGISTRY) -> ThreadingHTTPServer:
+    '''
+    Start a HTTP server serving metrics on /metrics in a daemon thread.
+    Only one server is started per address and port, so that several connectors running
+    in the same process share it.
+
+    Args:
+        address (str): listen address
+        port (int): listen port, 0 for any free port
+        registry (Registry, optional): metrics to serve. Defaults to REGISTRY.
+
+    Returns:
+        ThreadingHTTPServer: the server
+    '''
+    with _servers_lock:
+        server = _servers.get((address, port))
+        if server is not None:
+            return server
+        handler = type('MetricsRequestHandler', (_MetricsRequestHandler,),
+                       {'registry': registry})
+        server = ThreadingHTTPServer((address, port), handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+        _servers[(address, port)] = server
+        logging.getLogger('metrics').info("Serving metrics on http://%s:%d/metrics",
+                                          address, server.server_address[1])
+        return server
@@ -0,0 +1,74 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the connector metrics
+'''
+import urllib.request
+from .jsonconverter import JSONConverter
+from .metrics import ConnectorMetrics, Registry, start_server
+
+def test_counter():
+    registry = Registry()
+    c = registry.counter('foo_total', 'Foo', ('connector',))
+    c.labels('a').inc()
+    c.labels('a').inc(2)
+    c.labels('b').inc()
+    text = registry.render()
+    assert '# TYPE foo_total counter' in text
+    assert 'foo_total{connector="a"} 3' in text
+    assert 'foo_total{connector="b"} 1' in text
+
+def test_same_metric():
+    registry = Registry()
+    assert registry.counter('foo_total', 'Foo') is registry.counter('foo_total', 'Foo')
+
+def test_gauge():
+    registry = Registry()
+    g = registry.gauge('depth', 'Depth').labels()
+    g.set(5)
+    g.dec()
+    assert 'depth 4' in registry.render()
+    g.set_function(lambda: 7)
+    assert 'depth 7' in registry.render()
+
+def test_histogram():
+    registry = Registry()
+    h = registry.histogram('latency_seconds', 'Latency', ('connector',), buckets=(0.1, 1.0))
+    child = h.labels('a')
+    child.observe(0.05)
+    child.observe(0.5)
+    child.observe(5)
+    text = registry.render()
+    assert 'latency_seconds_bucket{connector="a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{connector="a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{connector="a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{connector="a"} 3' in text
+    assert 'latency_seconds_sum{connector="a"} 5.55' in text
+
+def test_label_escape():
+    registry = Registry()
+    registry.counter('foo_total', 'Foo', ('name',)).labels('a"b').inc()
+    assert 'foo_total{name="a\\"b"} 1' in registry.render()
+
+def test_connector_convert():
+    registry = Registry()
+    metrics = ConnectorMetrics('test', registry)
+    converter = JSONConverter({'foo': '$.a'})
+    (converted, o) = metrics.convert(converter, {'a': 1})
+    assert converted and o['foo'] == 1
+    assert metrics.events_converted.value == 1
+    assert metrics.events_filtered.value == 0
+    text = registry.render()
+    assert 'idmefv2_connector_events_total{connector="test",outcome="converted"} 1' in text
+    assert 'idmefv2_connector_conversion_seconds_count{connector="test"} 1' in text
+
+def test_server():
+    registry = Registry()
+    registry.counter('foo_total', 'Foo').labels().inc()
+    server = start_server('127.0.0.1', 0, registry)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as r:
+            assert r.status == 200
+            assert 'foo_total 1' in r.read().decode()
+    finally:
+        server.shutdown()
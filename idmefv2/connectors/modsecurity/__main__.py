@@ -7,16 +7,21 @@ Reads ModSecurity JSON audit logs and converts them to IDMEFv2 format.
 from __future__ import annotations
 
 from .modsecurityconverter import ModSecurityConverter
-from ..connector import ConnectorArgumentParser, Configuration, LogFileConnector
+from ..connector import ConnectorArgumentParser, Configuration, Connector, LogFileConnector
+
+
+def create_connector(cfg: Configuration) -> Connector:
+    """Create the connector from its configuration."""
+    log_file = cfg.get("connector", "log_file")
+    converter = ModSecurityConverter()
+    return LogFileConnector("modsecurity", cfg, converter, log_file)
 
 
 def main():
     """Parse arguments, load configuration, and start the connector."""
     opts = ConnectorArgumentParser("modsecurity").parse_args()
     cfg = Configuration(opts)
-    log_file = cfg.get("connector", "log_file")
-    converter = ModSecurityConverter()
-    connector = LogFileConnector("modsecurity", cfg, converter, log_file)
+    connector = create_connector(cfg)
     connector.run()
 
 
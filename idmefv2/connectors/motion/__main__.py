@@ -5,22 +5,29 @@ Main for motion connector
 from .motionconverter import MotionConverter, MotionPictureSaveConverter, MotionEventStartConverter
 from .motionconverter import MotionCameraLostConverter, MotionEventEndConverter
 from .motionconverter import MotionMovieEndConverter
+from ..attachment import AttachmentLoader
 from ..configuration import Configuration
-from ..connector import ConnectorArgumentParser, LogFileConnector
+from ..connector import ConnectorArgumentParser, Connector, LogFileConnector
 
-if __name__ == "__main__":
-    opts = ConnectorArgumentParser('motion').parse_args()
-    cfg = Configuration(opts)
+def create_connector(cfg: Configuration) -> Connector:
+    """
+    Create the connector from its configuration
+    """
     log_file_path = cfg.get('motionjson', 'logfile')
     stream_port = cfg.get('motion', 'stream_port')
-    connector = LogFileConnector(
+    return LogFileConnector(
         'motion',
         cfg, MotionConverter(
-            MotionPictureSaveConverter(),
+            MotionPictureSaveConverter(AttachmentLoader.from_config(
+                cfg, cfg.get('connector', 'name', fallback='motion'))),
             MotionCameraLostConverter(),
             MotionEventStartConverter(stream_port),
             MotionEventEndConverter(),
             MotionMovieEndConverter()
         ),
     log_file_path)
+
+if __name__ == "__main__":
+    opts = ConnectorArgumentParser('motion').parse_args()
+    connector = create_connector(Configuration(opts))
     connector.run()
@@ -3,7 +3,7 @@
 The motion to IDMEFv2 convertor.
 '''
 import re
-import base64
+from ..attachment import AttachmentLoader
 from ..jsonconverter import JSONConverter, ChainJSONConverter
 from ..idmefv2funs import idmefv2_uuid, idmefv2_my_local_ip, idmefv2_my_host_name
 
@@ -25,17 +25,6 @@ def _fix_motion_date(motion_date: str) -> str:
 def _make_description(d: str, m: str) -> str:
     return f"Event {d} on monitor {m}"
 
-def _make_snapshot_base64(path: str) -> str:
-    try:
-        file_handle = open(path, 'rb')
-    except FileNotFoundError:
-        return ""
-    with file_handle as binary_file:
-        binary_file_data = binary_file.read()
-        base64_encoded_data = base64.b64encode(binary_file_data)
-        base64_output = base64_encoded_data.decode('ascii')
-        return base64_output
-
 def get_stream_uri(camera_id: str, stream_port: int) -> str:
     '''
     Get the stream URI for a given camera ID and stream port.
@@ -83,20 +72,26 @@ class MotionPictureSaveConverter(JSONConverter):
                 "Name": "EventDirectoryPath",
                 "FileName": "$.file"
             },
-            {
-                "Name": "EventSnapshotImage",
-                "ContentType": "image/jpeg",
-                "ContentEncoding": "base64",
-                "Content": (_make_snapshot_base64, "$.file")
-            }
+            # EventSnapshotImage attachment, set by constructor
+            None
         ]
     }
 
-    def __init__(self):
-        template = MotionPictureSaveConverter.IDMEFV2_TEMPLATE
+    def __init__(self, loader: AttachmentLoader = None):
+        '''
+        Args:
+            loader (AttachmentLoader, optional): loader of snapshots. Defaults to None,
+                snapshots attached whatever their size.
+        '''
+        self._loader = loader or AttachmentLoader()
+        template = dict(MotionPictureSaveConverter.IDMEFV2_TEMPLATE)
         template['ID'] = (self._idmefv2_uuid, '$.event_id')
+        template['Attachment'] = template['Attachment'][:1] + [(self._snapshot, "$.file")]
         super().__init__(template)
 
+    def _snapshot(self, path: str):
+        return self._loader.attachment(path, "EventSnapshotImage", "image/jpeg")
+
     def filter(self, src: dict) -> bool:
         return src.get('event_name') == "picture_save"
 
@@ -0,0 +1,3 @@
+'''
+A runner starting several connectors in a single supervised process
+'''
@@ -0,0 +1,104 @@
+'''
+Main for the multi-connector runner: runs several connectors in one process
+'''
+import importlib
+import logging
+import threading
+from argparse import Namespace
+from typing import Callable
+from ..configuration import Configuration
+from ..connector import ConnectorArgumentParser, Connector
+from ..metrics import start_server
+from .supervisor import SessionPool, SupervisedConnector, log
+
+_SECTION_PREFIX = 'connector:'
+
+# connector types whose package name differs from type
+_PACKAGES = {'tpot': 't-pot'}
+
+def connector_factory(connector_type: str, conf_files: list[str],
+                      name: str = None) -> Callable[[], Connector]:
+    '''
+    Returns a function creating a connector of the given type, using the create_connector
+    function of the connector main module
+
+    Args:
+        connector_type (str): connector type, e.g. 'suricata'
+        conf_files (list[str]): configuration files, later files overriding earlier ones
+        name (str, optional): connector name, set as the [connector] name option so that
+            connectors of the same type have their own logger and metrics. Defaults to
+            None, named after their type.
+    '''
+    package = _PACKAGES.get(connector_type, connector_type)
+    module = importlib.import_module(f"idmefv2.connectors.{package}.__main__")
+    create_connector = getattr(module, 'create_connector', None)
+    if create_connector is None:
+        raise ValueError(f"connector type {connector_type} cannot be run by multi-connector")
+
+    def create() -> Connector:
+        cfg = Configuration(Namespace(conf_file=conf_files))
+        if name is not None:
+            if not cfg.has_section('connector'):
+                cfg.add_section('connector')
+            cfg.set('connector', 'name', name)
+        return create_connector(cfg)
+    return create
+
+def create_supervisors(cfg: Configuration, conf_file: str,
+                       stop: threading.Event) -> list[SupervisedConnector]:
+    '''
+    Create the supervised connectors configured in [connector:NAME] sections
+
+    Each connector configuration is read from the multi-connector configuration file, then
+    from the connector own configuration file which overrides it, so that common sections
+    such as [idmefv2] can be given once.
+    '''
+    restart_delay = cfg.getfloat('supervisor', 'restart_delay', fallback=5.0)
+    max_restart_delay = cfg.getfloat('supervisor', 'max_restart_delay', fallback=300.0)
+    supervisors = []
+    for section in cfg.sections():
+        if not section.startswith(_SECTION_PREFIX):
+            continue
+        name = section[len(_SECTION_PREFIX):]
+        connector_type = cfg.get(section, 'type', fallback=name)
+        conf_files = [conf_file]
+        if cfg.has_option(section, 'conf'):
+            conf_files.append(cfg.get(section, 'conf'))
+        factory = connector_factory(connector_type, conf_files, name)
+        supervisors.append(SupervisedConnector(name, factory, stop, restart_delay,
+                                               max_restart_delay))
+    if not supervisors:
+        raise ValueError(f"no [{_SECTION_PREFIX}NAME] section in {conf_file}")
+    return supervisors
+
+def main():
+    '''
+    Parse arguments, load configuration, start connectors and wait
+    '''
+    opts = ConnectorArgumentParser('multi').parse_args()
+    cfg = Configuration(opts)
+    level = cfg.get('logging', 'level', fallback='INFO')
+    log_file = cfg.get('logging', 'file', fallback=None)
+    logging.basicConfig(level=level, filename=log_file,
+                        format='%(levelname)s:%(threadName)s:%(name)s:%(message)s')
+    if cfg.getboolean('metrics', 'enabled', fallback=False):
+        start_server(cfg.get('metrics', 'listen_address', fallback='127.0.0.1'),
+                     cfg.getint('metrics', 'listen_port', fallback=9464))
+
+    stop = threading.Event()
+    supervisors = create_supervisors(cfg, opts.conf_file, stop)
+    pool = SessionPool(pool_maxsize=max(10, len(supervisors)))
+    Connector.client_factory = pool.client
+    for supervisor in supervisors:
+        supervisor.start()
+    log.info("started %d connectors: %s", len(supervisors),
+             ', '.join(s.name for s in supervisors))
+    try:
+        while not stop.wait(3600):
+            pass
+    except KeyboardInterrupt:
+        log.info("Interrupted by user")
+        stop.set()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+'''
+Supervision of connectors running in threads of a single process
+'''
+import logging
+import threading
+import time
+from typing import Callable
+import requests
+from requests.adapters import HTTPAdapter
+from ..connector import Connector
+from ..idmefv2client import IDMEFv2Client
+from ..metrics import REGISTRY, ConnectorMetrics
+
+log = logging.getLogger('multi-connector')
+
+_restarts = REGISTRY.counter('idmefv2_connector_restarts_total',
+                             'Restarts of connectors by the supervisor', ('connector',))
+
+class SessionPool:
+    '''
+    HTTP sessions shared by the IDMEFv2 clients of all connectors, one per authentication
+    and verification settings, so that connectors share their connection pool
+    '''
+    def __init__(self, pool_maxsize: int = 10):
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def session(self, login: str = None, password: str = None,
+                verify: bool = True) -> requests.Session:
+        '''
+        Returns the session for these settings, creating it if needed
+        '''
+        key = (login, password, verify)
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_maxsize=self.pool_maxsize)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                if login is not None and password is not None:
+                    session.auth = (login, password)
+                session.verify = verify
+                self._sessions[key] = session
+            return session
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def client(self, url: str, login: str = None, password: str = None, verify: bool = True,
+               metrics: ConnectorMetrics = None) -> IDMEFv2Client:
+        '''
+        An IDMEFv2 client using a shared session, usable as Connector.client_factory
+        '''
+        return IDMEFv2Client(url, metrics=metrics,
+                             session=self.session(login, password, verify))
+
+# pylint: disable=too-many-instance-attributes,too-few-public-methods
+class SupervisedConnector:
+    '''
+    Runs a connector in a thread, restarting it when it stops or crashes.
+
+    The connector is created by the factory in the thread, creation being retried as well.
+    Once created, the connector is kept and its run() method is called again on restart,
+    so that its state (e.g. already seen alerts) is preserved. Restart delay doubles on
+    each consecutive failure, up to max_restart_delay, and is reset once the connector has
+    been running longer than max_restart_delay.
+    '''
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    def __init__(self, name: str, factory: Callable[[], Connector], stop: threading.Event,
+                 restart_delay: float = 5.0, max_restart_delay: float = 300.0):
+        self.name = name
+        self.factory = factory
+        self.restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.connector = None
+        self.restarts = 0
+        self._stop = stop
+        self._restarts = _restarts.labels(name)
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+    def start(self):
+        '''
+        Start the connector thread
+        '''
+        self.thread.start()
+
+    def _run(self):
+        delay = self.restart_delay
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                if self.connector is None:
+                    self.connector = self.factory()
+                log.info("connector %s running", self.name)
+                self.connector.run()
+                log.warning("connector %s stopped", self.name)
+            # connectors call sys.exit() on fatal errors
+            except (Exception, SystemExit) as e:  # pylint: disable=broad-exception-caught
+                log.error("connector %s failed: %r", self.name, e, exc_info=True)
+            if time.monotonic() - started > self.max_restart_delay:
+                delay = self.restart_delay
+            log.info("restarting connector %s in %.1f s", self.name, delay)
+            if self._stop.wait(delay):
+                break
+            self.restarts += 1
+            self._restarts.inc()
+            delay = min(2 * delay, self.max_restart_delay)
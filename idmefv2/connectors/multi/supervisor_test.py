@@ -0,0 +1,72 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the multi-connector supervisor
+'''
+import threading
+from argparse import Namespace
+from .__main__ import create_supervisors
+from .supervisor import SessionPool, SupervisedConnector
+from ..configuration import Configuration
+
+class _FlakyConnector:  # pylint: disable=too-few-public-methods
+    def __init__(self, failures, done):
+        self.failures = failures
+        self.runs = 0
+        self.done = done
+
+    def run(self):
+        self.runs += 1
+        if self.runs <= self.failures:
+            raise RuntimeError('crash')
+        self.done.set()
+
+def test_restart():
+    stop, done = threading.Event(), threading.Event()
+    connector = _FlakyConnector(2, done)
+    supervisor = SupervisedConnector('flaky', lambda: connector, stop, restart_delay=0.01)
+    supervisor.start()
+    assert done.wait(5)
+    stop.set()
+    supervisor.thread.join(5)
+    assert connector.runs == 3
+    assert supervisor.restarts == 2
+    assert supervisor.connector is connector
+
+def test_factory_retry():
+    stop, done = threading.Event(), threading.Event()
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ValueError('not ready')
+        return _FlakyConnector(0, done)
+
+    supervisor = SupervisedConnector('retry', factory, stop, restart_delay=0.01)
+    supervisor.start()
+    assert done.wait(5)
+    stop.set()
+    supervisor.thread.join(5)
+    assert len(attempts) == 3
+
+def test_shared_session():
+    pool = SessionPool()
+    c1 = pool.client('http://127.0.0.1:8888', login='a', password='b')
+    c2 = pool.client('http://127.0.0.1:8888', login='a', password='b')
+    c3 = pool.client('http://127.0.0.1:8888')
+    # pylint: disable=protected-access
+    assert c1._session is c2._session
+    assert c1._session is not c3._session
+    assert c1._session.auth == ('a', 'b')
+
+def test_connectors_named_after_sections(tmp_path):
+    conf = tmp_path / 'multi.conf'
+    conf.write_text('[idmefv2]\nurl = http://127.0.0.1:9999\n'
+                    '[wazuh]\nlogfile = /nonexistent\n'
+                    '[connector:wazuh-a]\ntype = wazuh\n'
+                    '[connector:wazuh-b]\ntype = wazuh\n', encoding='utf-8')
+    cfg = Configuration(Namespace(conf_file=str(conf)))
+    supervisors = create_supervisors(cfg, str(conf), threading.Event())
+    connectors = [supervisor.factory() for supervisor in supervisors]
+    assert [c.metrics.connector for c in connectors] == ['wazuh-a', 'wazuh-b']
+    assert [c.logger.name for c in connectors] == ['wazuh-a-connector', 'wazuh-b-connector']
@@ -0,0 +1,253 @@
+'''
+Profilers that can be attached to any connector from the command line
+
+Three profilers are available:
+    - cprofile: deterministic profiling of the main thread with cProfile, dumped in
+      pstats format
+    - tracemalloc: memory allocation tracing, dumped as a tracemalloc snapshot, with a
+      periodic report of the top allocation sites and of their growth
+    - sample: a statistical profiler sampling the stacks of all threads, dumped in
+      "folded" format usable by flamegraph.pl, speedscope...
+
+Profiles are dumped on SIGUSR1 and on exit.
+
+cProfile and tracemalloc are imported only when their profiler is used, so that connectors
+started without profiling do not pay for their import.
+'''
+# pylint: disable=import-outside-toplevel
+import abc
+import atexit
+import collections
+import logging
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+log = logging.getLogger('profiler')
+
+PROFILERS = ('cprofile', 'tracemalloc', 'sample')
+
+class Profiler(abc.ABC):
+    '''
+    Base class for profilers
+    '''
+    extension = ''
+
+    def __init__(self, output: str, interval: float = 0.0, top: int = 10):
+        '''
+        Args:
+            output (str): path of the dump file
+            interval (float, optional): interval of periodic reports or dumps, in seconds,
+                0 to disable. Defaults to 0.0.
+            top (int, optional): number of entries in periodic reports. Defaults to 10.
+        '''
+        self.output = output
+        self.interval = interval
+        self.top = top
+        self._lock = threading.Lock()
+
+    @abc.abstractmethod
+    def start(self):
+        '''
+        Start profiling, implemented in sub-classes
+        '''
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def _dump(self):
+        raise NotImplementedError
+
+    def dump(self):
+        '''
+        Write the profile to output file
+        '''
+        with self._lock:
+            self._dump()
+        log.info("profile written to %s", self.output)
+
+    def _signal_dump(self, _signum, _frame):
+        # the handler runs in the main thread, possibly interrupting a dump in progress,
+        # e.g. the dump at exit: the non-reentrant lock would then deadlock
+        if not self._lock.acquire(blocking=False):  # pylint: disable=consider-using-with
+            log.warning("profile dump already in progress, SIGUSR1 ignored")
+            return
+        try:
+            self._dump()
+        finally:
+            self._lock.release()
+        log.info("profile written to %s", self.output)
+
+    def report(self):
+        '''
+        Periodic report, called in the profiler thread; default is to dump the profile
+        '''
+        self.dump()
+
+    def _periodic(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.report()
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                log.error("profiler report failed: %s", str(e))
+
+    def install(self):
+        '''
+        Start profiling, dump on SIGUSR1 and on exit and start periodic reports
+        '''
+        self.start()
+        signal.signal(signal.SIGUSR1, self._signal_dump)
+        if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            # exit normally on SIGTERM, so that profile is dumped
+            signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+        atexit.register(self.dump)
+        if self.interval > 0:
+            threading.Thread(target=self._periodic, name='profiler', daemon=True).start()
+        log.info("%s profiling started, dump with: kill -USR1 %d", type(self).__name__,
+                 os.getpid())
+
+class CProfileProfiler(Profiler):
+    '''
+    cProfile profiler of the main thread
+    '''
+    extension = 'prof'
+
+    def __init__(self, output: str, interval: float = 0.0, top: int = 10):
+        super().__init__(output, interval, top)
+        import cProfile
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def _dump(self):
+        # dump_stats disables the profiler
+        self._profile.dump_stats(self.output)
+        self._profile.enable()
+
+    def report(self):
+        # before Python 3.12, the profiler of the main thread cannot be disabled and enabled
+        # again from the profiler thread: the main thread is asked to dump by SIGUSR1
+        os.kill(os.getpid(), signal.SIGUSR1)
+
+class TracemallocProfiler(Profiler):
+    '''
+    Memory allocation profiler, with periodic report of top allocation sites
+    '''
+    extension = 'tracemalloc'
+
+    def __init__(self, output: str, interval: float = 0.0, top: int = 10, frames: int = 1):
+        super().__init__(output, interval, top)
+        self.frames = frames
+        self._previous = None
+
+    def start(self):
+        import tracemalloc
+        tracemalloc.start(self.frames)
+
+    def _dump(self):
+        import tracemalloc
+        tracemalloc.take_snapshot().dump(self.output)
+
+    def report(self):
+        '''
+        Logs the top allocation sites, and the top growing ones since previous report
+        '''
+        import tracemalloc
+        snapshot = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__),))
+        current, peak = tracemalloc.get_traced_memory()
+        log.info("tracemalloc: %.1f KiB allocated, peak %.1f KiB", current / 1024, peak / 1024)
+        log.info("top %d allocation sites:", self.top)
+        for stat in snapshot.statistics('lineno')[:self.top]:
+            log.info("  %s", stat)
+        if self._previous is not None:
+            log.info("top %d growing allocation sites:", self.top)
+            for stat in snapshot.compare_to(self._previous, 'lineno')[:self.top]:
+                log.info("  %s", stat)
+        self._previous = snapshot
+
+class SamplingProfiler(Profiler):
+    '''
+    Statistical profiler sampling the stacks of all threads
+    '''
+    extension = 'folded'
+
+    def __init__(self, output: str, interval: float = 0.0, top: int = 10,
+                 period: float = 0.01):
+        super().__init__(output, interval, top)
+        self.period = period
+        self._stacks = collections.Counter()
+        self._stopped = threading.Event()
+
+    @staticmethod
+    def _folded(frame) -> str:
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}"
+                         f":{code.co_firstlineno})")
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        stacks = []
+        # pylint: disable=protected-access
+        for ident, frame in sys._current_frames().items():
+            if ident != me:
+                stacks.append(names.get(ident, str(ident)) + ';' + self._folded(frame))
+        with self._lock:
+            self._stacks.update(stacks)
+
+    def _run(self):
+        while not self._stopped.wait(self.period):
+            self._sample()
+
+    def start(self):
+        threading.Thread(target=self._run, name='sampling-profiler', daemon=True).start()
+
+    def stop(self):
+        '''
+        Stop sampling
+        '''
+        self._stopped.set()
+
+    def _dump(self):
+        with open(self.output, 'w', encoding='utf-8') as f:
+            for stack, count in self._stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+_PROFILER_CLASSES = {
+    'cprofile': CProfileProfiler,
+    'tracemalloc': TracemallocProfiler,
+    'sample': SamplingProfiler,
+}
+
+def start_profiler(kind: str, name: str, output: str | None = None, interval: float = 0.0,
+                   top: int = 10) -> Profiler:
+    '''
+    Create and install a profiler
+
+    Args:
+        kind (str): one of PROFILERS
+        name (str): connector name, used for the default output path
+        output (str | None, optional): dump file path. Defaults to
+            TMPDIR/idmefv2-NAME-PID.EXT
+        interval (float, optional): periodic report interval. Defaults to 0.0.
+        top (int, optional): number of entries in periodic reports. Defaults to 10.
+
+    Returns:
+        Profiler: the installed profiler
+    '''
+    cls = _PROFILER_CLASSES[kind]
+    if output is None:
+        output = os.path.join(tempfile.gettempdir(),
+                              f"idmefv2-{name}-{os.getpid()}.{cls.extension}")
+    profiler = cls(output, interval, top)
+    profiler.install()
+    return profiler
@@ -0,0 +1,73 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the connector profilers
+'''
+import logging
+import pstats
+import time
+import tracemalloc
+from .connector import ConnectorArgumentParser
+from .profiling import CProfileProfiler, SamplingProfiler, TracemallocProfiler
+
+def _busy(duration):
+    end = time.monotonic() + duration
+    while time.monotonic() < end:
+        sum(range(100))
+
+def test_options():
+    opts = ConnectorArgumentParser('test').parse_args(['-c', 'test.conf'])
+    assert opts.profile is None
+    assert opts.profile_interval == 0.0
+
+def test_cprofile(tmp_path):
+    output = str(tmp_path / 'test.prof')
+    profiler = CProfileProfiler(output)
+    profiler.start()
+    _busy(0.05)
+    profiler.dump()
+    profiler._profile.disable()  # pylint: disable=protected-access
+    stats = pstats.Stats(output)
+    assert any(func[2] == '_busy' for func in stats.stats)
+
+def test_signal_during_dump(tmp_path):
+    output = tmp_path / 'test.prof'
+    profiler = CProfileProfiler(str(output))
+    profiler.start()
+    try:
+        with profiler._lock:  # pylint: disable=protected-access
+            # SIGUSR1 while dumping, e.g. at exit: skipped instead of deadlocking
+            profiler._signal_dump(None, None)  # pylint: disable=protected-access
+        assert not output.exists()
+        profiler._signal_dump(None, None)  # pylint: disable=protected-access
+    finally:
+        profiler._profile.disable()  # pylint: disable=protected-access
+    assert output.exists()
+
+def test_tracemalloc(tmp_path, caplog):
+    output = str(tmp_path / 'test.tracemalloc')
+    profiler = TracemallocProfiler(output, top=3)
+    profiler.start()
+    try:
+        data = [bytearray(1000) for _ in range(100)]
+        with caplog.at_level(logging.INFO, logger='profiler'):
+            profiler.report()
+            profiler.report()
+        profiler.dump()
+    finally:
+        tracemalloc.stop()
+    assert data
+    assert 'top 3 allocation sites' in caplog.text
+    assert 'top 3 growing allocation sites' in caplog.text
+    assert tracemalloc.Snapshot.load(output).traces
+
+def test_sample(tmp_path):
+    output = tmp_path / 'test.folded'
+    profiler = SamplingProfiler(str(output), period=0.001)
+    profiler.start()
+    _busy(0.1)
+    profiler.stop()
+    profiler.dump()
+    lines = output.read_text().splitlines()
+    assert lines
+    assert any('_busy (profiling_test.py' in line for line in lines)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
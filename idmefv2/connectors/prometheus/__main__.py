@@ -1,17 +1,21 @@
 """
 Main module of the Prometheus-IDMEFv2 Connector.
 
-Contains the program's entrypoint with polling mode of operation.
-Polls the Prometheus /api/v1/alerts endpoint for active alerts.
+Contains the program's entrypoint, with two modes of operation:
+- polling: Polls the Prometheus /api/v1/alerts endpoint for active alerts
+- webhook: Starts an HTTP server to receive the alerts notified by Alertmanager
 """
 
 from __future__ import annotations
 
 import logging
+from http.server import ThreadingHTTPServer
 
 from .poller import PrometheusPoller
 from .prometheusconverter import PrometheusConverter
+from .webhook import WebhookHandler, WebhookProcessor, WebhookQueue
 from ..connector import ConnectorArgumentParser, Configuration, Connector
+from ..push import queue_options, serve
 
 
 log = logging.getLogger("prometheus-connector")
@@ -35,6 +39,7 @@ class PollingConnector(Connector):
         disable_seeding = cfg.getboolean(
             "prometheus", "disable_seeding", fallback=False
         )
+        send_resolved = cfg.getboolean("prometheus", "send_resolved", fallback=True)
 
         self.poller = PrometheusPoller(
             prometheus_url=prometheus_url,
@@ -42,6 +47,11 @@ class PollingConnector(Connector):
             converter=converter,
             poll_interval=poll_interval,
             disable_seeding=disable_seeding,
+            metrics=self.metrics,
+            event_log=self.event_log,
+            send_resolved=send_resolved,
+            state_file=cfg.get("prometheus", "state_file", fallback=None),
+            max_tracked=int(cfg.get("prometheus", "max_tracked_alerts", fallback=10000)),
         )
 
     def run(self):
@@ -50,12 +60,66 @@ class PollingConnector(Connector):
         self.poller.run()
 
 
+class WebhookConnector(Connector):
+    """
+    Starts an HTTP server to receive the alerts notified by Alertmanager, and a pool of
+    workers to convert and send them.
+    """
+
+    def __init__(self, cfg: Configuration, converter: PrometheusConverter):
+        """
+        Initialize the webhook connector.
+
+        Args:
+            cfg: Configuration object with connector settings.
+            converter: PrometheusConverter instance for alert transformation.
+        """
+        super().__init__("prometheus", cfg, converter)
+
+        processor = WebhookProcessor(
+            converter=converter,
+            client=self.idmefv2_client,
+            metrics=self.metrics,
+            event_log=self.event_log,
+        )
+        self.queue = WebhookQueue(
+            processor.process,
+            dedup_window=int(cfg.get("connector", "dedup_window", fallback=10000)),
+            metrics=self.metrics,
+            **queue_options(cfg),
+        )
+
+        self.listen_address = cfg.get("connector", "listen_address", fallback="0.0.0.0")
+        self.listen_port = int(cfg.get("connector", "listen_port", fallback=9095))
+        handler = type("WebhookHandler", (WebhookHandler,), {
+            "push_path": cfg.get("connector", "path", fallback="/alerts"),
+            "queue": self.queue,
+            "metrics": self.metrics,
+            "event_log": self.event_log,
+        })
+        self.server = ThreadingHTTPServer((self.listen_address, self.listen_port), handler)
+
+    def run(self):
+        """Serve the webhook until interrupted, then drain the queue."""
+        serve(self.server, self.queue, self.logger)
+
+
+def create_connector(cfg: Configuration) -> Connector:
+    """Create the connector of the mode given by the configuration."""
+    mode = cfg.get("connector", "mode", fallback="polling").lower()
+    if mode not in ("polling", "webhook"):
+        raise ValueError("Mode must be either 'polling' or 'webhook'")
+
+    if mode == "polling":
+        return PollingConnector(cfg, PrometheusConverter())
+    return WebhookConnector(cfg, PrometheusConverter())
+
+
 def main():
     """Parse arguments, load configuration, and start the connector."""
     opts = ConnectorArgumentParser("prometheus").parse_args()
     cfg = Configuration(opts)
-    converter = PrometheusConverter()
-    connector = PollingConnector(cfg, converter)
+    connector = create_connector(cfg)
     connector.run()
 
 
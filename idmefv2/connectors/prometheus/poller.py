@@ -1,20 +1,30 @@
 """
 Poll the Prometheus API for active alerts and forward them to IDMEFv2.
 
-Polls the /api/v1/alerts endpoint at configurable intervals.
+Polls the /api/v1/alerts endpoint at configurable intervals. Polls are cheap when
+alerts did not change: the request is conditional if the server sends an ETag, and a
+response identical to the previous one is not parsed.
+
+Alerts are tracked from firing to resolution: when a firing alert disappears, a
+resolution message is sent, with the ID of the message sent when it fired. The IDs of
+firing alerts can be persisted, to survive a restart.
 """
 from __future__ import annotations
 
+import datetime as _dt
 import hashlib
-import json
 import logging
 import time
 from typing import Any
 
 import requests
 
-from .prometheusconverter import PrometheusConverter
+from .prometheusconverter import PrometheusConverter, PrometheusResolvedConverter
 from ..idmefv2client import IDMEFv2Client
+from ..idmefv2funs import idmefv2_uuid
+from ..metrics import ConnectorMetrics
+from ..eventlog import EventLogger
+from ..statefile import load_state, save_state
 
 log = logging.getLogger("prometheus-poller")
 
@@ -27,17 +37,20 @@ def _generate_alert_fingerprint(alert: dict[str, Any]) -> str:
         alert: The Prometheus alert dict.
 
     Returns:
-        str: A hash string identifying this specific alert instance.
+        str: Alertmanager's fingerprint if the alert has one, else the activeAt and
+        sorted labels of the alert, joined without serializing nor hashing them. Label
+        names cannot contain "=". A string, unlike a tuple, is not tracked by the
+        garbage collector, which matters with thousands of alerts tracked.
     """
-    # Combine alertname, labels, and activeAt to create unique fingerprint
-    alertname = alert.get('labels', {}).get('alertname', '')
-    active_at = alert.get('activeAt', '')
-    labels_str = json.dumps(alert.get('labels', {}), sort_keys=True)
-    fingerprint_data = f"{alertname}:{active_at}:{labels_str}"
-    return hashlib.sha256(fingerprint_data.encode()).hexdigest()[:16]
+    fingerprint = alert.get('fingerprint')
+    if fingerprint:
+        return fingerprint
+    labels = alert.get('labels', {})
+    return alert.get('activeAt', '') + ''.join(
+        [f"\x1f{name}={value}" for name, value in sorted(labels.items())])
 
 
-# pylint: disable=too-few-public-methods
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
 class PrometheusPoller:
     """Continuously polls Prometheus and relays active alerts as IDMEFv2 messages."""
 
@@ -49,6 +62,11 @@ class PrometheusPoller:
         converter: PrometheusConverter,
         poll_interval: int = 30,
         disable_seeding: bool = False,
+        metrics: ConnectorMetrics | None = None,
+        event_log: EventLogger | None = None,
+        send_resolved: bool = True,
+        state_file: str | None = None,
+        max_tracked: int = 10000,
     ) -> None:
         # pylint: disable=too-many-arguments
         """
@@ -60,6 +78,13 @@ class PrometheusPoller:
             converter: Converter instance for transforming alerts.
             poll_interval: Seconds between polling cycles.
             disable_seeding: If True, send all alerts including existing ones.
+            metrics: Connector metrics, updated for each polled alert.
+            event_log: Logger for per-alert messages.
+            send_resolved: If True, send a message when a firing alert is resolved.
+            state_file: File where the IDs of the messages of firing alerts are
+                persisted, None to forget them on restart.
+            max_tracked: Maximum number of firing alerts tracked until resolved, the
+                oldest ones being forgotten first.
         """
         self.prometheus_url = prometheus_url.rstrip('/')
         self.client = client
@@ -67,31 +92,194 @@ class PrometheusPoller:
         self.poll_interval = poll_interval
         self.disable_seeding = disable_seeding
         self.session = requests.Session()
+        # fingerprint and state of the alerts already processed: an alert is processed
+        # again when its state changes, e.g. from pending to firing
         self.seen_alerts: set[str] = set()
+        self.resolved_converter = PrometheusResolvedConverter() if send_resolved else None
+        self.state_file = state_file
+        self.max_tracked = max_tracked
+        # fingerprint of firing alerts -> ID of their message and alert, oldest first
+        self.message_ids: dict[str, dict[str, Any]] = {}
+        self._tracked_changed = False
+        # validators of the last processed response: ETag and digest of its body
+        self._etag: str | None = None
+        self._digest: bytes | None = None
+        self._pending: tuple[str | None, bytes | None] = (None, None)
+        self.metrics = metrics or ConnectorMetrics("prometheus")
+        self.event_log = event_log or EventLogger(log, self.metrics)
 
-    def _fetch_alerts(self) -> list[dict[str, Any]]:
+    def _fetch_alerts(self) -> list[dict[str, Any]] | None:
         """
         Fetch active alerts from Prometheus API.
 
         Returns:
-            list: List of alert dicts from Prometheus.
+            list: List of alert dicts from Prometheus, None if unchanged since the last
+            processed response, i.e. not modified or with an identical body.
 
         Raises:
             requests.RequestException: If the API request fails.
+            ValueError: If the API returns an invalid response or a non-success status.
         """
         url = f"{self.prometheus_url}/api/v1/alerts"
-        response = self.session.get(url, timeout=10)
+        headers = {'If-None-Match': self._etag} if self._etag else None
+        response = self.session.get(url, headers=headers, timeout=10)
+        if response.status_code == 304:
+            return None
         response.raise_for_status()
 
+        digest = hashlib.blake2b(response.content, digest_size=16).digest()
+        if digest == self._digest:
+            return None
+
         data = response.json()
         if data.get('status') != 'success':
-            log.warning("Prometheus API returned non-success status: %s", data)
-            return []
+            # not the list of firing alerts: must not resolve the tracked ones
+            raise ValueError(f"Prometheus API returned non-success status: {data}")
 
+        self._pending = (response.headers.get('ETag'), digest)
         return data.get('data', {}).get('alerts', [])
 
+    def _commit(self) -> None:
+        # the response was processed: skip it next time if unchanged
+        self._etag, self._digest = self._pending
+
+    def _load_state(self) -> None:
+        state = load_state(self.state_file) if self.state_file else None
+        if state is None:
+            return
+        try:
+            self.message_ids = {fingerprint: {'id': str(entry['id']), 'alert': entry['alert']}
+                                for fingerprint, entry in state["alerts"].items()}
+        except (KeyError, TypeError, AttributeError) as exc:
+            log.warning("Ignoring invalid state file %s: %s", self.state_file, exc)
+            return
+        log.info("Tracking %d firing alerts from %s", len(self.message_ids), self.state_file)
+
+    def _save_state(self) -> None:
+        if self.state_file and self._tracked_changed:
+            self._tracked_changed = not save_state(self.state_file, {"alerts": self.message_ids})
+
+    def _track(self, fingerprint: str, alert: dict[str, Any], message_id: str) -> str:
+        """
+        Track a firing alert until resolved.
+
+        Returns:
+            str: The ID of the message of the alert: the ID of the message already sent
+            if the alert is tracked, else message_id.
+        """
+        entry = self.message_ids.get(fingerprint)
+        if entry is not None:
+            return entry['id']
+        self.message_ids[fingerprint] = {
+            'id': message_id,
+            'alert': {'activeAt': alert.get('activeAt', ''), 'labels': alert.get('labels', {})},
+        }
+        if len(self.message_ids) > self.max_tracked:
+            forgotten = next(iter(self.message_ids))
+            del self.message_ids[forgotten]
+            log.debug("Too many firing alerts, forgetting alert %s", forgotten)
+        self._tracked_changed = True
+        return message_id
+
+    def _send(self, idmef: dict[str, Any], alert: dict[str, Any]) -> None:
+        self.event_log.debug("IDMEFv2 message: %s", idmef)
+        self.event_log.info(
+            "Sending IDMEFv2 alert for: %s",
+            alert.get('labels', {}).get('alertname', 'unknown')
+        )
+        try:
+            self.client.post(idmef)
+        except requests.RequestException as post_err:
+            self.event_log.error("Failed to send IDMEFv2 alert: %s", post_err)
+
+    def _resolve(self, current_fingerprints: set[str]) -> None:
+        """
+        Send a resolution message for the tracked alerts not firing anymore, and stop
+        tracking them.
+        """
+        resolved = [fingerprint for fingerprint in self.message_ids
+                    if fingerprint not in current_fingerprints]
+        if not resolved:
+            return
+        ends_at = _dt.datetime.now(_dt.timezone.utc).isoformat()
+        for fingerprint in resolved:
+            entry = self.message_ids.pop(fingerprint)
+            if self.resolved_converter is None:
+                continue
+            alert = dict(entry['alert'], state='resolved', endsAt=ends_at)
+            should_convert, idmef = self.metrics.convert(self.resolved_converter, alert)
+            if should_convert:
+                idmef['ID'] = entry['id']
+                self._send(idmef, alert)
+        self._tracked_changed = True
+
+    def seed(self) -> None:
+        """
+        Restore the tracked firing alerts from the state file, then mark the existing
+        alerts as seen, unless seeding is disabled.
+
+        Firing alerts not restored from the state file are tracked with a new message
+        ID, so that their resolution is still sent, with an ID that does not match the
+        message sent before the restart.
+        """
+        self._load_state()
+        if self.disable_seeding:
+            log.info("Seeding disabled - will send all existing alerts")
+            return
+        try:
+            initial_alerts = self._fetch_alerts() or []
+            for alert in initial_alerts:
+                fingerprint = _generate_alert_fingerprint(alert)
+                self.seen_alerts.add(f"{fingerprint}\x1e{alert.get('state', '')}")
+                if self.converter.filter(alert):
+                    self._track(fingerprint, alert, idmefv2_uuid())
+            self._commit()
+            self._save_state()
+            log.info("Seeded with %d existing alerts", len(self.seen_alerts))
+        except (requests.RequestException, ValueError) as exc:
+            log.warning("Initial fetch failed, starting with empty seed: %s", exc)
+
+    def poll(self) -> None:
+        """
+        One polling cycle: forward new alerts, and resolve the ones not firing anymore.
+        """
+        alerts = self._fetch_alerts()
+        if alerts is None:
+            log.debug("Alerts unchanged since last poll")
+            return
+        fingerprints = [_generate_alert_fingerprint(alert) for alert in alerts]
+        keys = [f"{fingerprint}\x1e{alert.get('state', '')}"
+                for fingerprint, alert in zip(fingerprints, alerts)]
+        self.metrics.events_read.inc(len(alerts))
+
+        new_alerts = 0
+        for fingerprint, key, alert in zip(fingerprints, keys, alerts):
+            if key in self.seen_alerts:
+                continue
+
+            new_alerts += 1
+            self.seen_alerts.add(key)
+            self.event_log.debug("Processing new alert: %s", alert)
+
+            should_convert, idmef = self.metrics.convert(self.converter, alert)
+            if should_convert:
+                idmef['ID'] = self._track(fingerprint, alert, idmef['ID'])
+                self._send(idmef, alert)
+            else:
+                self.event_log.debug("Alert filtered (not in 'firing' state)")
+
+        self.metrics.dedup_hits.inc(len(alerts) - new_alerts)
+
+        self._resolve(set(fingerprints))
+        # Forget resolved alerts: all current alerts are now seen
+        current_keys = set(keys)
+        log.debug("Tracking %d alerts, %d resolved",
+                  len(current_keys), len(self.seen_alerts) - len(current_keys))
+        self.seen_alerts = current_keys
+        self._commit()
+        self._save_state()
+
     def run(self) -> None:
-        # pylint: disable=too-many-statements,too-many-branches
         """
         Start the polling loop.
 
@@ -105,69 +293,19 @@ class PrometheusPoller:
         )
 
         # Initial fetch to seed seen_alerts
-        if self.disable_seeding:
-            log.info("Seeding disabled - will send all existing alerts")
-            print("[PROMETHEUS] Seeding disabled - will send all existing alerts")
-        else:
-            try:
-                initial_alerts = self._fetch_alerts()
-                for alert in initial_alerts:
-                    fingerprint = _generate_alert_fingerprint(alert)
-                    self.seen_alerts.add(fingerprint)
-                log.info("Seeded with %d existing alerts", len(self.seen_alerts))
-                print(f"[PROMETHEUS] Seeded with {len(self.seen_alerts)} existing alerts")
-            except requests.RequestException as exc:
-                log.warning("Initial fetch failed: %s", exc)
-                print("[PROMETHEUS] Initial fetch failed - starting with empty seed")
+        self.seed()
 
         # Main polling loop
         while True:
             try:
-                alerts = self._fetch_alerts()
-                current_fingerprints: set[str] = set()
-
-                for alert in alerts:
-                    fingerprint = _generate_alert_fingerprint(alert)
-                    current_fingerprints.add(fingerprint)
-
-                    if fingerprint in self.seen_alerts:
-                        continue
-
-                    self.seen_alerts.add(fingerprint)
-                    log.debug("Processing new alert: %s", alert)
-                    alertname = alert.get('labels', {}).get('alertname', 'unknown')
-                    print(f"\n[PROMETHEUS] New alert detected: {alertname}")
-                    print(f"[PROMETHEUS] Full alert: {alert}")
-
-                    should_convert, idmef = self.converter.convert(alert)
-                    if should_convert:
-                        print("[PROMETHEUS] Conversion successful, sending IDMEFv2...")
-                        print(f"[PROMETHEUS] IDMEFv2 message: {idmef}")
-                        log.info(
-                            "Sending IDMEFv2 alert for: %s",
-                            alert.get('labels', {}).get('alertname', 'unknown')
-                        )
-                        try:
-                            self.client.post(idmef)
-                            print("[PROMETHEUS] ✓ Send successful!\n")
-                        except requests.RequestException as post_err:
-                            log.error("Failed to send IDMEFv2 alert: %s", post_err)
-                            print(f"[PROMETHEUS] ✗ Send error: {post_err}\n")
-                    else:
-                        print("[PROMETHEUS] Alert filtered (not in 'firing' state)\n")
-
-                # Clean up resolved alerts from seen set
-                resolved = self.seen_alerts - current_fingerprints
-                if resolved:
-                    log.debug("Removing %d resolved alerts from tracking", len(resolved))
-                    self.seen_alerts -= resolved
-
+                self.poll()
+                self.event_log.tick()
                 time.sleep(self.poll_interval)
 
             except KeyboardInterrupt:
                 log.info("Interrupted by user")
                 break
-            except requests.RequestException as exc:
+            except (requests.RequestException, ValueError) as exc:
                 log.error("Polling error: %s", exc)
                 time.sleep(self.poll_interval)
             except Exception as exc:  # pylint: disable=broad-exception-caught
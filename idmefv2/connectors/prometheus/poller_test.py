@@ -0,0 +1,198 @@
+# pylint: disable=missing-function-docstring
+"""
+Tests for the Prometheus poller, against a fake Prometheus API.
+"""
+
+import json
+
+import pytest
+
+from .poller import PrometheusPoller
+from .prometheusconverter import PrometheusConverter
+from ..metrics import ConnectorMetrics, Registry
+
+
+class _Response:
+    def __init__(self, status_code=200, content=b'', headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class _FakePrometheus:  # pylint: disable=too-few-public-methods
+    """Fake Prometheus API, optionally sending an ETag."""
+
+    def __init__(self, etag=False):
+        self.alerts = []
+        self.etag = etag
+        self.requests = []
+        self.error = None
+
+    def get(self, _url, headers=None, **_kwargs):
+        self.requests.append(headers or {})
+        if self.error:
+            content = json.dumps({'status': 'error', 'error': self.error}).encode()
+            return _Response(content=content)
+        content = json.dumps(
+            {'status': 'success', 'data': {'alerts': self.alerts}}).encode()
+        tag = f'"{hash(content)}"'
+        if self.etag and (headers or {}).get('If-None-Match') == tag:
+            return _Response(304)
+        return _Response(content=content, headers={'ETag': tag} if self.etag else {})
+
+
+class _Client:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.posted = []
+
+    def post(self, idmefv2):
+        self.posted.append(idmefv2)
+
+
+def _alert(name, instance='node-1:9100'):
+    return {'state': 'firing', 'activeAt': '2024-01-01T00:00:00Z',
+            'labels': {'alertname': name, 'severity': 'critical', 'instance': instance}}
+
+
+def _poller(prometheus, **kwargs):
+    metrics = ConnectorMetrics('prometheus', Registry())
+    poller = PrometheusPoller(prometheus_url='http://prometheus', client=_Client(),
+                              converter=PrometheusConverter(), metrics=metrics, **kwargs)
+    poller.session = prometheus
+    return poller
+
+
+def test_new_and_resolved_alerts():
+    prometheus = _FakePrometheus()
+    prometheus.alerts = [_alert('Existing')]
+    poller = _poller(prometheus)
+    poller.seed()
+    prometheus.alerts = [_alert('Existing'), _alert('InstanceDown')]
+    poller.poll()
+    assert [m['Description'] for m in poller.client.posted] == ['InstanceDown']
+    # resolved, then firing again
+    prometheus.alerts = [_alert('InstanceDown')]
+    poller.poll()
+    prometheus.alerts = [_alert('InstanceDown'), _alert('Existing')]
+    poller.poll()
+    assert [(m['Description'], 'CeaseTime' in m) for m in poller.client.posted] == \
+        [('InstanceDown', False), ('Existing', True), ('Existing', False)]
+
+
+def test_unchanged_body_is_skipped():
+    prometheus = _FakePrometheus()
+    prometheus.alerts = [_alert('InstanceDown')]
+    poller = _poller(prometheus, disable_seeding=True)
+    poller.seed()
+    poller.poll()
+    poller.poll()
+    assert len(poller.client.posted) == 1
+    # unchanged body: not parsed nor processed
+    assert poller.metrics.events_read.value == 1
+
+
+def test_conditional_requests():
+    prometheus = _FakePrometheus(etag=True)
+    prometheus.alerts = [_alert('InstanceDown')]
+    poller = _poller(prometheus, disable_seeding=True)
+    poller.seed()
+    poller.poll()
+    poller.poll()
+    assert 'If-None-Match' not in prometheus.requests[0]
+    assert 'If-None-Match' in prometheus.requests[1]
+    prometheus.alerts.append(_alert('HighLatency'))
+    poller.poll()
+    assert [m['Description'] for m in poller.client.posted] == ['InstanceDown', 'HighLatency']
+
+
+def test_pending_then_firing():
+    prometheus = _FakePrometheus()
+    pending = dict(_alert('InstanceDown'), state='pending')
+    prometheus.alerts = [pending]
+    poller = _poller(prometheus, disable_seeding=True)
+    poller.seed()
+    poller.poll()
+    assert not poller.client.posted
+    prometheus.alerts = [_alert('InstanceDown')]
+    poller.poll()
+    assert [m['Description'] for m in poller.client.posted] == ['InstanceDown']
+
+
+def test_resolution_reuses_message_id(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    prometheus = _FakePrometheus()
+    prometheus.alerts = [_alert('InstanceDown'), _alert('HighLatency')]
+    poller = _poller(prometheus, disable_seeding=True, state_file=state_file)
+    poller.seed()
+    poller.poll()
+    fired = {m['Description']: m['ID'] for m in poller.client.posted}
+    assert 'CeaseTime' not in poller.client.posted[0]
+
+    prometheus.alerts = [_alert('HighLatency')]
+    poller.poll()
+    resolution = poller.client.posted[-1]
+    assert resolution['ID'] == fired['InstanceDown']
+    assert resolution['Description'] == 'InstanceDown'
+    assert 'CeaseTime' in resolution
+
+    # restarted: the alert still firing is resolved with the ID of its message
+    poller = _poller(prometheus, state_file=state_file)
+    poller.seed()
+    prometheus.alerts = []
+    poller.poll()
+    assert [m['ID'] for m in poller.client.posted] == [fired['HighLatency']]
+    assert not poller.message_ids
+
+
+def test_seeded_alert_is_resolved():
+    prometheus = _FakePrometheus()
+    prometheus.alerts = [_alert('InstanceDown'), dict(_alert('HighLatency'), state='pending')]
+    poller = _poller(prometheus)
+    poller.seed()
+    assert not poller.client.posted
+    assert len(poller.message_ids) == 1
+    prometheus.alerts = []
+    poller.poll()
+    assert [(m['Description'], 'CeaseTime' in m) for m in poller.client.posted] == \
+        [('InstanceDown', True)]
+    assert not poller.message_ids
+
+
+def test_tracked_alerts_are_bounded():
+    prometheus = _FakePrometheus()
+    prometheus.alerts = [_alert(f"Alert{i}") for i in range(3)]
+    poller = _poller(prometheus, disable_seeding=True, max_tracked=2)
+    poller.seed()
+    poller.poll()
+    assert len(poller.message_ids) == 2
+    prometheus.alerts = []
+    poller.poll()
+    # the oldest alert was forgotten: no resolution
+    assert [m['Description'] for m in poller.client.posted[3:]] == ['Alert1', 'Alert2']
+
+
+def test_error_response_does_not_resolve():
+    prometheus = _FakePrometheus()
+    prometheus.alerts = [_alert('InstanceDown')]
+    poller = _poller(prometheus, disable_seeding=True)
+    poller.seed()
+    poller.poll()
+    fired = poller.client.posted[0]['ID']
+    prometheus.error = 'query timed out'
+    with pytest.raises(ValueError):
+        poller.poll()
+    assert len(poller.message_ids) == 1
+    assert len(poller.client.posted) == 1
+    # the same alerts again: not sent again, with the same ID
+    prometheus.error = None
+    poller.poll()
+    assert len(poller.client.posted) == 1
+    prometheus.alerts = []
+    poller.poll()
+    assert [m['ID'] for m in poller.client.posted] == [fired, fired]
@@ -5,7 +5,7 @@ Translate a Prometheus alert object into a fully compliant IDMEFv2 message.
 from __future__ import annotations
 
 import datetime as _dt
-from typing import Any, Mapping
+from typing import Any
 
 from ..jsonconverter import JSONConverter
 from ..idmefv2funs import idmefv2_uuid, idmefv2_my_local_ip
@@ -132,7 +132,16 @@ class PrometheusConverter(JSONConverter):
 
     def __init__(self) -> None:
         """Initialize the converter with the IDMEFv2 template."""
-        template: Mapping[str, Any] = {
+        super().__init__(self._idmefv2_template())
+
+    def _idmefv2_template(self) -> dict[str, Any]:
+        """
+        Build the IDMEFv2 template of the converter.
+
+        Returns:
+            dict: The template mapping Prometheus alert fields to IDMEFv2 fields.
+        """
+        template: dict[str, Any] = {
             'Version': '2.D.V04',
             'ID': idmefv2_uuid,
             'CreateTime': (_convert_timestamp, '$.activeAt'),
@@ -154,7 +163,7 @@ class PrometheusConverter(JSONConverter):
                 },
             ],
         }
-        super().__init__(template)
+        return template
 
     def filter(self, src: dict[str, Any]) -> bool:
         """
@@ -169,3 +178,32 @@ class PrometheusConverter(JSONConverter):
             bool: True if the alert should be converted.
         """
         return src.get('state', '').lower() == 'firing'
+
+
+class PrometheusResolvedConverter(PrometheusConverter):
+    """
+    Convert a resolved Prometheus alert into an IDMEFv2 message closing the one sent when
+    the alert fired.
+
+    The message has the same fields as the firing one, plus the CeaseTime of the alert,
+    taken from its endsAt field. Its ID is the ID of the firing message, set by the caller.
+    """
+
+    def _idmefv2_template(self) -> dict[str, Any]:
+        template = super()._idmefv2_template()
+        template['CeaseTime'] = (_convert_timestamp, '$.endsAt')
+        return template
+
+    def filter(self, src: dict[str, Any]) -> bool:
+        """
+        Filter Prometheus alerts that should be converted.
+
+        Only convert alerts that are in 'resolved' state.
+
+        Args:
+            src: The Prometheus alert dict.
+
+        Returns:
+            bool: True if the alert should be converted.
+        """
+        return src.get('state', '').lower() == 'resolved'
@@ -3,7 +3,7 @@
 Tests for the Prometheus converter.
 """
 
-from .prometheusconverter import PrometheusConverter
+from .prometheusconverter import PrometheusConverter, PrometheusResolvedConverter
 
 
 SAMPLE_ALERT = {
@@ -37,6 +37,17 @@ def test_filter_rejects_non_firing_alerts():
     assert converted is False
 
 
+def test_resolved_conversion():
+    converter = PrometheusResolvedConverter()
+    assert not converter.convert(SAMPLE_ALERT)[0]
+    alert = dict(SAMPLE_ALERT, state="resolved", endsAt="2018-07-04T20:37:12Z")
+    converted, out = converter.convert(alert)
+    assert converted
+    assert out["Description"] == "InstanceDown"
+    assert out["CreateTime"] == "2018-07-04T20:27:12.606021+02:00"
+    assert out["CeaseTime"] == "2018-07-04T20:37:12+00:00"
+
+
 def test_ipv6_instance_hostname_extraction():
     converter = PrometheusConverter()
     alert = {
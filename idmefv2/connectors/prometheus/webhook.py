@@ -0,0 +1,159 @@
+"""
+Module providing classes to receive Alertmanager webhook notifications.
+
+Alertmanager POSTs grouped notifications as soon as alerts fire or resolve, so alerts are
+forwarded without polling delay, including short-lived ones. The HTTP handler acknowledges
+a notification as soon as its alerts are queued; the queue workers then convert them and
+forward them to the IDMEFv2 server, retrying alerts whose forwarding fails.
+"""
+
+from __future__ import annotations
+import json
+import logging
+import threading
+from typing import Any
+
+from .poller import _generate_alert_fingerprint
+from .prometheusconverter import PrometheusConverter
+from ..dedup import DedupWindow
+from ..eventlog import EventLogger
+from ..idmefv2client import IDMEFv2Client
+from ..metrics import ConnectorMetrics
+from ..push import PushHandler, PushQueue
+
+log = logging.getLogger("prometheus-connector")
+
+# pylint: disable=too-few-public-methods
+
+
+def webhook_alerts(notification: dict[str, Any]) -> list[dict[str, Any]]:
+    """
+    Extract the alerts of an Alertmanager webhook notification, in the format of the
+    Prometheus /api/v1/alerts endpoint expected by PrometheusConverter.
+
+    Args:
+        notification: The webhook payload (version 4).
+
+    Returns:
+        The alerts, with their state, activation time, labels, annotations and
+        Alertmanager fingerprint.
+
+    Raises:
+        ValueError: If the payload is not a notification.
+    """
+    if not isinstance(notification, dict) or not isinstance(notification.get("alerts"), list):
+        raise ValueError("missing alerts field")
+    return [
+        {
+            "state": alert.get("status", ""),
+            "activeAt": alert.get("startsAt", ""),
+            "endsAt": alert.get("endsAt", ""),
+            "labels": alert.get("labels", {}),
+            "annotations": alert.get("annotations", {}),
+            "fingerprint": alert.get("fingerprint", ""),
+        }
+        for alert in notification["alerts"]
+        if isinstance(alert, dict)
+    ]
+
+
+class WebhookProcessor:
+    """
+    Converts a notified alert and forwards it to the IDMEFv2Client, letting forwarding
+    errors propagate so that the queue retries the alert.
+    """
+
+    def __init__(
+        self,
+        *,
+        converter: PrometheusConverter,
+        client: IDMEFv2Client,
+        metrics: ConnectorMetrics | None = None,
+        event_log: EventLogger | None = None,
+    ) -> None:
+        self.converter = converter
+        self.client = client
+        self.metrics = metrics or ConnectorMetrics("prometheus")
+        self.event_log = event_log or EventLogger(log, self.metrics)
+
+    def process(self, alert: dict[str, Any]) -> None:
+        """
+        Convert and forward a notified alert.
+
+        Raises:
+            requests.RequestException: if the alert cannot be forwarded.
+        """
+        converted, idmef = self.metrics.convert(self.converter, alert)
+        if converted:
+            self.event_log.info(
+                "Sending IDMEFv2 alert for: %s",
+                alert.get("labels", {}).get("alertname", "unknown"),
+            )
+            self.client.post(idmef)
+
+
+class WebhookQueue(PushQueue):
+    """
+    Queue of notified alerts processed by a pool of workers.
+
+    Alertmanager notifies again the alerts of a group still firing, with each new alert of
+    the group and every repeat_interval: alerts already queued with the same activation
+    time and state are dropped, in a window of the last dedup_window alerts.
+    """
+
+    def __init__(self, process, *, dedup_window: int = 10000, **kwargs) -> None:
+        """
+        Args:
+            process: processes an alert, raises on failure.
+            dedup_window: number of last queued alerts remembered.
+            kwargs: PushQueue options.
+        """
+        super().__init__(process, id_field="fingerprint", **kwargs)
+        self.seen = DedupWindow(dedup_window)
+        self._seen_lock = threading.Lock()
+
+    def put(self, src: dict[str, Any]) -> bool:
+        """
+        Queue an alert, unless already queued with the same activation time and state.
+
+        Returns:
+            bool: False if the alert was refused because the queue is full.
+        """
+        key = (_generate_alert_fingerprint(src), src["activeAt"], src["state"])
+        with self._seen_lock:
+            if key in self.seen:
+                self.metrics.dedup_hits.inc()
+                return True
+            if not super().put(src):
+                return False
+            self.seen.add(key)
+        return True
+
+
+class WebhookHandler(PushHandler):
+    """
+    HTTP handler for Alertmanager webhook notifications.
+    Expects POST on push_path with a notification, and acknowledges it as soon as its
+    alerts are queued: they are then converted and forwarded by the workers of the queue.
+    """
+    push_path = "/alerts"
+    metrics: ConnectorMetrics = ConnectorMetrics("prometheus")
+    event_log: EventLogger = EventLogger(log)
+
+    def queue_alerts(self, body: bytes) -> tuple[int, str] | None:
+        """Parse a notification and queue its alerts."""
+        try:
+            alerts = webhook_alerts(json.loads(body))
+        except ValueError as exc:
+            self.metrics.parse_failures.inc()
+            self.event_log.error("Invalid webhook notification: %s", exc)
+            return 400, "Bad Request - invalid notification"
+
+        self.metrics.events_read.inc(len(alerts))
+        self.event_log.debug("Received %d notified alerts", len(alerts))
+        # alerts queued before the queue is full are deduplicated when Alertmanager retries
+        for alert in alerts:
+            error = self.put(alert)
+            if error is not None:
+                return error
+        return None
@@ -0,0 +1,99 @@
+# pylint: disable=missing-function-docstring
+"""
+Tests for the Alertmanager webhook receiver.
+"""
+
+import json
+import os
+import threading
+
+import requests
+
+from .prometheusconverter import PrometheusConverter
+from .webhook import WebhookHandler, WebhookProcessor, WebhookQueue, webhook_alerts
+from ..metrics import ConnectorMetrics, Registry
+from ..push_test import _post, _serve, _stop
+
+
+def _notification(*alerts):
+    return {'version': '4', 'status': 'firing', 'receiver': 'idmefv2', 'alerts': [
+        {'status': status, 'startsAt': '2024-01-01T00:00:00Z',
+         'endsAt': '0001-01-01T00:00:00Z', 'fingerprint': f"fp-{name}",
+         'labels': {'alertname': name, 'severity': 'critical', 'instance': 'node-1:9100'},
+         'annotations': {'summary': name}}
+        for name, status in alerts]}
+
+
+def _notify(port, *alerts):
+    return _post(port, '/alerts', json.dumps(_notification(*alerts)).encode())
+
+
+def test_webhook_alerts_are_converted():
+    alerts = webhook_alerts(_notification(('InstanceDown', 'firing'), ('Gone', 'resolved')))
+    assert [a['fingerprint'] for a in alerts] == ['fp-InstanceDown', 'fp-Gone']
+    converter = PrometheusConverter()
+    converted, message = converter.convert(alerts[0])
+    assert converted
+    assert message['Description'] == 'InstanceDown'
+    assert message['Priority'] == 'High'
+    assert not converter.convert(alerts[1])[0]
+
+
+def test_ack_before_processing():
+    release = threading.Event()
+    processed = []
+
+    def process(alert):
+        release.wait(5)
+        processed.append(alert['labels']['alertname'])
+
+    metrics = ConnectorMetrics('prometheus', Registry())
+    queue = WebhookQueue(process, workers=1, max_pending=2, metrics=metrics,
+                         registry=Registry())
+    server = _serve(type('Handler', (WebhookHandler,), {'queue': queue, 'metrics': metrics}))
+    port = server.server_port
+    try:
+        group = (('InstanceDown', 'firing'), ('HighLatency', 'firing'))
+        assert _notify(port, *group) == 200
+        # notified again with the rest of the group: already queued alerts are dropped
+        assert _notify(port, *group) == 200
+        assert metrics.dedup_hits.value == 2
+        assert _notify(port, ('DiskFull', 'firing')) == 503
+        assert _post(port, '/alerts', b'not json') == 400
+        assert _post(port, '/other', b'{}') == 404
+        assert metrics.queue_depth.value == 2
+    finally:
+        release.set()
+        queue.shutdown()
+        _stop(server)
+    assert sorted(processed) == ['HighLatency', 'InstanceDown']
+    assert metrics.queue_depth.value == 0
+    assert metrics.parse_failures.value == 1
+
+
+class _FailingClient:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.attempts = 0
+
+    def post(self, _idmefv2):
+        self.attempts += 1
+        raise requests.ConnectionError('server unreachable')
+
+
+def test_failed_post_is_retried_then_kept(tmp_path):
+    client = _FailingClient()
+    metrics = ConnectorMetrics('prometheus', Registry())
+    processor = WebhookProcessor(converter=PrometheusConverter(), client=client,
+                                 metrics=metrics)
+    queue = WebhookQueue(processor.process, workers=1, spool_dir=str(tmp_path),
+                         max_attempts=3, retry_delay=0, metrics=metrics, registry=Registry())
+    server = _serve(type('Handler', (WebhookHandler,), {'queue': queue, 'metrics': metrics}))
+    try:
+        assert _notify(server.server_port, ('InstanceDown', 'firing')) == 200
+    finally:
+        queue.shutdown()
+        _stop(server)
+    assert client.attempts == 3
+    assert metrics.retries.value == 2
+    assert metrics.events_read.value == 1
+    assert [name.endswith('.json.failed') for name in os.listdir(tmp_path)] == [True]
@@ -0,0 +1,307 @@
+'''
+Alerts pushed to connectors over HTTP: a base request handler acknowledging alerts as
+soon as queued, and the queue of pushed alerts processed by a pool of workers
+'''
+from __future__ import annotations
+import abc
+import inspect
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Any, Callable
+from .configuration import Configuration
+from .eventlog import EventLogger
+from .metrics import REGISTRY, ConnectorMetrics, Registry
+
+log = logging.getLogger('push')
+
+# pylint: disable=too-many-instance-attributes
+class PushQueue:
+    '''
+    Queue of pushed alerts processed by a pool of workers.
+
+    With a spool directory, each alert is written to a file before being acknowledged
+    and removed once processed, so that alerts acknowledged but not processed yet are
+    recovered on restart. An alert whose processing fails is retried with an exponential
+    backoff, then its file is renamed with a .failed suffix.
+    '''
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        process: Callable[[dict[str, Any]], None],
+        *,
+        workers: int = 4,
+        max_pending: int = 1000,
+        spool_dir: str | None = None,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+        metrics: ConnectorMetrics | None = None,
+        registry: Registry = REGISTRY,
+        id_field: str = 'eventid',
+    ) -> None:
+        '''
+        Args:
+            process (Callable): processes an alert, raises on failure.
+            workers (int, optional): number of alerts processed concurrently. Defaults to 4.
+            max_pending (int, optional): maximum number of alerts queued or being processed,
+                beyond which new alerts are refused. Defaults to 1000.
+            spool_dir (str, optional): directory where queued alerts are persisted, None to
+                keep them in memory only. Defaults to None.
+            max_attempts (int, optional): number of processing attempts of an alert.
+                Defaults to 3.
+            retry_delay (float, optional): delay in seconds before the first retry, doubled
+                on each retry. Defaults to 5.0.
+            metrics (ConnectorMetrics, optional): connector metrics, for queue_depth and
+                retries. Defaults to None.
+            registry (Registry, optional): registry of the delivery latency metric.
+                Defaults to REGISTRY.
+            id_field (str, optional): field identifying alerts in logs. Defaults to 'eventid'.
+        '''
+        self._process = process
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.spool_dir = spool_dir
+        self.id_field = id_field
+        self.metrics = metrics or ConnectorMetrics('push')
+        self.delivery_seconds = registry.histogram(
+            'idmefv2_connector_push_delivery_seconds',
+            'Time from the acknowledgement of a pushed alert to the end of its processing',
+            ('connector',),
+        ).labels(self.metrics.connector)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix=f"{self.metrics.connector}-push"
+        )
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+
+    def _spool(self, src: dict[str, Any]) -> str | None:
+        if not self.spool_dir:
+            return None
+        fd, tmp = tempfile.mkstemp(dir=self.spool_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(src, f)
+            f.flush()
+            os.fsync(f.fileno())
+        path = os.path.join(self.spool_dir, f"{time.time_ns():020d}-{os.getpid()}"
+                            f"-{threading.get_ident()}.json")
+        os.replace(tmp, path)
+        return path
+
+    def _submit(self, src: dict[str, Any], path: str | None) -> None:
+        self.metrics.queue_depth.inc()
+        self._executor.submit(self._run, src, path, time.perf_counter())
+
+    def put(self, src: dict[str, Any]) -> bool:
+        '''
+        Queue an alert, persisting it first if there is a spool directory
+
+        Args:
+            src (dict): the alert
+
+        Raises:
+            OSError: if the alert cannot be persisted
+
+        Returns:
+            bool: False if the alert was refused because the queue is full
+        '''
+        if not self._slots.acquire(blocking=False):  # pylint: disable=consider-using-with
+            return False
+        try:
+            path = self._spool(src)
+        except OSError:
+            self._slots.release()
+            raise
+        self._submit(src, path)
+        return True
+
+    def recover(self) -> int:
+        '''
+        Queue the alerts persisted in the spool directory by a previous run
+
+        Returns:
+            int: number of alerts recovered
+        '''
+        if not self.spool_dir:
+            return 0
+        count = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, name)
+            if name.endswith('.tmp'):
+                os.unlink(path)
+                continue
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(path, encoding='utf-8') as f:
+                    src = json.load(f)
+            except (OSError, ValueError) as exc:
+                log.warning("Cannot recover pushed alert %s: %s", path, exc)
+                os.replace(path, path + '.failed')
+                continue
+            self._slots.acquire()  # pylint: disable=consider-using-with
+            self._submit(src, path)
+            count += 1
+        return count
+
+    def _run(self, src: dict[str, Any], path: str | None, queued: float) -> None:
+        alert_id = src.get(self.id_field)
+        try:
+            for attempt in range(self.max_attempts):
+                if attempt:
+                    self.metrics.retries.inc()
+                    time.sleep(self.retry_delay * 2 ** (attempt - 1))
+                try:
+                    self._process(dict(src))
+                    break
+                except Exception as exc:  # pylint: disable=broad-exception-caught
+                    log.warning("Processing of pushed alert %s failed (attempt %d/%d): %s",
+                                alert_id, attempt + 1, self.max_attempts, exc)
+            else:
+                log.error("Giving up pushed alert %s", alert_id)
+                if path:
+                    os.replace(path, path + '.failed')
+                    path = None
+            if path:
+                os.unlink(path)
+        finally:
+            self.delivery_seconds.observe(time.perf_counter() - queued)
+            self.metrics.queue_depth.dec()
+            self._slots.release()
+
+    def shutdown(self):
+        '''
+        Wait for the queued alerts to be processed
+        '''
+        self._executor.shutdown(wait=True)
+
+def queue_options(cfg: Configuration) -> dict[str, Any]:
+    '''
+    Read the PushQueue options from the [connector] section of a configuration
+
+    Args:
+        cfg (Configuration): the connector configuration
+
+    Returns:
+        dict: the workers, max_pending, spool_dir, max_attempts and retry_delay options
+    '''
+    return {
+        'workers': cfg.getint('connector', 'workers', fallback=4),
+        'max_pending': cfg.getint('connector', 'max_pending', fallback=1000),
+        'spool_dir': cfg.get('connector', 'spool_dir', fallback=None),
+        'max_attempts': cfg.getint('connector', 'max_attempts', fallback=3),
+        'retry_delay': cfg.getfloat('connector', 'retry_delay', fallback=5.0),
+    }
+
+class PushHandler(BaseHTTPRequestHandler, abc.ABC):
+    '''
+    Base HTTP handler of pushed alerts: POST requests sent to push_path are acknowledged
+    as soon as their alerts are queued, by queue_alerts implemented in sub-classes.
+
+    Class attributes are set by the connector, on a sub-class.
+    '''
+    push_path = '/alert'
+    queue: PushQueue
+    metrics: ConnectorMetrics = ConnectorMetrics('push')
+    event_log: EventLogger = EventLogger(log)
+    ack_seconds = REGISTRY.histogram(
+        'idmefv2_connector_push_ack_seconds',
+        'Time to acknowledge a pushed alert, from request to response',
+        ('connector',),
+    )
+
+    def log_message(self, *_args, **_kwargs) -> None:
+        # disable base class logging
+        return
+
+    @abc.abstractmethod
+    def queue_alerts(self, body: bytes) -> tuple[int, str] | None:
+        '''
+        Parse a request body and queue its alerts, implemented in sub-classes
+
+        Args:
+            body (bytes): the request body
+
+        Returns:
+            tuple[int, str]: the error status and reason, None if the alerts were queued
+        '''
+        raise NotImplementedError
+
+    def put(self, src: dict[str, Any]) -> tuple[int, str] | None:
+        '''
+        Queue an alert
+
+        Args:
+            src (dict): the alert
+
+        Returns:
+            tuple[int, str]: the error status and reason, None if the alert was queued
+        '''
+        try:
+            queued = self.queue.put(src)
+        except OSError as exc:
+            log.exception("Cannot spool pushed alert")
+            return 500, f"Internal Server Error: {exc}"
+        if not queued:
+            return 503, "Service Unavailable - too many pending alerts"
+        return None
+
+    # pylint: disable=invalid-name
+    def do_POST(self):
+        '''
+        Handle POST requests sent to push_path
+        '''
+        if self.path != self.push_path:
+            self.send_error(404, "Not Found")
+            return
+
+        start = time.perf_counter()
+        length = int(self.headers.get('Content-Length', 0))
+        body = self.rfile.read(length)
+        self.event_log.tick()
+        error = self.queue_alerts(body)
+        if error is not None:
+            self.send_error(*error)
+            return
+
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(b"OK")
+        self.ack_seconds.labels(self.metrics.connector).observe(time.perf_counter() - start)
+
+def serve(server: HTTPServer, queue: PushQueue, logger: logging.Logger):
+    '''
+    Serve pushed alerts until interrupted, after queueing the alerts spooled by a previous
+    run, then wait for the queued alerts to be processed
+
+    Args:
+        server (HTTPServer): the HTTP server, with a PushHandler
+        queue (PushQueue): the queue of the handler
+        logger (logging.Logger): the connector logger
+
+    Raises:
+        TypeError: if the handler does not implement queue_alerts, checked before serving
+            as handlers are only created on requests
+    '''
+    handler = server.RequestHandlerClass
+    if inspect.isabstract(handler):
+        raise TypeError(f"{handler.__name__} does not implement "
+                        f"{', '.join(sorted(handler.__abstractmethods__))}")
+    recovered = queue.recover()
+    if recovered:
+        logger.info("Recovered %d spooled alerts", recovered)
+    host, port = server.server_address[:2]
+    logger.info("HTTP server listening on %s:%d%s", host, port,
+                server.RequestHandlerClass.push_path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Interrupted by user")
+    finally:
+        server.server_close()
+        queue.shutdown()
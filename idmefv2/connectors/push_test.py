@@ -0,0 +1,66 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the queue of pushed alerts
+'''
+import logging
+import os
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import pytest
+from .metrics import ConnectorMetrics, Registry
+from .push import PushHandler, PushQueue, serve
+
+def _post(port: int, path: str, body: bytes) -> int:
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=body)
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as exc:
+        return exc.code
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _stop(server: ThreadingHTTPServer):
+    server.shutdown()
+    server.server_close()
+
+def test_spool_recovery_and_retries(tmp_path):
+    attempts = []
+
+    def failing(src):
+        attempts.append(src['eventid'])
+        raise RuntimeError('server unreachable')
+
+    metrics = ConnectorMetrics('test', Registry())
+    queue = PushQueue(failing, workers=1, spool_dir=str(tmp_path), max_attempts=2,
+                      retry_delay=0, metrics=metrics, registry=Registry())
+    queue.put({'eventid': '1'})
+    queue.shutdown()
+    assert attempts == ['1', '1']
+    assert metrics.retries.value == 1
+    assert [name.endswith('.json.failed') for name in os.listdir(tmp_path)] == [True]
+
+    # alerts spooled but not processed by a previous run are recovered
+    (tmp_path / '00000000000000000001-1-1.json').write_text('{"eventid": "2"}')
+    processed = []
+    queue = PushQueue(lambda src: processed.append(src['eventid']), spool_dir=str(tmp_path),
+                      metrics=metrics, registry=Registry())
+    assert queue.recover() == 1
+    queue.shutdown()
+    assert processed == ['2']
+    assert len(os.listdir(tmp_path)) == 1
+
+def test_abstract_handler_is_not_served():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PushHandler)
+    queue = PushQueue(lambda src: None, workers=1, registry=Registry())
+    try:
+        with pytest.raises(TypeError, match='queue_alerts'):
+            serve(server, queue, logging.getLogger('test'))
+    finally:
+        server.server_close()
+        queue.shutdown()
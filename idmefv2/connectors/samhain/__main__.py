@@ -3,7 +3,7 @@ The Samhain connector main.
 """
 import sys
 from ..configuration import Configuration
-from ..connector import ConnectorArgumentParser, LogFileConnector
+from ..connector import ConnectorArgumentParser, Connector, LogFileConnector
 from .samhainconverter import SamhainConverter
 from .samhaintailer import SamhainFileTailer
 
@@ -43,28 +43,21 @@ class SamhainConnector(LogFileConnector):
         for line in ft.tail():
             self.alert(line.decode('utf-8', errors='replace'))
 
-    def alert(self, a):
+    def parse(self, a):
         """
-        Process an alert:
-            - call converter
-            - if alert was converted, send it to IDMEFv2 server
+        Parse an alert: Samhain logs are text, not JSON strings, so the line is passed
+        unchanged to the converter.
 
-        Overrides base Connector.alert() because Samhain logs are text, not JSON strings.
-        We do NOT want json.loads(a).
+        Overrides base Connector.parse(), which does json.loads(a).
         """
-        # 'a' is a line from the file tailer (string)
-        self.logger.debug("received %s", a.strip())
+        return a
 
-        # Pass the raw string to our converter
-        (converted, idmefv2_alert) = self.converter.convert(a)
 
-        if converted and idmefv2_alert:
-            self.logger.info("sending IDMEFv2 alert %s", str(idmefv2_alert))
-            try:
-                self.idmefv2_client.post(idmefv2_alert)
-            # pylint: disable=broad-exception-caught
-            except Exception as e:
-                self.logger.error('POST failed with error %s', str(e))
+def create_connector(cfg: Configuration) -> Connector:
+    """
+    Create the connector from its configuration
+    """
+    return SamhainConnector(cfg)
 
 
 def main():
@@ -77,7 +70,7 @@ def main():
     # Load configuration
     cfg = Configuration(args)
 
-    connector = SamhainConnector(cfg)
+    connector = create_connector(cfg)
     connector.run()
 
 
@@ -0,0 +1,57 @@
+'''
+JSON state files, used by polling connectors to persist their state across restarts
+'''
+import contextlib
+import json
+import logging
+import os
+import tempfile
+from typing import Any
+
+log = logging.getLogger('statefile')
+
+def load_state(path: str) -> Any:
+    '''
+    Load a state file
+
+    Args:
+        path (str): the state file
+
+    Returns:
+        Any: the decoded JSON content, None if the file does not exist or is invalid
+    '''
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        log.warning("Ignoring invalid state file %s: %s", path, exc)
+        return None
+
+def save_state(path: str, state: Any) -> bool:
+    '''
+    Save a state file atomically: the file is either the previous or the new state, even
+    if the connector is killed while writing it
+
+    Args:
+        path (str): the state file
+        state (Any): the state, serializable to JSON
+
+    Returns:
+        bool: True if saved, False if the file could not be written
+    '''
+    directory = os.path.dirname(os.path.abspath(path))
+    tmp = None
+    try:
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+        return True
+    except OSError as exc:
+        log.warning("Cannot save state file %s: %s", path, exc)
+        if tmp is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp)
+        return False
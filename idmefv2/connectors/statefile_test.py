@@ -0,0 +1,24 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for JSON state files
+'''
+from .statefile import load_state, save_state
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / 'state.json')
+    assert load_state(path) is None
+    assert save_state(path, {'eventid': '42'})
+    assert load_state(path) == {'eventid': '42'}
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
+
+def test_invalid_state(tmp_path):
+    path = tmp_path / 'state.json'
+    path.write_text('{"eventid": ')
+    assert load_state(str(path)) is None
+    assert not save_state(str(tmp_path / 'missing' / 'state.json'), {})
+
+def test_failed_save_leaves_no_temp_file(tmp_path):
+    # a directory cannot be replaced by the state file
+    (tmp_path / 'state.json').mkdir()
+    assert not save_state(str(tmp_path / 'state.json'), {'eventid': '42'})
+    assert [p.name for p in tmp_path.iterdir()] == ['state.json']
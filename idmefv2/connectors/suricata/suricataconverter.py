@@ -66,7 +66,7 @@ class SuricataConverter(JSONConverter):
             "IP": idmefv2_my_local_ip,
             "Name": "suricata",
             "Model": "Suricata NIDS",
-            "Type": "Cyber",
+            "Type": ["Cyber"],
             "Category": [
                 "NIDS"
             ],
@@ -37,6 +37,9 @@ class TpotConnector(Connector):
         )
 
         catch_up = cfg.getboolean("tpot", "catch_up", fallback=False)
+        page_size = int(cfg.get("tpot", "page_size", fallback="1000"))
+        dedup_window = float(cfg.get("tpot", "dedup_window", fallback="60"))
+        dedup_entries = int(cfg.get("tpot", "dedup_entries", fallback="100000"))
 
         self.poller = TpotPoller(
             elasticsearch_url=elasticsearch_url,
@@ -44,7 +47,12 @@ class TpotConnector(Connector):
             client=self.idmefv2_client,
             converter=converter,
             poll_interval=poll_interval,
-            catch_up=catch_up
+            catch_up=catch_up,
+            page_size=page_size,
+            dedup_window=dedup_window,
+            dedup_entries=dedup_entries,
+            metrics=self.metrics,
+            event_log=self.event_log,
         )
 
     def run(self):
@@ -53,11 +61,16 @@ class TpotConnector(Connector):
         self.poller.run()
 
 
+def create_connector(cfg: Configuration) -> Connector:
+    """Create the connector from its configuration."""
+    return TpotConnector(cfg)
+
+
 def main():
     """Parse arguments, load configuration, and start the connector."""
     opts = ConnectorArgumentParser("tpot").parse_args()
     cfg = Configuration(opts)
-    connector = TpotConnector(cfg)
+    connector = create_connector(cfg)
     connector.run()
 
 
@@ -1,28 +1,43 @@
 """
 Poll Elasticsearch for T-Pot honeypot events and forward them as IDMEFv2.
+
+Each polling cycle opens a point in time (PIT) on the index pattern and pages through
+the events newer than the last one processed with search_after, sorted by timestamp and
+shard document order, until caught up. Events sharing the timestamp of the last one are
+fetched again by the next cycle and dropped as duplicates: only the events of the last
+dedup_window seconds are remembered for that.
+
+Only the events having the fields required by the converter are fetched, with only the
+fields read by its template: large sensor payloads are neither transferred nor decoded.
 """
 from __future__ import annotations
 
-import hashlib
 import logging
 import time
-from typing import Any
+from typing import Any, Iterator
 
 import requests
 
 from .tpotconverter import TpotConverter
 from ..idmefv2client import IDMEFv2Client
+from ..dedup import DedupWindow
+from ..metrics import REGISTRY, ConnectorMetrics, Registry
+from ..eventlog import EventLogger
 
 log = logging.getLogger("tpot-poller")
 
 def _generate_event_fingerprint(hit: dict[str, Any]) -> str:
-    """Generate a unique fingerprint for an Elasticsearch hit."""
-    event_type = hit.get('type', '')
-    timestamp = hit.get('@timestamp', '')
-    src_ip = hit.get('src_ip', '')
-    dst_ip = hit.get('dst_ip', '')
-    fingerprint_data = f"{event_type}:{timestamp}:{src_ip}:{dst_ip}"
-    return hashlib.sha256(fingerprint_data.encode()).hexdigest()[:16]
+    """
+    Generate a unique fingerprint for an Elasticsearch hit: its index and document ID.
+    Events of a burst often share their timestamp, type and addresses.
+    """
+    return f"{hit.get('_index', '')}/{hit.get('_id', '')}"
+
+
+def _sort_time(hit: dict[str, Any]) -> float | None:
+    """The time of an Elasticsearch hit: its @timestamp sort value, in milliseconds."""
+    sort = hit.get('sort')
+    return float(sort[0]) if sort else None
 
 
 class TpotPoller:  # pylint: disable=too-many-instance-attributes,too-few-public-methods
@@ -37,8 +52,26 @@ class TpotPoller:  # pylint: disable=too-many-instance-attributes,too-few-public
         converter: TpotConverter,
         poll_interval: int = 30,
         catch_up: bool = False,
+        metrics: ConnectorMetrics | None = None,
+        event_log: EventLogger | None = None,
+        page_size: int = 1000,
+        pit_keep_alive: str = "1m",
+        dedup_window: float = 60.0,
+        dedup_entries: int = 100000,
+        registry: Registry = REGISTRY,
     ) -> None:
-        """Initialize the T-Pot Elasticsearch poller."""
+        """
+        Initialize the T-Pot Elasticsearch poller.
+
+        Events are fetched by pages of page_size events, in a point in time kept alive
+        pit_keep_alive between pages.
+
+        Events are remembered to drop duplicates while not older than dedup_window seconds
+        before the last event, up to dedup_entries events.
+
+        Events are fetched with the fields read by the converter only, if it lists them,
+        and when they have the fields required by its filter.
+        """
         self.elasticsearch_url = elasticsearch_url.rstrip('/')
         self.index_pattern = index_pattern
         self.client = client
@@ -46,53 +79,90 @@ class TpotPoller:  # pylint: disable=too-many-instance-attributes,too-few-public
         self.poll_interval = poll_interval
         self.catch_up = catch_up  # save state
         self.session = requests.Session()
-        self.seen_events: set[str] = set()
+        self.seen_events = DedupWindow(dedup_entries)
+        self.dedup_window = dedup_window
         self.last_timestamp: str | None = None
+        self.page_size = page_size
+        self.pit_keep_alive = pit_keep_alive
+        fields = converter.source_fields()
+        # @timestamp is needed for the cursor, whether the converter reads it or not
+        self.source_fields = None if fields is None else sorted({"@timestamp", *fields})
+        # exists filters: events filtered out by the converter are not fetched
+        self.required_filters = [
+            {"exists": {"field": field}} for field in converter.REQUIRED_FIELDS
+        ]
+        self.metrics = metrics or ConnectorMetrics("tpot")
+        self.event_log = event_log or EventLogger(log, self.metrics)
+        registry.gauge(
+            "idmefv2_connector_dedup_entries",
+            "Identifiers of already seen events remembered by polling connectors",
+            ("connector",),
+        ).labels(self.metrics.connector).set_function(lambda: len(self.seen_events))
+
+    def _post(self, path: str, body: dict[str, Any]) -> dict[str, Any]:
+        response = self.session.post(
+            f"{self.elasticsearch_url}/{path}",
+            json=body,
+            headers={"Content-Type": "application/json"},
+            timeout=10
+        )
+        response.raise_for_status()
+        return response.json()
 
-    def _build_query(self) -> dict[str, Any]:
-        """Build the Elasticsearch query."""
+    def _build_query(self, pit_id: str, search_after: list[Any] | None) -> dict[str, Any]:
+        """Build the Elasticsearch query of a page."""
         query: dict[str, Any] = {
-            "size": 100,
-            "sort": [{"@timestamp": {"order": "asc"}}],
+            "size": self.page_size,
+            "pit": {"id": pit_id, "keep_alive": self.pit_keep_alive},
+            # _shard_doc breaks ties between events sharing their timestamp
+            "sort": [{"@timestamp": {"order": "asc"}}, {"_shard_doc": {"order": "asc"}}],
+            "track_total_hits": False,
             "query": {
                 "bool": {
-                    "must": [
-                        {"exists": {"field": "src_ip"}}
-                    ]
+                    "filter": list(self.required_filters)
                 }
             }
         }
 
+        if self.source_fields is not None:
+            query["_source"] = {"includes": self.source_fields}
         if self.last_timestamp:
-            query["query"]["bool"]["filter"] = [
-                {"range": {"@timestamp": {"gt": self.last_timestamp}}}
-            ]
+            # gte: events indexed after the last cycle may share the last timestamp
+            query["query"]["bool"]["filter"].insert(
+                0, {"range": {"@timestamp": {"gte": self.last_timestamp}}}
+            )
+        if search_after is not None:
+            query["search_after"] = search_after
 
         return query
 
-    def _fetch_events(self) -> list[dict[str, Any]]:
-        """Fetch T-Pot honeypot events from Elasticsearch."""
-        url = f"{self.elasticsearch_url}/{self.index_pattern}/_search"
-        query = self._build_query()
-
-        response = self.session.post(
-            url,
-            json=query,
-            headers={"Content-Type": "application/json"},
-            timeout=10
-        )
-        response.raise_for_status()
-
-        data = response.json()
-        hits = data.get('hits', {}).get('hits', [])
-
-        results = []
-        for hit in hits:
-            source = hit.get('_source', {})
-            if source:
-                results.append(source)
-
-        return results
+    def _fetch_pages(self) -> Iterator[list[dict[str, Any]]]:
+        """
+        Fetch the T-Pot honeypot events newer than the last timestamp from Elasticsearch,
+        page after page until caught up.
+
+        Yields:
+            list: The hits of a page, with their index, ID and _source.
+        """
+        pit_id = self._post(f"{self.index_pattern}/_pit?keep_alive={self.pit_keep_alive}",
+                            {})["id"]
+        try:
+            search_after = None
+            while True:
+                data = self._post("_search", self._build_query(pit_id, search_after))
+                pit_id = data.get("pit_id", pit_id)
+                hits = data.get('hits', {}).get('hits', [])
+                if hits:
+                    search_after = hits[-1].get('sort')
+                    yield hits
+                if len(hits) < self.page_size or search_after is None:
+                    return
+        finally:
+            try:
+                self.session.delete(f"{self.elasticsearch_url}/_pit", json={"id": pit_id},
+                                    timeout=10)
+            except requests.RequestException as exc:
+                log.debug("Cannot close point in time: %s", exc)
 
     def _update_last_timestamp(self, event: dict[str, Any]) -> None:
         """Update the internal last seen timestamp from an event."""
@@ -100,6 +170,56 @@ class TpotPoller:  # pylint: disable=too-many-instance-attributes,too-few-public
         if ts:
             self.last_timestamp = ts
 
+    def poll(self, forward: bool = True) -> None:
+        """
+        One polling cycle: process all the events newer than the last timestamp, sending
+        them unless forward is False.
+        """
+        for hits in self._fetch_pages():
+            self.metrics.events_read.inc(len(hits))
+            for hit in hits:
+                fingerprint = _generate_event_fingerprint(hit)
+                if fingerprint in self.seen_events:
+                    self.metrics.dedup_hits.inc()
+                    continue
+                event = hit.get('_source') or {}
+
+                # Catch-up logic
+                if not forward:
+                    self.event_log.debug("Silent sync: skipping initial event %s",
+                                         fingerprint)
+                else:
+                    should_convert, idmef = self.metrics.convert(self.converter, event)
+                    if should_convert:
+                        self.event_log.info("Sending IDMEFv2 alert for: %s",
+                                            event.get('type'))
+                        self.client.post(idmef)
+
+                self.seen_events.add(fingerprint, _sort_time(hit))
+                self._update_last_timestamp(event)
+            newest = _sort_time(hits[-1])
+            if newest is not None:
+                self.seen_events.expire(newest - 1000 * self.dedup_window)
+            self.event_log.tick()
+        log.debug("Remembering %d events", len(self.seen_events))
+
+    def seed(self) -> None:
+        """
+        Skip the events already in Elasticsearch: start from the latest one, marking the
+        events sharing its timestamp as seen.
+        """
+        data = self._post(f"{self.index_pattern}/_search", {
+            "size": 1,
+            "sort": [{"@timestamp": {"order": "desc"}}],
+            "_source": ["@timestamp"],
+            "query": {"bool": {"filter": self.required_filters}},
+        })
+        hits = data.get('hits', {}).get('hits', [])
+        if hits:
+            self._update_last_timestamp(hits[0].get('_source') or {})
+        self.poll(forward=False)
+        log.info("Skipped existing events, starting after %s", self.last_timestamp)
+
     def run(self):
         """Start the polling loop with initial sync logic."""
         first_run = True
@@ -107,26 +227,10 @@ class TpotPoller:  # pylint: disable=too-many-instance-attributes,too-few-public
 
         while True:
             try:
-                events = self._fetch_events()
-
-                for event in events:
-                    fingerprint = _generate_event_fingerprint(event)
-
-                    if fingerprint in self.seen_events:
-                        continue
-
-                    # Catch-up logic
-                    if first_run and not self.catch_up:
-                        log.debug("Silent sync: skipping initial event %s", fingerprint)
-                    else:
-                        should_convert, idmef = self.converter.convert(event)
-                        if should_convert:
-                            log.info("Sending IDMEFv2 alert for: %s", event.get('type'))
-                            self.client.post(idmef)
-
-                    self.seen_events.add(fingerprint)
-                    self._update_last_timestamp(event)
-
+                if first_run and not self.catch_up:
+                    self.seed()
+                else:
+                    self.poll()
                 first_run = False
 
             except Exception as e:  # pylint: disable=broad-exception-caught
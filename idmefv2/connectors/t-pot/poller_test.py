@@ -0,0 +1,179 @@
+# pylint: disable=missing-function-docstring
+"""
+Tests for the T-Pot poller, against a fake Elasticsearch API.
+"""
+
+import datetime
+import importlib
+
+_metrics = importlib.import_module("idmefv2.connectors.metrics")
+TpotPoller = importlib.import_module("idmefv2.connectors.t-pot.poller").TpotPoller
+TpotConverter = importlib.import_module("idmefv2.connectors.t-pot.tpotconverter").TpotConverter
+JSONConverter = importlib.import_module("idmefv2.connectors.jsonconverter").JSONConverter
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+def _millis(timestamp):
+    parsed = datetime.datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    return int(parsed.timestamp() * 1000)
+
+
+def _project(source, includes):
+    projected = {}
+    for field in includes:
+        *parents, name = field.split('.')
+        value, target = source, projected
+        for parent in parents:
+            value = value.get(parent, {})
+            target = target.setdefault(parent, {})
+        if name in value:
+            target[name] = value[name]
+    return projected
+
+
+class _FakeElasticsearch:
+    """Fake Elasticsearch API, serving events sorted by timestamp and insertion order."""
+
+    def __init__(self):
+        self.events = []
+        self.searches = []
+        self.open_pits = set()
+
+    def add(self, timestamp, count=1, **fields):
+        for _ in range(count):
+            source = {'@timestamp': timestamp, 'type': 'Cowrie',
+                      'src_ip': '192.0.2.10', 'src_port': '34567',
+                      'dest_ip': '198.51.100.20', 'dest_port': '22',
+                      'eventid': 'cowrie.login.failed'}
+            source.update(fields)
+            self.events.append({'_index': 'logstash-1', '_id': str(len(self.events)),
+                                '_source': {k: v for k, v in source.items() if v is not None}})
+
+    # pylint: disable=redefined-outer-name
+    def post(self, url, json=None, **_kwargs):
+        if '/_pit' in url:
+            self.open_pits.add('pit')
+            return _Response({'id': 'pit'})
+        if 'pit' not in json:
+            latest = max(self.events, key=lambda e: e['_source']['@timestamp'], default=None)
+            return _Response({'hits': {'hits': [latest] if latest else []}})
+        self.searches.append(json)
+        filters = json['query']['bool']['filter']
+        low = filters[0].get('range', {}).get('@timestamp', {}).get('gte', '')
+        required = [f['exists']['field'] for f in filters if 'exists' in f]
+        includes = json.get('_source', {}).get('includes')
+        hits = [dict(event, sort=[_millis(event['_source']['@timestamp']), position],
+                     _source=_project(event['_source'], includes) if includes
+                     else event['_source'])
+                for position, event in enumerate(self.events)
+                if event['_source']['@timestamp'] >= low
+                and all(field in event['_source'] for field in required)]
+        hits.sort(key=lambda hit: hit['sort'])
+        if 'search_after' in json:
+            hits = [hit for hit in hits if hit['sort'] > json['search_after']]
+        return _Response({'pit_id': 'pit', 'hits': {'hits': hits[:json['size']]}})
+
+    def delete(self, _url, json=None, **_kwargs):
+        self.open_pits.discard(json['id'])
+
+
+class _Client:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.posted = []
+
+    def post(self, idmefv2):
+        self.posted.append(idmefv2)
+
+
+class _AddressConverter(JSONConverter):  # pylint: disable=too-few-public-methods
+    REQUIRED_FIELDS = ('src_ip',)
+
+    def __init__(self):
+        super().__init__({'Source': [{'IP': '$.src_ip'}]})
+
+
+def _poller(elasticsearch, converter=None, **kwargs):
+    poller = TpotPoller(elasticsearch_url='http://es', index_pattern='logstash-*',
+                        client=_Client(), converter=converter or TpotConverter(),
+                        metrics=_metrics.ConnectorMetrics('tpot', _metrics.Registry()), **kwargs)
+    poller.session = elasticsearch
+    return poller
+
+
+def test_drains_all_pages():
+    elasticsearch = _FakeElasticsearch()
+    elasticsearch.add('2026-02-02T12:40:00Z', 5)
+    elasticsearch.add('2026-02-02T12:40:01Z', 20)
+    poller = _poller(elasticsearch, catch_up=True, page_size=7)
+    poller.poll()
+    assert len(poller.client.posted) == 25
+    # 4 pages, the last one not full
+    assert len(elasticsearch.searches) == 4
+    assert not elasticsearch.open_pits
+
+
+def test_events_sharing_last_timestamp():
+    elasticsearch = _FakeElasticsearch()
+    elasticsearch.add('2026-02-02T12:40:00Z', 3)
+    poller = _poller(elasticsearch, page_size=10)
+    poller.seed()
+    assert not poller.client.posted
+    assert poller.last_timestamp == '2026-02-02T12:40:00Z'
+    # indexed after the previous cycle, with the same timestamp as its last event
+    elasticsearch.add('2026-02-02T12:40:00Z', 2)
+    elasticsearch.add('2026-02-02T12:40:02Z')
+    poller.poll()
+    assert len(poller.client.posted) == 3
+    assert poller.metrics.dedup_hits.value == 3
+    assert poller.last_timestamp == '2026-02-02T12:40:02Z'
+
+
+def test_dedup_window_is_bounded():
+    elasticsearch = _FakeElasticsearch()
+    for second in range(10):
+        elasticsearch.add(f"2026-02-02T12:40:{second:02d}Z", 3)
+    poller = _poller(elasticsearch, catch_up=True, page_size=4, dedup_window=2)
+    poller.poll()
+    assert len(poller.client.posted) == 30
+    # events of the last 2 seconds before the last event, included
+    assert len(poller.seen_events) == 9
+    assert poller.last_timestamp == '2026-02-02T12:40:09Z'
+    poller.poll()
+    assert len(poller.client.posted) == 30
+
+
+def test_fetches_needed_fields_of_matching_events():
+    elasticsearch = _FakeElasticsearch()
+    elasticsearch.add('2026-02-02T12:40:00Z', type='Dionaea', eventid=None,
+                      connection={'protocol': 'smbd', 'payload': 'x' * 1000},
+                      username='sa', password='password', binary='y' * 1000)
+    # no destination address, filtered out by the converter
+    elasticsearch.add('2026-02-02T12:40:01Z', dest_ip=None)
+    poller = _poller(elasticsearch, catch_up=True)
+    poller.poll()
+    query = elasticsearch.searches[0]
+    assert query['_source']['includes'] == TpotConverter().source_fields()
+    assert {'exists': {'field': 'dest_ip'}} in query['query']['bool']['filter']
+    assert poller.metrics.events_read.value == 1
+    assert [idmef['Description'] for idmef in poller.client.posted] == \
+        ["Dionaea: SMBD login attempt with user 'sa' and password 'password'"]
+
+
+def test_cursor_with_converter_not_reading_timestamp():
+    elasticsearch = _FakeElasticsearch()
+    elasticsearch.add('2026-02-02T12:40:00Z', 2)
+    poller = _poller(elasticsearch, converter=_AddressConverter(), catch_up=True)
+    poller.poll()
+    assert elasticsearch.searches[0]['_source']['includes'] == ['@timestamp', 'src_ip']
+    assert poller.last_timestamp == '2026-02-02T12:40:00Z'
+    assert len(poller.client.posted) == 2
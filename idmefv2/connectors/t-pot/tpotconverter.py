@@ -60,6 +60,13 @@ class TpotConverter(JSONConverter):
     Updated to match official Logstash T-Pot mapping.
     """
 
+    # Fields read by _generate_description, called with the whole event
+    ROOT_FIELDS = ('type', 'message', 'eventid', 'username', 'password',
+                   'connection.protocol', 'dest_port')
+
+    # Fields without which events are filtered out
+    REQUIRED_FIELDS = ('src_ip', 'dest_ip', 'type', '@timestamp')
+
     IDMEFV2_TEMPLATE = {
         'Version': '2.D.V04',
         'ID': idmefv2_uuid,
@@ -97,6 +104,4 @@ class TpotConverter(JSONConverter):
         Ensures compliance with official T-Pot field naming (dest_ip).
         """
         # Changed 'dst_ip' to 'dest_ip' to match official mapping output
-        required = ['src_ip', 'dest_ip', 'type', '@timestamp']
-
-        return all(src.get(field) is not None for field in required)
+        return all(src.get(field) is not None for field in self.REQUIRED_FIELDS)
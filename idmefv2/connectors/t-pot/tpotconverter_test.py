@@ -62,3 +62,17 @@ def test_dionaea_description_contains_credentials():
     assert "Dionaea: SMB login attempt" in out["Description"]
     assert "user 'admin'" in out["Description"]
     assert "password '123456'" in out["Description"]
+
+
+def test_source_fields():
+    fields = TpotConverter().source_fields()
+    assert fields == ["@timestamp", "connection.protocol", "dest_ip", "dest_port", "eventid",
+                      "message", "password", "src_ip", "src_port", "type", "username"]
+    # the projected event is converted as the whole one
+    projected = {field: SAMPLE_EVENT[field] for field in fields if field in SAMPLE_EVENT}
+    full = dict(SAMPLE_EVENT, payload="x" * 1000)
+    converter = TpotConverter()
+    _, out = converter.convert(projected)
+    _, expected = converter.convert(full)
+    assert {k: v for k, v in out.items() if k != "ID"} == \
+        {k: v for k, v in expected.items() if k != "ID"}
@@ -0,0 +1,3 @@
+'''
+A HTTP test server validating IDMEFv2 messages
+'''
@@ -2,43 +2,118 @@
 A HTTP server for testing
 '''
 import argparse
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+import itertools
 import json
 import logging
+import random
+import time
 import jsonschema
 from idmefv2.exceptions import SerializationError
 from idmefv2.message import Message, SerializedMessage
+from .stats import ServerStats
+from .validator import CachedValidator
 
 
+def _json_error_response(e: json.JSONDecodeError) -> str:
+    '''
+    Formats a JSON decoding error, showing the problematic character with context
+    '''
+    context = 16
+    response_data = f"Invalid JSON: {e.msg}\n"
+    # Extract the line containing the error
+    line = e.doc.split('\n')[e.lineno - 1]
+    # Show the problematic character with context
+    start = max(0, e.colno - 1 - context)
+    end = min(len(line), e.colno - 1 + context)
+    context_str = line[start:end]
+    position_description = f"Line {e.lineno}: "
+    pointer = '^' + ' ' * (e.colno - 1 - start)
+    pointer = f"{' ' * (len(position_description) + e.colno - 1)}" + pointer
+    response_data += f"Line {e.lineno}: {context_str}\n"
+    response_data += f"{pointer}\n"
+    return response_data
+
 class IDMEFv2RequestHandler(BaseHTTPRequestHandler):
     '''
     A sub-class of BaseHTTPRequestHandler handling HTTP requests
     '''
-    def _response(self, status: int, response_data:str | None =None):
+    stats = ServerStats()
+    log_sample = 1
+    validate_percent = 100.0
+    latency = 0.0
+    latency_jitter = 0.0
+    error_percent = 0.0
+    error_statuses = (429, 503)
+    retry_after = 1
+    rng = random.Random()
+    _counter = itertools.count()
+    _sampled = True
+
+    def _response(self, status: int, response_data:str | None =None,
+                  content_type: str = 'text/plain', headers: dict | None = None):
         '''
         Sends the HTTP response
 
         Args:
             status (int): status to respond
             response_data (str | None, optional): content of response. Defaults to None.
+            content_type (str, optional): content type of response. Defaults to text/plain.
+            headers (dict | None, optional): additional headers. Defaults to None.
         '''
         self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
         if response_data is None:
+            self.send_header('Content-Length', '0')
             self.end_headers()
             return
         out = response_data.encode('utf-8')
-        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Type', content_type + '; charset=utf-8')
         self.send_header('Content-Length', len(out))
         self.end_headers()
         self.wfile.write(out)
         self.wfile.flush()
 
+    def _validate(self, post_data: bytes):
+        '''
+        Unserialize the request content as IDMEFv2 message and validate it
+
+        Args:
+            post_data (bytes): request content
+        '''
+        payload = SerializedMessage('application/json', post_data)
+        Message.unserialize(payload)
+
+    def log_request(self, code='-', size='-'):
+        '''
+        Logs an accepted request, if its body was logged
+        '''
+        if self._sampled:
+            super().log_request(code, size)
+
+    def _inject(self) -> int | None:
+        '''
+        Sleeps for the injected latency and draws an injected error
+
+        Returns:
+            int | None: HTTP status of the injected error, None if no error
+        '''
+        if self.latency > 0 or self.latency_jitter > 0:
+            time.sleep(self.latency + self.rng.uniform(0, self.latency_jitter))
+        if self.error_percent > 0 and self.rng.random() * 100 < self.error_percent:
+            return self.rng.choice(self.error_statuses)
+        return None
+
     # pylint: disable=invalid-name
     def do_GET(self):
         '''
-        Handles a HTTP GET
+        Handles a HTTP GET: returns the server counters as JSON on /stats, 501 otherwise
         '''
-        self._response(501)
+        if self.path.split('?')[0] != '/stats':
+            self._response(501)
+            return
+        self._response(200, json.dumps(self.stats.counters()) + '\n', 'application/json')
 
     # pylint: disable=invalid-name, broad-exception-caught
     def do_POST(self):
@@ -46,39 +121,43 @@ class IDMEFv2RequestHandler(BaseHTTPRequestHandler):
         Handles a HTTP POST:
         - read content
         - logs the request
-        - unserialize it as IDMEFv2 message and validate it
-        - responds 200 if message is OK, 500 if not
+        - waits for the injected latency, responds with an injected error if drawn
+        - if sampled for validation, unserialize it as IDMEFv2 message and validate it
+        - responds 200 if message is OK or not validated, 500 if not
         '''
+        start = time.perf_counter()
         content_length = int(self.headers['Content-Length'])
         post_data = self.rfile.read(content_length)
-        logging.info("POST request\nPath: %s\nHeaders:\n%s\nBody:\n%s\n",
-                str(self.path), str(self.headers), post_data.decode('utf-8'))
+        self._sampled = self.log_sample == 1 or next(self._counter) % self.log_sample == 0
+        if self._sampled:
+            logging.info("POST request\nPath: %s\nHeaders:\n%s\nBody:\n%s\n",
+                    str(self.path), str(self.headers), post_data.decode('utf-8'))
+        error = self._inject()
+        if error is not None:
+            self._response(error, headers={'Retry-After': str(self.retry_after)})
+            self.stats.record_error(time.perf_counter() - start, error)
+            return
+        if self.validate_percent < 100 and self.rng.random() * 100 >= self.validate_percent:
+            self._response(200)
+            self.stats.record(time.perf_counter() - start, True, validated=False)
+            return
         status = 200
         response_data = None
         try:
-            payload = SerializedMessage('application/json', post_data)
-            Message.unserialize(payload)
+            self._validate(post_data)
         except jsonschema.exceptions.ValidationError as e:
             logging.error(e.message)
             status = 500
             response_data = e.message + '\n'
+        except json.JSONDecodeError as e:
+            status = 500
+            response_data = _json_error_response(e)
+            logging.error(response_data)
         except SerializationError as e:
             e = e.__cause__
             if isinstance(e, json.JSONDecodeError):
-                context = 16
                 status = 500
-                response_data = f"Invalid JSON: {e.msg}\n"
-                # Extract the line containing the error
-                line = e.doc.split('\n')[e.lineno - 1]
-                # Show the problematic character with context
-                start = max(0, e.colno - 1 - context)
-                end = min(len(line), e.colno - 1 + context)
-                context_str = line[start:end]
-                position_description = f"Line {e.lineno}: "
-                pointer = '^' + ' ' * (e.colno - 1 - start)
-                pointer = f"{' ' * (len(position_description) + e.colno - 1)}" + pointer
-                response_data += f"Line {e.lineno}: {context_str}\n"
-                response_data += f"{pointer}\n"
+                response_data = _json_error_response(e)
                 logging.error(response_data)
             else:
                 logging.error(str(e))
@@ -91,6 +170,26 @@ class IDMEFv2RequestHandler(BaseHTTPRequestHandler):
             logging.error(str(e))
             status = 500
         self._response(status, response_data)
+        self.stats.record(time.perf_counter() - start, status == 200)
+
+class FastIDMEFv2RequestHandler(IDMEFv2RequestHandler):
+    '''
+    A request handler for load tests:
+    - HTTP/1.1 with keep-alive
+    - validation using pre-compiled, cached JSON schema validators
+    - body log sampled, 1 out of 1000 requests by default
+    '''
+    protocol_version = 'HTTP/1.1'
+    validator = CachedValidator()
+
+    def _validate(self, post_data: bytes):
+        self.validator.validate(json.loads(post_data))
+
+class FastHTTPServer(ThreadingHTTPServer):
+    '''
+    A HTTP server handling each connection in a thread, with a larger listen backlog
+    '''
+    request_queue_size = 128
 
 def parse_options():
     '''
@@ -101,6 +200,30 @@ def parse_options():
                         help='port to listen on', type=int, default=8888, dest='port')
     parser.add_argument('-l', '--log-level',
                         help='set log level', default='INFO', dest='log_level')
+    parser.add_argument('--fast', action='store_true',
+                        help='high-throughput mode: threads, keep-alive, cached validators')
+    parser.add_argument('--log-sample', type=int, default=None, dest='log_sample',
+                        help='log only one request body out of N (default: 1, 1000 with --fast)')
+    parser.add_argument('--stats-interval', type=float, default=None, dest='stats_interval',
+                        help='log a stats line every N seconds, 0 to disable '
+                        '(default: 0, 10 with --fast)')
+    parser.add_argument('--sink', action='store_true',
+                        help='accept and discard messages without validation')
+    parser.add_argument('--validate-percent', type=float, default=100.0, dest='validate_percent',
+                        help='percentage of messages validated, others are accepted (default: 100)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='latency added to each POST response, in milliseconds')
+    parser.add_argument('--latency-jitter', type=float, default=0.0, dest='latency_jitter',
+                        help='random latency added on top of --latency, up to N milliseconds')
+    parser.add_argument('--error-percent', type=float, default=0.0, dest='error_percent',
+                        help='percentage of POST requests answered with an injected error')
+    parser.add_argument('--error-status', default='429,503', dest='error_status',
+                        type=lambda s: tuple(int(c) for c in s.split(',')),
+                        help='comma separated HTTP statuses of injected errors (default: 429,503)')
+    parser.add_argument('--retry-after', type=int, default=1, dest='retry_after',
+                        help='Retry-After header of injected errors, in seconds (default: 1)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the random sampling and injection, for reproducible runs')
     return parser.parse_args()
 
 def _main():
@@ -108,10 +231,32 @@ def _main():
 
     logging.basicConfig(level=options.log_level)
 
+    if options.fast:
+        handler, server_class, log_sample, stats_interval = \
+            FastIDMEFv2RequestHandler, FastHTTPServer, 1000, 10.0
+    else:
+        handler, server_class, log_sample, stats_interval = \
+            IDMEFv2RequestHandler, HTTPServer, 1, 0.0
+    if options.log_sample is not None:
+        log_sample = max(1, options.log_sample)
+    if options.stats_interval is not None:
+        stats_interval = options.stats_interval
+    handler.log_sample = log_sample
+    handler.validate_percent = 0.0 if options.sink else options.validate_percent
+    handler.latency = options.latency / 1000
+    handler.latency_jitter = options.latency_jitter / 1000
+    handler.error_percent = options.error_percent
+    handler.error_statuses = options.error_status
+    handler.retry_after = options.retry_after
+    handler.rng = random.Random(options.seed)
+
     server_address = ('', options.port)
-    httpd = HTTPServer(server_address, IDMEFv2RequestHandler)
+    httpd = server_class(server_address, handler)
+    if stats_interval > 0:
+        handler.stats.start_reporting(stats_interval, logging.info)
 
-    logging.info('HTTP server listening on %d', options.port)
+    logging.info('HTTP server listening on %d%s%s', options.port,
+                 ' (fast mode)' if options.fast else '', ' (sink)' if options.sink else '')
     try:
         httpd.serve_forever()
     except:
@@ -0,0 +1,106 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the test server request handlers
+'''
+import http.client
+import json
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+import pytest
+
+pytest.importorskip('idmefv2.message')
+
+# pylint: disable=wrong-import-position
+from .__main__ import FastIDMEFv2RequestHandler, IDMEFv2RequestHandler
+from .stats import ServerStats
+
+_DIR = os.path.dirname(__file__)
+
+def _read(name: str) -> bytes:
+    with open(os.path.join(_DIR, name), 'rb') as f:
+        return f.read()
+
+VALID = _read('idmefv2.valid.json')
+INVALID = _read('idmefv2.invalid.json')
+
+def _handler(base, **attributes):
+    # a sub-class, so that options and statistics of a test do not leak into others
+    return type('Handler', (base,), {'stats': ServerStats(), **attributes})
+
+def _serve(handler) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def _stop(server: ThreadingHTTPServer):
+    server.shutdown()
+    server.server_close()
+
+def _post(connection: http.client.HTTPConnection, body: bytes) -> http.client.HTTPResponse:
+    connection.request('POST', '/', body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    response.read()
+    return response
+
+def _run(handler, bodies: list) -> tuple[list, dict]:
+    server = _serve(handler)
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+        responses = []
+        for body in bodies:
+            responses.append(_post(connection, body))
+            if handler.protocol_version != 'HTTP/1.1':
+                connection.close()
+        # statistics are recorded after the response is sent
+        deadline = time.monotonic() + 5
+        while True:
+            connection.request('GET', '/stats')
+            counters = json.loads(connection.getresponse().read())
+            if counters['requests'] >= len(bodies) or time.monotonic() > deadline:
+                break
+            time.sleep(0.01)
+        connection.close()
+        return responses, counters
+    finally:
+        _stop(server)
+
+def test_validation():
+    responses, counters = _run(_handler(IDMEFv2RequestHandler), [VALID, INVALID])
+    assert [r.status for r in responses] == [200, 500]
+    assert counters['validated'] == 2
+    assert counters['validation_failures'] == 1
+
+def test_fast():
+    handler = _handler(FastIDMEFv2RequestHandler, log_sample=1000)
+    responses, counters = _run(handler, [VALID, INVALID, b'{"Version":'])
+    assert [r.status for r in responses] == [200, 500, 500]
+    # all requests used the same keep-alive connection
+    assert all(not r.will_close for r in responses)
+    assert counters['validated'] == 3
+    assert counters['validation_failures'] == 2
+
+def test_sink():
+    responses, counters = _run(_handler(FastIDMEFv2RequestHandler, validate_percent=0.0),
+                               [VALID, INVALID])
+    assert [r.status for r in responses] == [200, 200]
+    assert counters['validated'] == 0
+    assert counters['discarded'] == 2
+
+def test_latency():
+    handler = _handler(IDMEFv2RequestHandler, latency=0.05, validate_percent=0.0)
+    start = time.monotonic()
+    responses, _ = _run(handler, [VALID])
+    assert responses[0].status == 200
+    assert time.monotonic() - start >= 0.05
+
+def test_error_injection():
+    handler = _handler(IDMEFv2RequestHandler, error_percent=100.0, error_statuses=(503,),
+                       retry_after=2)
+    responses, counters = _run(handler, [VALID, VALID])
+    assert [r.status for r in responses] == [503, 503]
+    assert responses[0].getheader('Retry-After') == '2'
+    assert counters['injected_errors'] == {'503': 2}
+    assert counters['validated'] == 0
+    assert counters['discarded'] == 0
@@ -0,0 +1,143 @@
+'''
+Statistics of the test server
+'''
+import random
+import threading
+import time
+
+def _p99(values: list[float]) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(0.99 * len(values)))]
+
+class ServerStats:  # pylint: disable=too-many-instance-attributes
+    '''
+    Thread safe counters of handled requests, with per-interval handling times
+
+    Handling times are sampled in a reservoir of bounded size, reset on each interval,
+    so that memory does not grow with the number of requests when intervals are not
+    reported.
+    '''
+    def __init__(self, reservoir_size: int = 10000):
+        '''
+        Args:
+            reservoir_size (int, optional): maximum number of handling times kept per
+                interval to compute the p99. Defaults to 10000.
+        '''
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._interval_start = self._start
+        self._reservoir_size = reservoir_size
+        self._random = random.Random()
+        self._durations = []
+        self._interval_requests = 0
+        self._interval_failures = 0
+        self._interval_errors = 0
+        self.requests = 0
+        self.validated = 0
+        self.validation_failures = 0
+        self.injected_errors = {}
+
+    def record(self, duration: float, valid: bool, validated: bool = True):
+        '''
+        Record a handled request
+
+        Args:
+            duration (float): handling time in seconds
+            valid (bool): False if message validation failed
+            validated (bool, optional): False if message was accepted without validation.
+                Defaults to True.
+        '''
+        with self._lock:
+            self.requests += 1
+            if validated:
+                self.validated += 1
+            if not valid:
+                self.validation_failures += 1
+                self._interval_failures += 1
+            self._sample(duration)
+
+    def record_error(self, duration: float, status: int):
+        '''
+        Record a request answered with an injected error
+
+        Args:
+            duration (float): handling time in seconds
+            status (int): HTTP status of the injected error
+        '''
+        with self._lock:
+            self.requests += 1
+            self.injected_errors[status] = self.injected_errors.get(status, 0) + 1
+            self._interval_errors += 1
+            self._sample(duration)
+
+    def _sample(self, duration: float):
+        # reservoir sampling: each handling time of the interval is kept with the same
+        # probability; called with the lock held
+        self._interval_requests += 1
+        if len(self._durations) < self._reservoir_size:
+            self._durations.append(duration)
+            return
+        index = self._random.randrange(self._interval_requests)
+        if index < self._reservoir_size:
+            self._durations[index] = duration
+
+    def counters(self) -> dict:
+        '''
+        Returns the counters since server start
+
+        Returns:
+            dict: uptime, requests, validated, discarded (accepted without validation),
+            validation failures and injected errors by HTTP status
+        '''
+        with self._lock:
+            errors = sum(self.injected_errors.values())
+            return {
+                'uptime_s': round(time.monotonic() - self._start, 3),
+                'requests': self.requests,
+                'validated': self.validated,
+                'discarded': self.requests - self.validated - errors,
+                'validation_failures': self.validation_failures,
+                'injected_errors': {str(k): v for k, v in sorted(self.injected_errors.items())},
+            }
+
+    def interval(self) -> dict:
+        '''
+        Returns statistics since previous call and starts a new interval
+
+        Returns:
+            dict: requests, req_per_s, validation_failures, injected_errors and p99_ms
+            of the interval
+        '''
+        with self._lock:
+            now = time.monotonic()
+            durations, self._durations = self._durations, []
+            requests, self._interval_requests = self._interval_requests, 0
+            elapsed, self._interval_start = now - self._interval_start, now
+            failures, self._interval_failures = self._interval_failures, 0
+            errors, self._interval_errors = self._interval_errors, 0
+        return {
+            'requests': requests,
+            'req_per_s': requests / elapsed if elapsed > 0 else 0.0,
+            'validation_failures': failures,
+            'injected_errors': errors,
+            'p99_ms': 1000 * _p99(durations),
+        }
+
+    def start_reporting(self, interval: float, log):
+        '''
+        Start a daemon thread logging a stats line every interval
+
+        Args:
+            interval (float): interval in seconds
+            log: function called with a format string and arguments, e.g. logging.info
+        '''
+        def report():
+            while True:
+                time.sleep(interval)
+                s = self.interval()
+                log("stats: %.1f req/s, %d validation failures, %d injected errors, p99 %.3f ms",
+                    s['req_per_s'], s['validation_failures'], s['injected_errors'], s['p99_ms'])
+        self.interval()
+        threading.Thread(target=report, name='stats', daemon=True).start()
@@ -0,0 +1,49 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the test server statistics
+'''
+from .stats import ServerStats
+
+def test_interval():
+    stats = ServerStats()
+    for i in range(100):
+        stats.record(0.001 * (i + 1), i % 10 != 0)
+    s = stats.interval()
+    assert s['requests'] == 100
+    assert s['validation_failures'] == 10
+    assert s['p99_ms'] == 100.0
+    assert stats.requests == 100
+
+def test_interval_reset():
+    stats = ServerStats()
+    stats.record(0.5, False)
+    stats.interval()
+    s = stats.interval()
+    assert s['requests'] == 0
+    assert s['validation_failures'] == 0
+    assert s['p99_ms'] == 0.0
+    assert stats.validation_failures == 1
+
+def test_counters():
+    stats = ServerStats()
+    stats.record(0.001, True)
+    stats.record(0.001, False)
+    stats.record(0.001, True, validated=False)
+    stats.record_error(0.001, 503)
+    stats.record_error(0.001, 429)
+    stats.record_error(0.001, 503)
+    c = stats.counters()
+    assert c['requests'] == 6
+    assert c['validated'] == 2
+    assert c['discarded'] == 1
+    assert c['validation_failures'] == 1
+    assert c['injected_errors'] == {'429': 1, '503': 2}
+    assert stats.interval()['injected_errors'] == 3
+
+def test_bounded_durations():
+    stats = ServerStats(reservoir_size=100)
+    for i in range(10000):
+        stats.record(0.001 if i % 100 else 1.0, True)
+    assert len(stats._durations) == 100  # pylint: disable=protected-access
+    s = stats.interval()
+    assert s['requests'] == 10000
@@ -0,0 +1,93 @@
+'''
+IDMEFv2 validation with cached, pre-compiled JSON schema validators
+'''
+import importlib.resources
+import json
+import logging
+import re
+import threading
+import jsonschema
+from idmefv2.message import Message
+
+# pylint: disable=too-few-public-methods
+class CachedValidator:
+    '''
+    Validates IDMEFv2 messages against the JSON schema of their version.
+
+    Message.validate loads and compiles the schema on each call; this class loads each
+    schema once and keeps the compiled validator, which is thread safe.
+
+    Schemas are looked up in the package layout of the IDMEFv2 Python library (idmefv2 0.8:
+    one IDMEFv2.schema resource per version package, latest-stable for unknown versions).
+    If this layout is not found, messages are validated with the public Message.validate,
+    without caching.
+    '''
+    SCHEMA_BASE_PACKAGE = 'idmefv2.schemas.drafts.IDMEFv2'
+    SCHEMA_RESOURCE = 'IDMEFv2.schema'
+
+    def __init__(self):
+        self._validators = {}
+        self._lock = threading.Lock()
+        self._cached = self._has_schemas()
+
+    def _has_schemas(self) -> bool:
+        try:
+            resource = importlib.resources.files(self.SCHEMA_BASE_PACKAGE + '.latest-stable')
+            if resource.joinpath(self.SCHEMA_RESOURCE).is_file():
+                return True
+        except ModuleNotFoundError:
+            pass
+        logging.warning("IDMEFv2 schemas not found in %s, validators are not cached",
+                        self.SCHEMA_BASE_PACKAGE)
+        return False
+
+    @staticmethod
+    def _version(message: dict) -> str | None:
+        version = message.get('Version') if isinstance(message, dict) else None
+        if not isinstance(version, str):
+            return None
+        m = re.match(r'\d\.D\.V([\d]+)', version)
+        return m.group(1) if m is not None else None
+
+    def _load(self, version: str | None) -> jsonschema.protocols.Validator:
+        resource = None
+        if version is not None:
+            resource = importlib.resources.files(self.SCHEMA_BASE_PACKAGE + '.' + version)
+            resource = resource.joinpath(self.SCHEMA_RESOURCE)
+            if not resource.is_file():
+                resource = None
+        if resource is None:
+            resource = importlib.resources.files(self.SCHEMA_BASE_PACKAGE + '.latest-stable')
+            resource = resource.joinpath(self.SCHEMA_RESOURCE)
+        with resource.open('rb') as stream:
+            schema = json.load(stream)
+        cls = jsonschema.validators.validator_for(schema)
+        cls.check_schema(schema)
+        return cls(schema)
+
+    def validate(self, message: dict) -> None:
+        '''
+        Validate a message, as Message.validate does
+
+        Args:
+            message (dict): the unserialized message
+
+        Raises:
+            jsonschema.exceptions.ValidationError: if message is not valid
+        '''
+        if not self._cached:
+            checked = Message()
+            checked.update(message)
+            checked.validate()
+            return
+        version = self._version(message)
+        validator = self._validators.get(version)
+        if validator is None:
+            with self._lock:
+                validator = self._validators.get(version)
+                if validator is None:
+                    validator = self._load(version)
+                    self._validators[version] = validator
+        error = jsonschema.exceptions.best_match(validator.iter_errors(message))
+        if error is not None:
+            raise error
@@ -2,11 +2,16 @@
 Main for Wazuh connector
 '''
 from .wazuhconverter import WazuhConverter
-from ..connector import ConnectorArgumentParser, Configuration, LogFileConnector
+from ..connector import ConnectorArgumentParser, Configuration, Connector, LogFileConnector
+
+def create_connector(cfg: Configuration) -> Connector:
+    '''
+    Create the connector from its configuration
+    '''
+    log_file_path = cfg.get('wazuh', 'logfile')
+    return LogFileConnector('wazuh', cfg, WazuhConverter(), log_file_path)
 
 if __name__ == '__main__':
     opts = ConnectorArgumentParser('wazuh').parse_args()
-    cfg = Configuration(opts)
-    log_file_path = cfg.get('wazuh', 'logfile')
-    connector = LogFileConnector('wazuh', cfg, WazuhConverter(), log_file_path)
+    connector = create_connector(Configuration(opts))
     connector.run()
@@ -8,32 +8,61 @@ Contains the program's entripoint, with two modes of operation:
 
 from __future__ import annotations
 import logging
-from http.server import HTTPServer
+from http.server import ThreadingHTTPServer
 
-from .push import ZabbixPushHelper, PushHandler
+from .push import ZabbixPushHelper, PushHandler, PushProcessor
 from .poller import ZabbixPoller
 from .zabbixconverter import ZabbixConverter
 from ..connector import ConnectorArgumentParser, Configuration, Connector
-from .models import ZabbixAuth
+from ..push import PushQueue, queue_options, serve
+from .models import ZabbixAuth, ZabbixCache
 
 
 log = logging.getLogger("zabbix-connector")
 
+def _auth(cfg: Configuration) -> ZabbixAuth:
+    """Zabbix API URL and credentials: a static API token, or user and password."""
+    url = cfg.get("zabbix", "url")
+    api_token = cfg.get("zabbix", "api_token", fallback=None)
+    if api_token:
+        return ZabbixAuth(url=url, api_token=api_token)
+    return ZabbixAuth(
+        url=url,
+        user=cfg.get("zabbix", "user"),
+        password=cfg.get("zabbix", "password"),
+    )
+
+def _cache(cfg: Configuration, connector: str) -> ZabbixCache:
+    """
+    Create the trigger and host cache from the [zabbix] cache_* options, its metrics
+    labelled with the connector name.
+    """
+    return ZabbixCache.create(
+        ttl=float(cfg.get("zabbix", "cache_ttl", fallback=300)),
+        negative_ttl=float(cfg.get("zabbix", "cache_negative_ttl", fallback=60)),
+        max_entries=int(cfg.get("zabbix", "cache_entries", fallback=10000)),
+        connector=connector,
+    )
+
+def _cache_refresh(cfg: Configuration) -> float:
+    return float(cfg.get("zabbix", "cache_refresh", fallback=60))
+
 class PollingConnector(Connector):
     """Periodically executes a polling of the events from Zabbix and sends them."""
     def __init__(self, cfg: Configuration, converter: ZabbixConverter):
         super().__init__("zabbix", cfg, converter)
 
-        auth = ZabbixAuth(
-            url=cfg.get("zabbix", "url"),
-            user=cfg.get("zabbix", "user"),
-            password=cfg.get("zabbix", "password")
-        )
-
         self.poller = ZabbixPoller(
-            auth = auth,
+            auth=_auth(cfg),
             client=self.idmefv2_client,
-            poll_interval=int(cfg.get("zabbix", "poll_interval", fallback=30))
+            poll_interval=int(cfg.get("zabbix", "poll_interval", fallback=30)),
+            metrics=self.metrics,
+            event_log=self.event_log,
+            state_file=cfg.get("zabbix", "state_file", fallback=None),
+            page_size=int(cfg.get("zabbix", "page_size", fallback=1000)),
+            dedup_window=int(cfg.get("zabbix", "dedup_window", fallback=10000)),
+            cache=_cache(cfg, self.metrics.connector),
+            cache_refresh=_cache_refresh(cfg),
         )
         self.poller.converter = converter
 
@@ -42,60 +71,66 @@ class PollingConnector(Connector):
         self.poller.run()
 
 class PushConnector(Connector):
-    """Starts an HTTP server to receive events from Zabbix and send them."""
+    """
+    Starts an HTTP server to receive events from Zabbix, and a pool of workers to
+    enrich and send them.
+    """
     def __init__(self, cfg: Configuration, converter: ZabbixConverter):
         super().__init__("zabbix", cfg, converter)
 
-        zbx_url = cfg.get("zabbix", "url")
-        zbx_user = cfg.get("zabbix", "user")
-        zbx_pass = cfg.get("zabbix", "password")
-
-        auth = ZabbixAuth(url=zbx_url, user=zbx_user, password=zbx_pass)
-        self.helper = ZabbixPushHelper(auth=auth)
+        self.helper = ZabbixPushHelper(
+            auth=_auth(cfg),
+            cache=_cache(cfg, self.metrics.connector),
+            cache_refresh=_cache_refresh(cfg),
+        )
         self.helper.login()
 
         # Use server_info from helper (dataclass) and convert to dict
         server_info = self.helper.server_info.__dict__
 
-        # Set static attributes on PushHandler
-        PushHandler.converter = converter
-        PushHandler.client = self.idmefv2_client
-        PushHandler.helper = self.helper
-        PushHandler.server_info = server_info
+        processor = PushProcessor(
+            converter=converter,
+            client=self.idmefv2_client,
+            helper=self.helper,
+            server_info=server_info,
+            metrics=self.metrics,
+            event_log=self.event_log,
+        )
+        self.queue = PushQueue(processor.process, metrics=self.metrics, **queue_options(cfg))
+
+        # static attributes set on a sub-class, for several connectors in one process
+        handler = type("PushHandler", (PushHandler,), {
+            "queue": self.queue,
+            "metrics": self.metrics,
+            "event_log": self.event_log,
+        })
 
         listen = cfg.get("connector", "listen_address", fallback="0.0.0.0")
         lport_str = cfg.get("connector", "listen_port", fallback=9090)
         lport = int(lport_str)
-        self.server = HTTPServer((listen, lport), PushHandler)
+        self.server = ThreadingHTTPServer((listen, lport), handler)
         self.listen_address = listen
         self.listen_port = lport
 
     def run(self):
-        self.logger.info(
-            "HTTP server listening on %s:%d/alert",
-            self.listen_address,
-            self.listen_port
-            )
-        try:
-            self.server.serve_forever()
-        except KeyboardInterrupt:
-            self.logger.info("Interrupted by user")
-        finally:
-            self.server.server_close()
+        serve(self.server, self.queue, self.logger)
 
-def main():
+def create_connector(cfg: Configuration) -> Connector:
     """Chooses the correct execution mode based on the configuration the user provides."""
-    opts = ConnectorArgumentParser("zabbix").parse_args()
-    cfg = Configuration(opts)
     mode = cfg.get("connector", "mode", fallback="polling").lower()
     if mode not in ("polling", "push"):
         raise ValueError("Mode must be either 'polling' or 'push'")
 
     converter = ZabbixConverter([mode])
     if mode == "polling":
-        connector = PollingConnector(cfg, converter)
-    else:
-        connector = PushConnector(cfg, converter)
+        return PollingConnector(cfg, converter)
+    return PushConnector(cfg, converter)
+
+def main():
+    """Parse arguments, load configuration, and start the connector."""
+    opts = ConnectorArgumentParser("zabbix").parse_args()
+    cfg = Configuration(opts)
+    connector = create_connector(cfg)
     connector.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+"""
+Expiring LRU cache of Zabbix API objects, e.g. trigger hosts and host interfaces.
+
+• Entries expire after a TTL, so that renamed hosts or changed IPs are picked up.
+• Objects not found (e.g. deleted triggers) are cached as None, for a shorter TTL.
+• The least recently used entries are evicted beyond a maximum number of entries.
+• Entries about to expire and recently used can be listed, to be refreshed in bulk.
+• Lookups are counted by the idmefv2_connector_zabbix_cache_total metric.
+"""
+from __future__ import annotations
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Iterable, TypeVar
+
+from ..metrics import REGISTRY, Registry
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+# pylint: disable=too-many-instance-attributes
+class TTLCache(Generic[K, V]):
+    """Thread-safe cache with per-entry expiry, negative entries and LRU eviction."""
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        name: str,
+        *,
+        ttl: float = 300.0,
+        negative_ttl: float = 60.0,
+        max_entries: int = 10000,
+        connector: str = "zabbix",
+        registry: Registry = REGISTRY,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Args:
+            name: cache name, label of the metrics.
+            ttl: lifetime in seconds of the entries.
+            negative_ttl: lifetime in seconds of the entries of objects not found.
+            max_entries: maximum number of entries.
+            connector: connector name, label of the metrics.
+            registry: metrics registry.
+            clock: time source, in seconds.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (value, expiry time, last access time), least recently used first
+        self._entries: OrderedDict[K, tuple[V | None, float, float]] = OrderedDict()
+        lookups = registry.counter(
+            "idmefv2_connector_zabbix_cache_total",
+            "Zabbix API object cache lookups, by cache and result: hit, negative_hit "
+            "(object known not to exist) or miss",
+            ("connector", "cache", "result"),
+        )
+        self._results = {
+            result: lookups.labels(connector, name, result)
+            for result in ("hit", "negative_hit", "miss")
+        }
+        registry.gauge(
+            "idmefv2_connector_zabbix_cache_entries",
+            "Entries in the Zabbix API object cache",
+            ("connector", "cache"),
+        ).labels(connector, name).set_function(lambda: len(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict[str, float]:
+        """Number of lookups by result."""
+        return {result: child.value for result, child in self._results.items()}
+
+    def missing(self, keys: Iterable[K]) -> list[K]:
+        """
+        Look up keys, counting hits and misses.
+
+        Returns:
+            list: the distinct keys without a live entry, to be fetched.
+        """
+        now = self._clock()
+        missing: list[K] = []
+        with self._lock:
+            for key in dict.fromkeys(keys):
+                entry = self._entries.get(key)
+                if entry is None or entry[1] <= now:
+                    self._results["miss"].inc()
+                    missing.append(key)
+                    continue
+                self._entries[key] = (entry[0], entry[1], now)
+                self._entries.move_to_end(key)
+                self._results["hit" if entry[0] is not None else "negative_hit"].inc()
+        return missing
+
+    def get(self, key: K) -> V | None:
+        """
+        Returns:
+            the value of a live entry, None if there is none or the object was not found.
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= self._clock():
+            return None
+        return entry[0]
+
+    def put(self, key: K, value: V | None) -> None:
+        """Store the value of a key, None if the object was not found."""
+        now = self._clock()
+        ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            self._entries[key] = (value, now + ttl, previous[2] if previous else now)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stale(self, within: float) -> list[K]:
+        """
+        Returns:
+            list: keys of the found objects whose entry expires within the given number
+            of seconds, and which were looked up during their lifetime.
+        """
+        now = self._clock()
+        with self._lock:
+            return [
+                key
+                for key, (value, expiry, access) in self._entries.items()
+                if value is not None and expiry <= now + within and access > expiry - self.ttl
+            ]
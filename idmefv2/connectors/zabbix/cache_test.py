@@ -0,0 +1,62 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the Zabbix API object cache
+'''
+from ..metrics import REGISTRY, Registry
+from .cache import TTLCache
+from .models import ZabbixCache
+
+class _Clock:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def _cache(clock, **kwargs) -> TTLCache:
+    return TTLCache('test', ttl=10, negative_ttl=2, registry=Registry(), clock=clock, **kwargs)
+
+def test_expiry():
+    clock = _Clock()
+    cache = _cache(clock)
+    assert cache.missing(['a', 'b', 'a']) == ['a', 'b']
+    cache.put('a', 1)
+    cache.put('b', None)
+    assert not cache.missing(['a', 'b'])
+    assert (cache.get('a'), cache.get('b')) == (1, None)
+    clock.now += 5
+    assert cache.missing(['a', 'b']) == ['b']
+    clock.now += 5
+    assert cache.missing(['a']) == ['a']
+    assert cache.get('a') is None
+    assert cache.stats() == {'hit': 2, 'negative_hit': 1, 'miss': 4}
+
+def test_lru():
+    cache = _cache(_Clock(), max_entries=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.missing(['a'])
+    cache.put('c', 3)
+    assert len(cache) == 2
+    assert cache.missing(['a', 'b', 'c']) == ['b']
+
+def test_stale():
+    clock = _Clock()
+    cache = _cache(clock)
+    for key in 'abc':
+        cache.put(key, key)
+    clock.now += 1
+    cache.missing(['a', 'b'])
+    cache.put('b', 'b')  # refreshed: not in use anymore until looked up again
+    clock.now += 7
+    assert cache.stale(within=3) == ['a']
+
+def test_connector_label():
+    first = ZabbixCache.create(connector='zabbix-first')
+    second = ZabbixCache.create(connector='zabbix-second')
+    first.triggers.put('a', 1)
+    first.triggers.missing(['a'])
+    entries = REGISTRY.gauge('idmefv2_connector_zabbix_cache_entries', '', ('connector', 'cache'))
+    assert entries.labels('zabbix-first', 'triggers').value == 1
+    assert entries.labels('zabbix-second', 'triggers').value == 0
+    assert (first.triggers.stats()['hit'], second.triggers.stats()['hit']) == (1, 0)
@@ -5,18 +5,24 @@ Defines classes for authentication, server info, and internal caching
 to optimize API calls.
 """
 
+from __future__ import annotations
 from dataclasses import dataclass, field
-from typing import Dict, Tuple, Set
-from requests import Session
+from typing import TYPE_CHECKING
+from ..dedup import DedupWindow
+from .cache import TTLCache
+
+if TYPE_CHECKING:
+    from .zabbixutil import ZabbixSession
 
 @dataclass
 class ZabbixAuth:
     """
-    Authentication data for the Zabbix API.
+    Authentication data for the Zabbix API: user and password, or an API token.
     """
     url: str
-    user: str
-    password: str
+    user: str = ""
+    password: str = ""
+    api_token: str | None = None
 
 @dataclass
 class ZabbixServerInfo:
@@ -28,26 +34,58 @@ class ZabbixServerInfo:
     port: int
     poll_interval: int = 30
 
+@dataclass(frozen=True)
+class Trigger:
+    """
+    Trigger metadata: description, priority and host.
+    """
+    hostid: str
+    host_name: str
+    description: str = ""
+    priority: str = "0"
+
+@dataclass(frozen=True)
+class HostInterface:
+    """
+    Address of the main interface of a host.
+    """
+    ip: str
+    port: int
+
 @dataclass
 class ZabbixCache:
     """
     Internal cache to map triggers to hosts, hosts to interfaces,
-    and to keep track of seen event IDs.
+    and to keep track of recently seen event IDs.
     """
-    trigger_host_map: Dict[str, str] = field(default_factory=dict)
-    host_iface_map: Dict[str, Tuple[str, int]] = field(default_factory=dict)
-    seen_eventids: Set[str] = field(default_factory=set)
+    triggers: TTLCache[str, Trigger] = field(
+        default_factory=lambda: TTLCache("triggers"))
+    interfaces: TTLCache[str, HostInterface] = field(
+        default_factory=lambda: TTLCache("interfaces"))
+    seen_eventids: DedupWindow = field(default_factory=DedupWindow)
+
+    @classmethod
+    def create(cls, *, ttl: float = 300.0, negative_ttl: float = 60.0,
+               max_entries: int = 10000, connector: str = "zabbix") -> ZabbixCache:
+        """
+        Create a cache whose trigger and interface maps have the given TTLs and size,
+        their metrics being labelled with the connector name.
+        """
+        return cls(
+            triggers=TTLCache("triggers", ttl=ttl, negative_ttl=negative_ttl,
+                              max_entries=max_entries, connector=connector),
+            interfaces=TTLCache("interfaces", ttl=ttl, negative_ttl=negative_ttl,
+                                max_entries=max_entries, connector=connector),
+        )
 
 @dataclass
 class _ZabbixContext:
     """
     Internal context container for connection-related data.
 
-    Groups together authentication credentials, HTTP session, server
-    information, and the temporary authentication token used for interacting
-    with the Zabbix API.
+    Groups together authentication credentials, API session, and server
+    information used for interacting with the Zabbix API.
     """
     auth: ZabbixAuth
-    session: Session
-    token: str | None
+    api: ZabbixSession
     server_info: ZabbixServerInfo
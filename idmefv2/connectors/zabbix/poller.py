@@ -1,8 +1,12 @@
 """
 Poll the Zabbix JSON‑RPC API for new problems and forward them to IDMEFv2.
 
-• Zabbix ≥ 7.2: Bearer‑token auth
+• Zabbix ≥ 7.2: Bearer‑token auth, from user.login or a static API token, logging in
+  again when the session expires
 • Injects both Source (host) and Target (server) info into each message.
+• Incremental polling: only problems with an eventid greater than the last processed
+  one (the cursor) are fetched, by pages, the cursor being optionally persisted in a
+  state file so that a restarted poller resumes where it stopped.
 """
 from __future__ import annotations
 import logging
@@ -13,11 +17,16 @@ import requests
 
 from .zabbixconverter import ZabbixConverter
 from ..idmefv2client import IDMEFv2Client
+from ..metrics import ConnectorMetrics
+from ..eventlog import EventLogger
+from ..dedup import DedupWindow
+from ..statefile import load_state, save_state
 from .models import ZabbixAuth, ZabbixCache, _ZabbixContext
 from .zabbixutil import (
-    perform_rpc,
-    get_hostid_for_trigger,
-    get_iface_for_host,
+    CacheRefresher,
+    ZabbixSession,
+    lookup_problem_host,
+    resolve_problem_hosts,
     resolve_zabbix_server_info,
 )
 
@@ -35,122 +44,215 @@ class ZabbixPoller:
         auth: ZabbixAuth,
         client: IDMEFv2Client,
         poll_interval: int = 30,
+        metrics: ConnectorMetrics | None = None,
+        event_log: EventLogger | None = None,
+        state_file: str | None = None,
+        page_size: int = 1000,
+        cursor_overlap: int = 100,
+        dedup_window: int = 10000,
+        cache: ZabbixCache | None = None,
+        cache_refresh: float = 0.0,
     ) -> None:
+        """
+        Args:
+            state_file: file where the cursor is persisted, None to start from the
+                latest problem on each start.
+            page_size: maximum number of problems fetched per problem.get call.
+            cursor_overlap: number of eventids before the cursor fetched again on each
+                cycle, so that problems committed late by Zabbix are not missed.
+            dedup_window: number of processed eventids remembered to drop problems
+                fetched again.
+            cache: trigger and host cache, by default with default TTLs and size.
+            cache_refresh: seconds between background refreshes of the cache, 0 to
+                disable.
+        """
         self.client = client
         self.poll_interval = poll_interval
-        self.cache = ZabbixCache()
+        self.metrics = metrics or ConnectorMetrics("zabbix")
+        self.event_log = event_log or EventLogger(log, self.metrics)
+        self.cache = cache or ZabbixCache()
+        self.cache.seen_eventids = DedupWindow(dedup_window)
+        self.cache_refresh = cache_refresh
         self.converter = ZabbixConverter()
+        self.state_file = state_file
+        self.page_size = page_size
+        self.cursor_overlap = cursor_overlap
+        self.cursor: int | None = None
+        # cursor at start: problems up to it were not processed by this poller, hence
+        # are not in the dedup window and must not be fetched again by the overlap
+        self.floor = 0
 
         server_info = resolve_zabbix_server_info(auth.url)
         server_info.poll_interval = poll_interval
 
         self.ctx = _ZabbixContext(
             auth=auth,
-            session=requests.Session(),
-            token=None,
+            api=ZabbixSession(auth),
             server_info=server_info,
         )
 
     def login(self) -> None:
-        """Authenticate and set Bearer token."""
-        resp = self.ctx.session.post(
-            self.ctx.auth.url.rstrip("/"),
-            json={
-                "jsonrpc": "2.0",
-                "id": 1,
-                "method": "user.login",
-                "params": {
-                    "username": self.ctx.auth.user,
-                    "password": self.ctx.auth.password,
-                },
-            },
-            timeout=5,
-        ).json()
-        if "error" in resp:
-            raise RuntimeError(resp["error"])
-        self.ctx.token = resp["result"]
-        log.info("Authenticated to Zabbix API (token %s…)", self.ctx.token[:8])
+        """Authenticate and set Bearer token, unless an API token is configured."""
+        self.ctx.api.login()
 
     def _rpc(self, method: str, params: dict[str, Any] | None = None) -> Any:
-        return perform_rpc(
-            self.ctx.session,
-            self.ctx.auth.url.rstrip("/"),
-            self.ctx.token,
-            method,
-            params,
-        )
+        return self.ctx.api.call(method, params)
 
+    def _load_cursor(self) -> int | None:
+        if not self.state_file:
+            return None
+        state = load_state(self.state_file)
+        if state is None:
+            return None
+        try:
+            return int(state["eventid"])
+        except (ValueError, KeyError, TypeError) as exc:
+            log.warning("Ignoring invalid state file %s: %s", self.state_file, exc)
+            return None
 
-    def run(self) -> None:
+    def _save_cursor(self) -> None:
+        if self.state_file:
+            save_state(self.state_file, {"eventid": str(self.cursor)})
+
+    def seed(self) -> None:
         """
-        Starts polling from Zabbix.
+        Initialize the cursor: from the state file if any, else from the latest problem,
+        so that existing problems are skipped.
         """
-        if not self.ctx.token:
-            self.login()
-
-        # Seed seen_eventids to skip existing problems
-        initial = self._rpc(
+        self.cursor = self._load_cursor()
+        if self.cursor is not None:
+            self.floor = self.cursor
+            log.info("Resuming polling after eventid %d", self.cursor)
+            return
+        latest = self._rpc(
             "problem.get",
             {
                 "output": ["eventid"],
                 "sortfield": "eventid",
-                "sortorder": "ASC",
+                "sortorder": "DESC",
                 "recent": True,
+                "limit": 1,
             },
         )
-        for p in initial:
-            self.cache.seen_eventids.add(p["eventid"])
-        log.info(
-            "Seeded seen_eventids with %d active problems", len(self.cache.seen_eventids)
-        )
+        self.cursor = self.floor = int(latest[0]["eventid"]) if latest else 0
+        log.info("Skipping existing problems, polling after eventid %d", self.cursor)
+        self._save_cursor()
+
+    def fetch_new(self) -> list[dict[str, Any]]:
+        """
+        Fetch problems after the cursor, by pages, dropping those already processed.
 
-        # Main loop: only process new problems
+        Returns:
+            list[dict]: new problems, by increasing eventid
+        """
+        problems: list[dict[str, Any]] = []
+        start = max(self.floor, self.cursor - self.cursor_overlap) + 1
         while True:
+            page = self._rpc(
+                "problem.get",
+                {
+                    "output": "extend",
+                    "eventid_from": str(start),
+                    "sortfield": "eventid",
+                    "sortorder": "ASC",
+                    "recent": True,
+                    "limit": self.page_size,
+                },
+            )
+            for prob in page:
+                self.metrics.events_read.inc()
+                if prob["eventid"] in self.cache.seen_eventids:
+                    self.metrics.dedup_hits.inc()
+                    continue
+                problems.append(prob)
+            if len(page) < self.page_size:
+                return problems
+            last = int(page[-1]["eventid"])
+            if last < start:
+                return problems
+            start = last + 1
+
+    def resolve(self, problems: list[dict[str, Any]]) -> None:
+        """
+        Resolve the hosts and interfaces of the problems not in cache, with at most one
+        trigger.get and one host.get call whatever the number of problems.
+        """
+        resolve_problem_hosts(self._rpc, (p["objectid"] for p in problems), self.cache)
+
+    def process(self, prob: dict[str, Any]) -> None:
+        """
+        Enrich from cache, convert and send a new problem, then advance the cursor
+        past it.
+
+        A problem that cannot be converted or is rejected by the IDMEFv2 server is logged
+        and skipped, so that it does not block the following ones. If the server cannot
+        be reached, the cursor is not advanced.
+
+        Raises:
+            requests.ConnectionError, requests.Timeout: if the server cannot be reached.
+        """
+        eid = prob["eventid"]
+        tid = prob["objectid"]
+        host_name, iface = lookup_problem_host(self.cache, tid)
+        ip, port = (iface.ip, iface.port) if iface else ("0.0.0.0", 0)
+
+        prob["hosts"] = [{"name": host_name}]
+        prob["extra"] = {"ip": ip, "port": port}
+        prob["extra_target"] = {
+            "hostname": self.ctx.server_info.hostname,
+            "ip": self.ctx.server_info.ip,
+            "port": self.ctx.server_info.port,
+        }
+
+        try:
+            forward, idmef = self.metrics.convert(self.converter, prob)
+        except Exception as exc:  # pylint: disable=broad-exception-caught
+            self.metrics.parse_failures.inc()
+            self.event_log.error("Cannot convert event %s, skipping it: %s", eid, exc)
+            forward = False
+        if forward:
+            self.event_log.info("Sending IDMEFv2 alert for event %s", eid)
             try:
-                problems = self._rpc(
-                    "problem.get",
-                    {
-                        "output": "extend",
-                        "sortfield": "eventid",
-                        "sortorder": "ASC",
-                        "recent": True
-                    },
-                )
-                for prob in problems:
-                    eid = prob["eventid"]
-                    if eid in self.cache.seen_eventids:
-                        continue
-                    self.cache.seen_eventids.add(eid)
-
-                    tid = prob["objectid"]
-                    hid = get_hostid_for_trigger(
-                        self.ctx.session,
-                        self.ctx.auth.url,
-                        self.ctx.token,
-                        tid,
-                        self.cache,
-                    )
-                    ip, port = get_iface_for_host(
-                        self.ctx.session,
-                        self.ctx.auth.url,
-                        self.ctx.token,
-                        hid,
-                        self.cache,
-                    )
-                    host_name = self.cache.trigger_host_map.get(f"name_{tid}", "unknown")
-
-                    prob["hosts"] = [{"name": host_name}]
-                    prob["extra"] = {"ip": ip, "port": port}
-                    prob["extra_target"] = {
-                        "hostname": self.ctx.server_info.hostname,
-                        "ip": self.ctx.server_info.ip,
-                        "port": self.ctx.server_info.port,
-                    }
-
-                    forward, idmef = self.converter.convert(prob)
-                    if forward:
-                        self.client.post(idmef)
+                self.client.post(idmef)
+            except (requests.ConnectionError, requests.Timeout):
+                raise
+            except requests.RequestException as exc:
+                # counted by the client metrics
+                self.event_log.error("Event %s rejected, skipping it: %s", eid, exc)
+
+        self.cache.seen_eventids.add(eid)
+        self.cursor = max(self.cursor, int(eid))
 
+    def poll(self) -> None:
+        """
+        One polling cycle: process new problems and persist the cursor. A problem
+        that could not be sent because the IDMEFv2 server is unreachable is processed
+        again on next cycle.
+        """
+        cursor = self.cursor
+        try:
+            problems = self.fetch_new()
+            self.resolve(problems)
+            for prob in problems:
+                self.process(prob)
+        finally:
+            if self.cursor != cursor:
+                self._save_cursor()
+
+    def run(self) -> None:
+        """
+        Starts polling from Zabbix.
+        """
+        if self.cache_refresh > 0:
+            CacheRefresher(self._rpc, self.cache, self.cache_refresh).start()
+
+        # Main loop: only process new problems, once the cursor is initialized
+        while True:
+            try:
+                if self.cursor is None:
+                    self.seed()
+                self.poll()
+                self.event_log.tick()
                 time.sleep(self.poll_interval)
 
             except KeyboardInterrupt:
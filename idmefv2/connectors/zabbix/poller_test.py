@@ -0,0 +1,216 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the Zabbix poller, against a fake Zabbix JSON-RPC API
+'''
+import json
+import pytest
+import requests
+from ..metrics import ConnectorMetrics, Registry
+from .cache import TTLCache
+from .models import ZabbixAuth, ZabbixCache
+from .poller import ZabbixPoller
+from .zabbixutil import CacheRefresher, ZabbixSession
+
+class _Response:
+    def __init__(self, result):
+        self.result = result
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {'result': self.result}
+
+class _FakeZabbix:
+    '''
+    Fake Zabbix API, answering problem.get, trigger.get and host.get
+    '''
+    def __init__(self, eventids):
+        self.problems = [self.problem(eid) for eid in eventids]
+        self.calls = []
+        self.deleted_triggers = set()
+        self.host_prefix = 'host'
+
+    @staticmethod
+    def problem(eventid):
+        return {'eventid': str(eventid), 'objectid': str(100 + eventid % 50), 'clock': '0',
+                'severity': '4', 'name': f"problem {eventid}"}
+
+    def post(self, _url, json=None, **_kwargs):  # pylint: disable=redefined-outer-name
+        method, params = json['method'], json['params']
+        self.calls.append((method, params))
+        if method == 'trigger.get':
+            return _Response([{'triggerid': tid, 'hosts': [
+                {'hostid': str(int(tid) % 10), 'name': f"{self.host_prefix} {int(tid) % 10}"}]}
+                for tid in params['triggerids'] if tid not in self.deleted_triggers])
+        if method == 'host.get':
+            return _Response([{'hostid': hid, 'interfaces': [
+                {'type': '2', 'ip': '', 'dns': 'snmp', 'port': '161'},
+                {'type': '1', 'ip': f"10.0.0.{hid}", 'dns': '', 'port': '10050'}]}
+                for hid in params['hostids']])
+        problems = sorted(self.problems, key=lambda p: int(p['eventid']),
+                          reverse=params['sortorder'] == 'DESC')
+        if 'eventid_from' in params:
+            problems = [p for p in problems if int(p['eventid']) >= int(params['eventid_from'])]
+        return _Response(problems[:params['limit']])
+
+class _Client:  # pylint: disable=too-few-public-methods
+    def __init__(self):
+        self.posted = []
+        self.errors = {}
+
+    def post(self, idmefv2):
+        error = self.errors.get(idmefv2['Description'])
+        if error is not None:
+            raise error
+        self.posted.append(idmefv2)
+
+def _poller(zabbix, **kwargs) -> ZabbixPoller:
+    poller = ZabbixPoller(auth=ZabbixAuth('http://127.0.0.1/api_jsonrpc.php', 'u', 'p'),
+                          client=_Client(), metrics=ConnectorMetrics('zabbix', Registry()),
+                          **kwargs)
+    poller.ctx.api = ZabbixSession(poller.ctx.auth, lambda: zabbix)
+    poller.ctx.api.token = 'token'
+    return poller
+
+def _descriptions(poller):
+    return [m['Description'] for m in poller.client.posted]
+
+def test_seed_skips_existing():
+    zabbix = _FakeZabbix([10, 11])
+    poller = _poller(zabbix)
+    poller.seed()
+    assert poller.cursor == 11
+    poller.poll()
+    assert not poller.client.posted
+    zabbix.problems.append(zabbix.problem(12))
+    poller.poll()
+    assert _descriptions(poller) == ['problem 12']
+    assert poller.cursor == 12
+
+def test_paging_and_dedup():
+    zabbix = _FakeZabbix([])
+    poller = _poller(zabbix, page_size=2, cursor_overlap=3)
+    poller.seed()
+    assert poller.cursor == 0
+    zabbix.problems += [zabbix.problem(eid) for eid in (1, 2, 3, 5)]
+    poller.poll()
+    assert _descriptions(poller) == [f"problem {eid}" for eid in (1, 2, 3, 5)]
+    # a problem committed late, below the cursor but within the overlap, is not missed
+    zabbix.problems.append(zabbix.problem(4))
+    poller.poll()
+    assert _descriptions(poller)[4:] == ['problem 4']
+    assert poller.cursor == 5
+    assert poller.metrics.dedup_hits.value == 2
+    starts = [p['eventid_from'] for _, p in zabbix.calls if 'eventid_from' in p]
+    assert starts == ['1', '3', '6', '3', '5']
+
+def test_state_file(tmp_path):
+    state_file = str(tmp_path / 'state.json')
+    zabbix = _FakeZabbix([7])
+    poller = _poller(zabbix, state_file=state_file)
+    poller.seed()
+    zabbix.problems += [zabbix.problem(8), zabbix.problem(9)]
+    poller.poll()
+    with open(state_file, encoding='utf-8') as f:
+        assert json.load(f) == {'eventid': '9'}
+    # restarted poller resumes after the cursor, without skipping problems raised meanwhile
+    zabbix.problems.append(zabbix.problem(10))
+    restarted = _poller(zabbix, state_file=state_file)
+    restarted.seed()
+    assert restarted.cursor == 9
+    restarted.poll()
+    assert _descriptions(restarted) == ['problem 10']
+
+def test_batched_enrichment():
+    zabbix = _FakeZabbix([])
+    poller = _poller(zabbix)
+    poller.seed()
+    zabbix.problems += [zabbix.problem(eid) for eid in range(1, 501)]
+    zabbix.calls.clear()
+    poller.poll()
+    assert [m for m, _ in zabbix.calls] == ['problem.get', 'trigger.get', 'host.get']
+    assert len(zabbix.calls[1][1]['triggerids']) == 50
+    assert len(zabbix.calls[2][1]['hostids']) == 10
+    assert len(poller.client.posted) == 500
+    # problem 1: trigger 101 on host 1, agent interface preferred
+    assert poller.client.posted[0]['Source'][0]['Hostname'] == 'host 1'
+    assert poller.client.posted[0]['Source'][0]['IP'] == '10.0.0.1'
+
+    # everything is cached on next cycle
+    zabbix.problems.append(zabbix.problem(501))
+    zabbix.calls.clear()
+    poller.poll()
+    assert [m for m, _ in zabbix.calls] == ['problem.get']
+
+def test_deleted_trigger():
+    zabbix = _FakeZabbix([])
+    zabbix.deleted_triggers.add('101')
+    poller = _poller(zabbix)
+    poller.seed()
+    zabbix.problems += [zabbix.problem(1), zabbix.problem(51)]
+    poller.poll()
+    assert [m['Source'][0]['Hostname'] for m in poller.client.posted] == ['unknown'] * 2
+    # the deleted trigger is not looked up again
+    zabbix.problems.append(zabbix.problem(101))
+    zabbix.calls.clear()
+    poller.poll()
+    assert [m for m, _ in zabbix.calls] == ['problem.get']
+    assert poller.cache.triggers.stats()['negative_hit'] >= 1
+
+def test_refresh():
+    class _Clock:  # pylint: disable=too-few-public-methods
+        now = 0.0
+
+        def __call__(self):
+            return self.now
+
+    clock, registry = _Clock(), Registry()
+    cache = ZabbixCache(
+        triggers=TTLCache('triggers', ttl=10, registry=registry, clock=clock),
+        interfaces=TTLCache('interfaces', ttl=10, registry=registry, clock=clock))
+    zabbix = _FakeZabbix([])
+    poller = _poller(zabbix, cache=cache)
+    poller.seed()
+    zabbix.problems.append(zabbix.problem(1))
+    poller.poll()
+    clock.now = 5
+    zabbix.problems.append(zabbix.problem(51))
+    poller.poll()
+    # host renamed: picked up by a background refresh before the entry expires
+    zabbix.host_prefix = 'renamed'
+    clock.now = 8
+    refresher = CacheRefresher(poller._rpc, cache, 1)  # pylint: disable=protected-access
+    refresher.refresh()
+    assert cache.triggers.get('101').host_name == 'renamed 1'
+    clock.now = 12
+    zabbix.problems.append(zabbix.problem(101))
+    zabbix.calls.clear()
+    poller.poll()
+    assert [m for m, _ in zabbix.calls] == ['problem.get']
+    assert poller.client.posted[-1]['Source'][0]['Hostname'] == 'renamed 1'
+
+def test_rejected_problem_is_skipped():
+    zabbix = _FakeZabbix([])
+    poller = _poller(zabbix)
+    poller.seed()
+    zabbix.problems += [zabbix.problem(eid) for eid in (1, 2, 3)]
+    poller.client.errors['problem 1'] = requests.HTTPError('400 Client Error')
+    for _ in range(5):
+        poller.poll()
+    assert _descriptions(poller) == ['problem 2', 'problem 3']
+    assert poller.cursor == 3
+
+def test_unreachable_server_holds_cursor():
+    zabbix = _FakeZabbix([])
+    poller = _poller(zabbix)
+    poller.seed()
+    zabbix.problems += [zabbix.problem(eid) for eid in (1, 2)]
+    poller.client.errors['problem 2'] = requests.ConnectionError('refused')
+    with pytest.raises(requests.ConnectionError):
+        poller.poll()
+    assert poller.cursor == 1
+    del poller.client.errors['problem 2']
+    poller.poll()
+    assert _descriptions(poller) == ['problem 1', 'problem 2']
+    assert poller.cursor == 2
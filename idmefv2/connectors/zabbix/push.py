@@ -2,27 +2,29 @@
 Module providing classes to handle incoming Zabbix push alerts.
 
 Includes a helper class to interact with the Zabbix API for fetching
-trigger and host information, and an HTTP handler class to process
-push notifications, enrich them with additional data, convert them
-using a converter, and forward them to an IDMEFv2 client.
+trigger and host information, and an HTTP handler class to receive
+push notifications and queue them. The queue workers enrich them with
+additional data, convert them using a converter, and forward them to an
+IDMEFv2 client.
 """
 
 from __future__ import annotations
 import json
 import logging
-from http.server import BaseHTTPRequestHandler
-from typing import Any, Optional
-
-import requests
+from typing import Any
 
 from .zabbixconverter import ZabbixConverter
 from ..idmefv2client import IDMEFv2Client
+from ..metrics import ConnectorMetrics
+from ..eventlog import EventLogger
+from ..push import PushHandler as BasePushHandler
 from .models import ZabbixAuth, ZabbixCache, ZabbixServerInfo
 from .zabbixutil import (
+    CacheRefresher,
+    ZabbixSession,
     resolve_zabbix_server_info,
-    perform_rpc,
-    get_hostid_for_trigger,
-    get_iface_for_host,
+    lookup_problem_host,
+    resolve_problem_hosts,
 )
 
 log = logging.getLogger("zabbix-connector")
@@ -35,149 +37,136 @@ class ZabbixPushHelper:
     Used in push-mode to enrich incoming alerts.
     """
 
-    def __init__(self, *, auth: ZabbixAuth) -> None:
+    def __init__(
+        self,
+        *,
+        auth: ZabbixAuth,
+        cache: ZabbixCache | None = None,
+        cache_refresh: float = 0.0,
+    ) -> None:
         """
         Initialize the helper with ZabbixAuth dataclass containing URL and credentials.
+        The cache is refreshed in background every cache_refresh seconds, 0 to disable.
         """
         self.auth = auth
-        self.session = requests.Session()
-        self.token: Optional[str] = None
-        self.cache = ZabbixCache()
+        self.api = ZabbixSession(auth)
+        self.cache = cache or ZabbixCache()
         self.server_info = resolve_zabbix_server_info(self.auth.url)
+        self.refresher: CacheRefresher | None = None
+        if cache_refresh > 0:
+            self.refresher = CacheRefresher(self.rpc, self.cache, cache_refresh)
+
+    def rpc(self, method: str, params: dict[str, Any] | None = None) -> Any:
+        """Perform a Zabbix JSON-RPC call, logging in again if the session expired."""
+        return self.api.call(method, params)
 
     def login(self) -> None:
-        """Obtain a bearer token from the Zabbix API."""
-        payload = {
-            "jsonrpc": "2.0", "id": 1,
-            "method": "user.login",
-            "params": {"username": self.auth.user, "password": self.auth.password}
-        }
-        r = self.session.post(self.auth.url, json=payload, timeout=5)
-        r.raise_for_status()
-        data = r.json()
-        if "error" in data:
-            raise RuntimeError(data["error"])
-        self.token = data["result"]
-        log.info("Authenticated to Zabbix API (token %s\u2026)", self.token[:8])
-
-
-
-class PushHandler(BaseHTTPRequestHandler):
+        """Obtain a bearer token from the Zabbix API, unless an API token is configured."""
+        self.api.login()
+        if self.refresher is not None and not self.refresher.is_alive():
+            self.refresher.start()
+
+
+class PushProcessor:
+    """
+    Enriches a pushed alert via the Zabbix API, converts it with the converter,
+    then forwards it to the IDMEFv2Client.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        *,
+        converter: ZabbixConverter,
+        client: IDMEFv2Client,
+        helper: ZabbixPushHelper,
+        server_info: ZabbixServerInfo | dict[str, Any],
+        metrics: ConnectorMetrics | None = None,
+        event_log: EventLogger | None = None,
+    ) -> None:
+        self.converter = converter
+        self.client = client
+        self.helper = helper
+        self.server_info = server_info
+        self.metrics = metrics or ConnectorMetrics("zabbix")
+        self.event_log = event_log or EventLogger(log, self.metrics)
+
+    def process(self, src: dict[str, Any]) -> None:
+        """
+        Enrich, convert and forward a pushed alert.
+
+        Raises:
+            Exception: if the alert cannot be enriched or forwarded.
+        """
+        # 1) fetch problem clock and trigger
+        eid = str(src["eventid"])
+        prob = self.helper.rpc(
+            "problem.get",
+            {"eventids": [eid], "output": ["clock", "objectid"]},
+        )
+        if not prob:
+            raise RuntimeError(f"eventid {eid} not found")
+        src["clock"] = prob[0]["clock"]
+        tid = prob[0]["objectid"]
+
+        # 2) fetch host/interface details, cached with the trigger
+        resolve_problem_hosts(self.helper.rpc, [tid], self.helper.cache)
+        host_name, iface = lookup_problem_host(self.helper.cache, tid)
+        ip, port = (iface.ip, iface.port) if iface else ("", 0)
+
+        # 3) trigger description & severity, from cache
+        trigger = self.helper.cache.triggers.get(tid)
+        if trigger is not None:
+            src["name"] = trigger.description or src.get("name", "")
+            src["severity"] = trigger.priority
+
+        # 4) fill any missing fields
+        src.setdefault("hosts", [{"name": host_name}])
+        src.setdefault("extra", {"ip": ip, "port": port})
+        src['extra']['ip'] = ip or '0.0.0.0'
+        src['extra']['port'] = port or 0
+
+        if isinstance(self.server_info, ZabbixServerInfo):
+            src["extra_target"] = {
+                "hostname": self.server_info.hostname,
+                "ip": self.server_info.ip,
+                "port": self.server_info.port,
+            }
+        else:
+            src["extra_target"] = dict(self.server_info)
+            src['extra_target'].setdefault('hostname', 'unknown_target_hostname')
+            src['extra_target'].setdefault('ip', '0.0.0.0')
+            src['extra_target'].setdefault('port', 0)
+
+        ok, msg = self.metrics.convert(self.converter, src)
+        if ok:
+            self.event_log.info("Sending IDMEFv2 alert for event %s", eid)
+            self.client.post(msg)
+
+
+class PushHandler(BasePushHandler):
     """
     HTTP handler for incoming Zabbix push alerts.
-    Expects POST /alert with Zabbix JSON; enriches via ZabbixPushHelper, converts
-    via ZabbixConverter, then forwards to IDMEFv2Client.
+    Expects POST /alert with Zabbix JSON, and acknowledges it as soon as queued: the
+    alert is then enriched, converted and forwarded by the workers of the queue.
     """
-    converter: ZabbixConverter
-    client: IDMEFv2Client
-    helper: ZabbixPushHelper
-    server_info: dict[str, Any]
-
-    def log_message(self, *_args, **_kwargs) -> None:
-        # disable base class logging
-        return
-
-    # pylint: disable=invalid-name
-    def do_POST(self) -> None:
-        """Handle POST requests sent to /alert endpoint."""
-        if self.path != "/alert":
-            self.send_error(404, "Not Found")
-            return
-
-        length = int(self.headers.get("Content-Length", 0))
-        body = self.rfile.read(length)
+    metrics: ConnectorMetrics = ConnectorMetrics("zabbix")
+    event_log: EventLogger = EventLogger(log)
+
+    def queue_alerts(self, body: bytes) -> tuple[int, str] | None:
+        """Parse a pushed Zabbix alert and queue it."""
+        self.metrics.events_read.inc()
         try:
             src = json.loads(body)
         except json.JSONDecodeError as exc:
-            log.error("Invalid JSON in push: %s", exc)
-            self.send_error(400, "Bad Request – invalid JSON")
-            return
+            self.metrics.parse_failures.inc()
+            self.event_log.error("Invalid JSON in push: %s", exc)
+            return 400, "Bad Request - invalid JSON"
 
-        log.debug("Received push JSON: %s", src)
+        self.event_log.debug("Received push JSON: %s", src)
 
-        try:
-            # 1) fetch problem clock
-            eid = str(src.get("eventid", ""))
-            if not eid:
-                raise ValueError("Missing eventid field")
-
-            prob = perform_rpc(
-                self.helper.session,
-                self.helper.auth.url,
-                self.helper.token,
-                "problem.get",
-                {"eventids": [eid], "output": ["clock"]},
-            )
-            if not prob:
-                raise RuntimeError(f"eventid {eid} not found")
-            src["clock"] = prob[0]["clock"]
-
-            # 2) fetch host/interface details
-
-            tid = perform_rpc(
-                self.helper.session,
-                self.helper.auth.url,
-                self.helper.token,
-                "problem.get",
-                {"eventids": [eid], "output": ["objectid"]},
-            )[0]["objectid"]
-
-            hid = get_hostid_for_trigger(
-                self.helper.session,
-                self.helper.auth.url,
-                self.helper.token,
-                tid,
-                self.helper.cache,
-            )
-            ip, port = get_iface_for_host(
-                self.helper.session,
-                self.helper.auth.url,
-                self.helper.token,
-                hid,
-                self.helper.cache,
-            )
-            host_name = self.helper.cache.trigger_host_map.get(f"name_{tid}", "unknown")
-
-
-            # 3) fetch trigger description & severity
-            trg = perform_rpc(
-                self.helper.session,
-                self.helper.auth.url,
-                self.helper.token,
-                "trigger.get",
-                {"triggerids": [tid], "output": ["description", "priority"]},
-            )[0]
-            src["name"] = trg.get("description", src.get("name", ""))
-            src["severity"] = str(trg.get("priority", src.get("severity", "0")))
-
-            # 4) fill any missing fields
-            src.setdefault("hosts", [{"name": host_name}])
-            src.setdefault("extra", {"ip": ip, "port": port})
-            src.setdefault("extra", {})
-            src['extra']['ip'] = ip or '0.0.0.0'
-            src['extra']['port'] = port or 0
-
-            if isinstance(self.helper.server_info, ZabbixServerInfo):
-                src["extra_target"] = {
-                    "hostname": self.helper.server_info.hostname,
-                    "ip": self.helper.server_info.ip,
-                    "port": self.helper.server_info.port,
-                }
-            else:
-                src["extra_target"] = self.helper.server_info
-                src['extra_target'].setdefault('hostname', 'unknown_target_hostname')
-                src['extra_target'].setdefault('ip', '0.0.0.0')
-                src['extra_target'].setdefault('port', 0)
-
-            ok, msg = self.converter.convert(src)
-            if ok:
-                self.client.post(msg)
-
-            self.send_response(200)
-            self.end_headers()
-            self.wfile.write(b"OK")
-
-        # pylint: disable=broad-exception-caught
-        except Exception as exc:
-            log.exception("Push-handler error")
-            self.send_error(500, f"Internal Server Error: {exc}")
+        if not isinstance(src, dict) or not str(src.get("eventid", "")):
+            self.metrics.parse_failures.inc()
+            return 400, "Bad Request - missing eventid field"
+
+        return self.put(src)
@@ -0,0 +1,90 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the Zabbix push handler, against a fake Zabbix JSON-RPC API
+'''
+import json
+import os
+import threading
+from ..metrics import ConnectorMetrics, Registry
+from ..push import PushQueue
+from ..push_test import _post, _serve, _stop
+from .models import ZabbixAuth
+from .poller_test import _Client, _Response
+from .push import PushHandler, PushProcessor, ZabbixPushHelper
+from .zabbixconverter import ZabbixConverter
+from .zabbixutil import ZabbixSession
+
+class _FakeZabbix:  # pylint: disable=too-few-public-methods
+    '''
+    Fake Zabbix API, counting calls by method
+    '''
+    def __init__(self):
+        self.calls = []
+
+    def post(self, _url, json=None, **_kwargs):  # pylint: disable=redefined-outer-name
+        method, params = json['method'], json['params']
+        self.calls.append(method)
+        if method == 'problem.get':
+            return _Response([{'eventid': eid, 'clock': '0', 'objectid': str(100 + int(eid) % 2)}
+                              for eid in params['eventids']])
+        if method == 'trigger.get':
+            return _Response([{'triggerid': tid, 'description': f"trigger {tid}",
+                               'priority': '4', 'hosts': [{'hostid': '1', 'name': 'h'}]}
+                              for tid in params['triggerids']])
+        return _Response([{'hostid': hid, 'interfaces': [
+            {'type': '1', 'ip': '10.0.0.1', 'dns': '', 'port': '10050'}]}
+            for hid in params['hostids']])
+
+def _processor(zabbix, client) -> PushProcessor:
+    helper = ZabbixPushHelper(auth=ZabbixAuth('http://127.0.0.1/api_jsonrpc.php', 'u', 'p'))
+    helper.api = ZabbixSession(helper.auth, lambda: zabbix)
+    helper.api.token = 'token'
+    return PushProcessor(converter=ZabbixConverter(['push']), client=client, helper=helper,
+                         server_info=helper.server_info,
+                         metrics=ConnectorMetrics('zabbix', Registry()))
+
+def _push(port, payload) -> int:
+    return _post(port, '/alert', json.dumps(payload).encode())
+
+def test_rpcs_per_alert():
+    zabbix, client = _FakeZabbix(), _Client()
+    processor = _processor(zabbix, client)
+    calls = []
+    for eid in range(1, 5):
+        before = len(zabbix.calls)
+        processor.process({'eventid': str(eid)})
+        calls.append(len(zabbix.calls) - before)
+    # cold cache: problem.get, trigger.get and host.get, then problem.get only
+    assert calls == [3, 2, 1, 1]
+    assert zabbix.calls[:3] == ['problem.get', 'trigger.get', 'host.get']
+    assert [m['Description'] for m in client.posted] == [
+        'trigger 101', 'trigger 100', 'trigger 101', 'trigger 100']
+    assert client.posted[0]['Priority'] == 'High'
+    assert client.posted[0]['Source'][0]['IP'] == '10.0.0.1'
+
+def test_ack_before_processing(tmp_path):
+    release = threading.Event()
+    processed = []
+
+    def process(src):
+        release.wait(5)
+        processed.append(src['eventid'])
+
+    metrics = ConnectorMetrics('zabbix', Registry())
+    queue = PushQueue(process, workers=2, max_pending=3, spool_dir=str(tmp_path),
+                      metrics=metrics, registry=Registry())
+    server = _serve(type('Handler', (PushHandler,), {'queue': queue, 'metrics': metrics}))
+    try:
+        # acknowledged while the workers are blocked, up to max_pending
+        statuses = [_push(server.server_port, {'eventid': str(eid)}) for eid in range(4)]
+        assert statuses == [200, 200, 200, 503]
+        assert _push(server.server_port, {'name': 'no eventid'}) == 400
+        assert metrics.queue_depth.value == 3
+        assert len(os.listdir(tmp_path)) == 3
+        release.set()
+        queue.shutdown()
+    finally:
+        _stop(server)
+    assert sorted(processed) == ['0', '1', '2']
+    assert not os.listdir(tmp_path)
+    assert metrics.queue_depth.value == 0
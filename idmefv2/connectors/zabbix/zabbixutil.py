@@ -3,23 +3,51 @@ Utility functions for Zabbix connectors.
 
 Includes:
 - Host/IP resolution from Zabbix URL
-- Common Zabbix API RPC call handler
-- Host and trigger info retrieval with caching
+- Common Zabbix API RPC call handler, and session manager re-authenticating on
+  expired sessions
+- Host and trigger info retrieval with caching, batched in one call per method, and
+  background refresh of the cache
 """
 
 from __future__ import annotations
 
 import logging
 import socket
-from typing import Any
+import threading
+from typing import Any, Callable, Iterable
 from urllib.parse import urlparse
 
 import requests
 
-from .models import ZabbixCache, ZabbixServerInfo
+from .models import HostInterface, Trigger, ZabbixAuth, ZabbixCache, ZabbixServerInfo
 
 log = logging.getLogger("zabbix-connector")
 
+# performs a Zabbix JSON-RPC call given the method and its parameters
+Rpc = Callable[[str, dict[str, Any]], Any]
+
+# substrings of the error data of Zabbix API calls failing on an invalid or expired
+# session, e.g. "Session terminated, re-login, please." or "Not authorized."
+_AUTH_ERRORS = ("re-login", "not authorized", "not authorised", "session terminated")
+
+
+class ZabbixAPIError(RuntimeError):
+    """
+    Error returned by the Zabbix API.
+    """
+
+    def __init__(self, error: dict[str, Any]) -> None:
+        super().__init__(error)
+        self.error = error
+
+    @property
+    def is_auth_error(self) -> bool:
+        """True if the call failed because the session is invalid or expired."""
+        if not isinstance(self.error, dict):
+            return False
+        text = f"{self.error.get('message', '')} {self.error.get('data', '')}".lower()
+        return any(e in text for e in _AUTH_ERRORS)
+
 
 def resolve_zabbix_server_info(url: str) -> ZabbixServerInfo:
     """
@@ -61,7 +89,7 @@ def perform_rpc(
         Any: The result from the Zabbix API.
 
     Raises:
-        RuntimeError: If Zabbix API returns an error.
+        ZabbixAPIError: If Zabbix API returns an error.
         requests.HTTPError: If HTTP request fails.
     """
     headers = {"Authorization": f"Bearer {token}"} if token else {}
@@ -76,86 +104,232 @@ def perform_rpc(
     data = response.json()
 
     if "error" in data:
-        raise RuntimeError(data["error"])
+        raise ZabbixAPIError(data["error"])
 
     return data["result"]
 
 
-def get_hostid_for_trigger(
-    session: requests.Session,
-    url: str,
-    token: str,
-    trigger_id: str,
+class ZabbixSession:
+    """
+    Zabbix API session shared by threads, each thread using its own HTTP session.
+
+    Authenticates with a static API token if configured, else with user.login on first
+    call. When a call fails because the session expired, logs in again, once for all the
+    threads whose calls failed with the same token, and replays the call.
+    """
+
+    def __init__(
+        self,
+        auth: ZabbixAuth,
+        session_factory: Callable[[], requests.Session] = requests.Session,
+    ) -> None:
+        """
+        Args:
+            auth (ZabbixAuth): API URL and credentials or API token.
+            session_factory (Callable): creates the HTTP session of each thread.
+        """
+        self.auth = auth
+        self.url = auth.url.rstrip("/")
+        self.token: str | None = auth.api_token or None
+        self._session_factory = session_factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session of the current thread."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = self._session_factory()
+        return session
+
+    def login(self) -> None:
+        """Obtain a bearer token from the Zabbix API, unless an API token is configured."""
+        if self.auth.api_token:
+            return
+        self.token = perform_rpc(
+            self.session,
+            self.url,
+            None,
+            "user.login",
+            {"username": self.auth.user, "password": self.auth.password},
+        )
+        log.info("Authenticated to Zabbix API (token %s\u2026)", self.token[:8])
+
+    def _relogin(self, failed_token: str | None) -> None:
+        with self._lock:
+            # single flight: the first thread logs in, the others use its token
+            if self.token == failed_token:
+                self.login()
+
+    def call(self, method: str, params: dict[str, Any] | None = None) -> Any:
+        """
+        Perform a Zabbix JSON-RPC call, logging in first if needed and again if the
+        session expired.
+
+        Raises:
+            ZabbixAPIError: If Zabbix API returns an error.
+            requests.HTTPError: If HTTP request fails.
+        """
+        token = self.token
+        if token is None:
+            self._relogin(None)
+            token = self.token
+        try:
+            return perform_rpc(self.session, self.url, token, method, params)
+        except ZabbixAPIError as exc:
+            if not exc.is_auth_error or self.auth.api_token:
+                raise
+            log.info("Zabbix session expired, logging in again")
+        self._relogin(token)
+        return perform_rpc(self.session, self.url, self.token, method, params)
+
+
+def _select_interface(interfaces: list[dict[str, Any]]) -> HostInterface:
+    """
+    Select the agent interface of a host, else its first interface.
+    """
+    iface = next((i for i in interfaces if int(i["type"]) == 1), interfaces[0])
+    return HostInterface(ip=iface["ip"] or iface["dns"], port=int(iface["port"]))
+
+
+def resolve_trigger_hosts(
+    rpc: Rpc,
+    trigger_ids: Iterable[str],
     cache: ZabbixCache,
-) -> str:
+    refresh: bool = False,
+) -> None:
     """
-    Get host ID for a given trigger ID, with caching.
+    Resolve the description, priority and host of all the triggers not in cache with a
+    single trigger.get call. Triggers not found, e.g. deleted, are cached as such.
 
     Args:
-        session (requests.Session): HTTP session.
-        url (str): Zabbix API URL.
-        token (str): Authentication token.
-        trigger_id (str): Zabbix trigger ID.
-        cache (ZabbixCache): Cache instance.
-
-    Returns:
-        str: Host ID
-    """
-    if trigger_id not in cache.trigger_host_map:
-        result = perform_rpc(
-            session,
-            url,
-            token,
-            "trigger.get",
-            {
-                "triggerids": [trigger_id],
-                "output": ["triggerid"],
-                "selectHosts": ["hostid", "name"],
-            },
+        rpc (Rpc): JSON-RPC call performer.
+        trigger_ids (Iterable[str]): Zabbix trigger IDs.
+        cache (ZabbixCache): Cache instance, updated with the resolved triggers.
+        refresh (bool): resolve the triggers even if in cache.
+    """
+    ids = list(dict.fromkeys(trigger_ids)) if refresh else cache.triggers.missing(trigger_ids)
+    if not ids:
+        return
+    result = rpc(
+        "trigger.get",
+        {
+            "triggerids": ids,
+            "output": ["triggerid", "description", "priority"],
+            "selectHosts": ["hostid", "name"],
+        },
+    )
+    found = {
+        trigger["triggerid"]: Trigger(
+            hostid=host["hostid"],
+            host_name=host["name"],
+            description=trigger.get("description", ""),
+            priority=str(trigger.get("priority", "0")),
         )
-        host = result[0]["hosts"][0]
-        cache.trigger_host_map[trigger_id] = host["hostid"]
-        cache.trigger_host_map[f"name_{trigger_id}"] = host["name"]
-    return cache.trigger_host_map[trigger_id]
+        for trigger in result
+        for host in trigger["hosts"][:1]
+    }
+    for tid in ids:
+        cache.triggers.put(tid, found.get(tid))
 
 
-def get_iface_for_host(
-    session: requests.Session,
-    url: str,
-    token: str,
-    host_id: str,
+def resolve_host_interfaces(
+    rpc: Rpc,
+    host_ids: Iterable[str],
     cache: ZabbixCache,
-) -> tuple[str, int]:
+    refresh: bool = False,
+) -> None:
     """
-    Get IP and port for the interface of a host, with caching.
+    Resolve the interfaces of all the hosts not in cache with a single host.get call.
+    Hosts not found or without interface are cached as such.
 
     Args:
-        session (requests.Session): HTTP session.
-        url (str): Zabbix API URL.
-        token (str): Authentication token.
-        host_id (str): Host ID.
-        cache (ZabbixCache): Cache instance.
+        rpc (Rpc): JSON-RPC call performer.
+        host_ids (Iterable[str]): Zabbix host IDs.
+        cache (ZabbixCache): Cache instance, updated with the resolved interfaces.
+        refresh (bool): resolve the hosts even if in cache.
+    """
+    ids = list(dict.fromkeys(host_ids)) if refresh else cache.interfaces.missing(host_ids)
+    if not ids:
+        return
+    result = rpc(
+        "host.get",
+        {
+            "hostids": ids,
+            "output": ["hostid"],
+            "selectInterfaces": ["type", "ip", "dns", "port"],
+        },
+    )
+    found = {
+        host["hostid"]: _select_interface(host["interfaces"])
+        for host in result
+        if host["interfaces"]
+    }
+    for hid in ids:
+        cache.interfaces.put(hid, found.get(hid))
+
+
+def resolve_problem_hosts(
+    rpc: Rpc, trigger_ids: Iterable[str], cache: ZabbixCache
+) -> None:
+    """
+    Resolve triggers and the interfaces of their hosts, with at most one trigger.get
+    and one host.get call.
+    """
+    trigger_ids = list(trigger_ids)
+    resolve_trigger_hosts(rpc, trigger_ids, cache)
+    triggers = (cache.triggers.get(tid) for tid in trigger_ids)
+    resolve_host_interfaces(rpc, (t.hostid for t in triggers if t), cache)
+
+
+def lookup_problem_host(
+    cache: ZabbixCache, trigger_id: str
+) -> tuple[str, HostInterface | None]:
+    """
+    Get from cache the host name and interface of a trigger.
 
     Returns:
-        Tuple[str, int]: IP address and port number.
-    """
-    if host_id not in cache.host_iface_map:
-        result = perform_rpc(
-            session,
-            url,
-            token,
-            "host.get",
-            {
-                "hostids": [host_id],
-                "output": ["hostid"],
-                "selectInterfaces": ["type", "ip", "dns", "port"],
-            },
-        )
-        iface = next(
-            (i for i in result[0]["interfaces"] if int(i["type"]) == 1),
-            result[0]["interfaces"][0],
-        )
-        ip = iface["ip"] or iface["dns"]
-        port = int(iface["port"])
-        cache.host_iface_map[host_id] = (ip, port)
-    return cache.host_iface_map[host_id]
+        tuple: host name, "unknown" if not found, and interface, None if not found.
+    """
+    trigger = cache.triggers.get(trigger_id)
+    if trigger is None:
+        return "unknown", None
+    return trigger.host_name, cache.interfaces.get(trigger.hostid)
+
+
+class CacheRefresher(threading.Thread):
+    """
+    Refreshes in bulk, in background, the cached triggers and interfaces which are
+    still in use and about to expire, so that lookups on the hot path keep hitting.
+    """
+
+    def __init__(self, rpc: Rpc, cache: ZabbixCache, interval: float) -> None:
+        """
+        Args:
+            rpc (Rpc): JSON-RPC call performer, usable from the refresher thread.
+            cache (ZabbixCache): Cache instance.
+            interval (float): seconds between refreshes.
+        """
+        super().__init__(name="zabbix-cache-refresher", daemon=True)
+        self.rpc = rpc
+        self.cache = cache
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def refresh(self) -> None:
+        """Refresh the entries expiring before the refresh after next."""
+        within = 2 * self.interval
+        resolve_trigger_hosts(self.rpc, self.cache.triggers.stale(within), self.cache, True)
+        resolve_host_interfaces(self.rpc, self.cache.interfaces.stale(within), self.cache, True)
+
+    def run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception as exc:  # pylint: disable=broad-exception-caught
+                log.warning("Zabbix cache refresh failed: %s", exc)
+
+    def stop(self) -> None:
+        """Stop refreshing."""
+        self._stopped.set()
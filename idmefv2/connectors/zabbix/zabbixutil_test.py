@@ -0,0 +1,84 @@
+# pylint: disable=missing-function-docstring
+'''
+Tests for the Zabbix API session
+'''
+import threading
+import pytest
+from .models import ZabbixAuth
+from .poller_test import _Response
+from .zabbixutil import ZabbixAPIError, ZabbixSession
+
+_EXPIRED = {'code': -32602, 'message': 'Invalid params.',
+            'data': 'Session terminated, re-login, please.'}
+
+class _Error(_Response):
+    def json(self):
+        return {'error': self.result}
+
+class _FakeZabbix:  # pylint: disable=too-few-public-methods
+    '''
+    Fake Zabbix API whose sessions expire on demand
+    '''
+    def __init__(self):
+        self.logins = 0
+        self.valid = set()
+        self.lock = threading.Lock()
+
+    def post(self, _url, json=None, headers=None, **_kwargs):  # pylint: disable=redefined-outer-name
+        if json['method'] == 'user.login':
+            with self.lock:
+                self.logins += 1
+                token = f"token{self.logins}"
+                self.valid = {token}
+            return _Response(token)
+        if json['method'] == 'host.get':
+            return _Error({'code': -32500, 'message': 'Application error.',
+                           'data': 'No permissions to referred object or it does not exist!'})
+        if (headers or {}).get('Authorization', '')[len('Bearer '):] not in self.valid:
+            return _Error(_EXPIRED)
+        return _Response([])
+
+def test_login_on_first_call_and_on_expiry():
+    zabbix = _FakeZabbix()
+    api = ZabbixSession(ZabbixAuth('http://127.0.0.1/api_jsonrpc.php', 'u', 'p'),
+                        lambda: zabbix)
+    assert api.call('problem.get') == []
+    assert zabbix.logins == 1
+    zabbix.valid.clear()
+    assert api.call('problem.get') == []
+    assert (zabbix.logins, api.token) == (2, 'token2')
+    with pytest.raises(ZabbixAPIError) as info:
+        api.call('host.get')
+    assert not info.value.is_auth_error
+    assert zabbix.logins == 2
+
+def test_single_flight_relogin():
+    zabbix = _FakeZabbix()
+    api = ZabbixSession(ZabbixAuth('http://127.0.0.1/api_jsonrpc.php', 'u', 'p'),
+                        lambda: zabbix)
+    api.login()
+    zabbix.valid.clear()
+    barrier = threading.Barrier(8)
+
+    def call():
+        barrier.wait()
+        api.call('problem.get')
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert zabbix.logins == 2
+
+def test_api_token():
+    zabbix = _FakeZabbix()
+    zabbix.valid = {'static'}
+    api = ZabbixSession(ZabbixAuth('http://127.0.0.1/api_jsonrpc.php', api_token='static'),
+                        lambda: zabbix)
+    assert api.call('problem.get') == []
+    zabbix.valid.clear()
+    with pytest.raises(ZabbixAPIError) as info:
+        api.call('problem.get')
+    assert info.value.is_auth_error
+    assert zabbix.logins == 0
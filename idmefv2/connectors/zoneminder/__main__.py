@@ -3,12 +3,25 @@ Main for zoneminder connector
 """
 
 from .zoneminderconverter import ZoneminderConverter
+from ..attachment import AttachmentLoader
 from ..configuration import Configuration
-from ..connector import ConnectorArgumentParser, LogFileConnector
+from ..connector import ConnectorArgumentParser, Connector, LogFileConnector, UnixSocketConnector
+
+def create_connector(cfg: Configuration) -> Connector:
+    """
+    Create the connector from its configuration: a daemon listening on a Unix socket
+    if zmjson.socket is set, tailing zmjson.logfile otherwise
+    """
+    loader = AttachmentLoader.from_config(cfg, cfg.get('connector', 'name', fallback='zoneminder'))
+    socket_path = cfg.get('zmjson', 'socket', fallback=None)
+    if socket_path is not None:
+        socket_mode = cfg.get('zmjson', 'socket_mode', fallback=None)
+        return UnixSocketConnector('zoneminder', cfg, ZoneminderConverter(loader), socket_path,
+                                   int(socket_mode, 8) if socket_mode is not None else None)
+    log_file_path = cfg.get('zmjson', 'logfile')
+    return LogFileConnector('zoneminder', cfg, ZoneminderConverter(loader), log_file_path)
 
 if __name__ == "__main__":
     opts = ConnectorArgumentParser('zoneminder').parse_args()
-    cfg = Configuration(opts)
-    log_file_path = cfg.get('zmjson', 'logfile')
-    connector = LogFileConnector('zoneminder', cfg, ZoneminderConverter(), log_file_path)
+    connector = create_connector(Configuration(opts))
     connector.run()
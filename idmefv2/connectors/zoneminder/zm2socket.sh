@@ -0,0 +1,14 @@
+#!/bin/sh
+# This script writes a JSON object to the Unix socket passed as first argument, on which
+# the zoneminder connector listens
+# Example of invocation as a zoneminder filter:
+# /zm2socket.sh /run/zoneminder-idmefv2/events.sock "%ET%" "%ED%" "%MN%"
+# The last argument is added automatically when zoneminder calls the filter
+# Requires socat, or OpenBSD netcat (nc -U)
+
+line="{\"ET\":\"$2\",\"ED\":\"$3\",\"MN\":\"$4\",\"EDP\":\"$5\"}"
+if command -v socat > /dev/null 2>&1; then
+    echo "$line" | socat -u - UNIX-CONNECT:"$1"
+else
+    echo "$line" | nc -N -U "$1"
+fi
@@ -3,7 +3,7 @@
 The zoneminder to IDMEFv2 convertor.
 '''
 import re
-import base64
+from ..attachment import AttachmentLoader
 from ..jsonconverter import JSONConverter
 from ..idmefv2funs import idmefv2_uuid, idmefv2_my_local_ip
 
@@ -25,13 +25,6 @@ def _fix_zoneminder_date(zm_date: str) -> str:
 def _make_description(d: str, m: str) -> str:
     return f"Event {d} on monitor {m}"
 
-def _make_snapshot_base64(path: str) -> str:
-    with open(path + "/snapshot.jpg", 'rb') as binary_file:
-        binary_file_data = binary_file.read()
-        base64_encoded_data = base64.b64encode(binary_file_data)
-        base64_output = base64_encoded_data.decode('ascii')
-        return base64_output
-
 # pylint: disable=too-few-public-methods
 class ZoneminderConverter(JSONConverter):
     '''
@@ -65,14 +58,21 @@ class ZoneminderConverter(JSONConverter):
                 "Name": "EventDirectoryPath",
                 "FileName": "$.EDP",
             },
-            {
-                "Name": "EventSnapshotImage",
-                "ContentType": "image/jpeg",
-                "ContentEncoding": "base64",
-                "Content": (_make_snapshot_base64, "$.EDP")
-            }
+            # EventSnapshotImage attachment, added by constructor
         ]
     }
 
-    def __init__(self):
-        super().__init__(ZoneminderConverter.IDMEFV2_TEMPLATE)
+    def __init__(self, loader: AttachmentLoader = None):
+        '''
+        Args:
+            loader (AttachmentLoader, optional): loader of event snapshots. Defaults to None,
+                snapshots attached whatever their size.
+        '''
+        self._loader = loader or AttachmentLoader()
+        template = dict(ZoneminderConverter.IDMEFV2_TEMPLATE)
+        template['Attachment'] = template['Attachment'] + [(self._snapshot, "$.EDP")]
+        super().__init__(template)
+
+    def _snapshot(self, event_path: str):
+        return self._loader.attachment(event_path + "/snapshot.jpg", "EventSnapshotImage",
+                                       "image/jpeg")